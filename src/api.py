@@ -0,0 +1,160 @@
+import argparse
+import json
+import os
+import re
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to Python path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from src.utils.job_queue import JobQueue
+from src.utils.llm_scheduler import BATCH, INTERACTIVE
+from src.utils.report_bundle import get_bundle, schedule_bundle
+from src.utils.runs import REPORTS, get_run_dir, resolve_input_file
+
+PRIORITIES = {"interactive": INTERACTIVE, "batch": BATCH}
+_REPORT_FILES = {filename for filename, _ in REPORTS}
+
+_RUN_RE = re.compile(r"^/runs/([A-Za-z0-9_-]+)$")
+_REPORTS_RE = re.compile(r"^/runs/([A-Za-z0-9_-]+)/reports$")
+_REPORT_RE = re.compile(r"^/runs/([A-Za-z0-9_-]+)/reports/([A-Za-z0-9_.-]+)$")
+_BUNDLE_RE = re.compile(r"^/runs/([A-Za-z0-9_-]+)/bundle\.(pdf|zip)$")
+
+
+def _validate_params(params) -> dict:
+    """Checks the run parameters of a submission; invoice files must be inside the inputs root."""
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    unknown = set(params) - {"invoice_files"}
+    if unknown:
+        raise ValueError(f"unknown params: {sorted(unknown)}")
+    if "invoice_files" not in params:
+        return {}
+    paths = params["invoice_files"]
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        raise ValueError("invoice_files must be a list of paths")
+    # Files are copied into the run folder by name, so names must be unique
+    names = [os.path.basename(resolve_input_file(p)) for p in paths]
+    if len(set(names)) != len(names):
+        raise ValueError("invoice_files must have distinct file names")
+    return {"invoice_files": paths}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """
+    Headless HTTP API over the job queue.
+
+    POST /runs                          Submit a run ({"priority": "batch" | "interactive",
+                                        "params": {"invoice_files": [paths]}}); paths are
+                                        relative to the inputs root (INPUTS_ROOT)
+    GET  /runs                          List recent runs (?status=queued|running|done|failed)
+    GET  /runs/<run_id>                 Run status
+    GET  /runs/<run_id>/reports         Available reports of a run
+    GET  /runs/<run_id>/reports/<file>  Report content (Markdown)
+    GET  /runs/<run_id>/bundle.pdf      All reports in one PDF (202 while it is being built)
+    GET  /runs/<run_id>/bundle.zip      PDF, reports, charts and run files (202 while it is being built)
+    GET  /health                        Queue counts
+    """
+
+    queue = None
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/runs":
+            return self._send(404, {"error": "not found"})
+        try:
+            body = self._read_json()
+        except ValueError:
+            return self._send(400, {"error": "invalid JSON body"})
+        priority = PRIORITIES.get(str(body.get("priority", "batch")).lower())
+        if priority is None:
+            return self._send(400, {"error": f"priority must be one of {sorted(PRIORITIES)}"})
+        try:
+            params = _validate_params(body.get("params") or {})
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        run_id = self.queue.submit(params=params, priority=priority)
+        self._send(202, {"run_id": run_id, "status": "queued"})
+
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        path = path.rstrip("/") or "/"
+
+        if path == "/health":
+            return self._send(200, {"status": "ok", "jobs": self.queue.counts()})
+        if path == "/runs":
+            params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+            return self._send(200, self.queue.list(status=params.get("status")))
+
+        match = _RUN_RE.match(path)
+        if match:
+            job = self.queue.get(match.group(1))
+            return self._send(200, job) if job else self._send(404, {"error": "unknown run"})
+
+        match = _REPORTS_RE.match(path)
+        if match:
+            run_id = match.group(1)
+            if not self.queue.get(run_id):
+                return self._send(404, {"error": "unknown run"})
+            run_dir = get_run_dir(run_id, create=False)
+            available = [f for f, _ in REPORTS if os.path.exists(os.path.join(run_dir, f))]
+            return self._send(200, {"run_id": run_id, "reports": available})
+
+        match = _REPORT_RE.match(path)
+        if match:
+            run_id, filename = match.groups()
+            path = os.path.join(get_run_dir(run_id, create=False), filename)
+            if filename not in _REPORT_FILES or not os.path.exists(path):
+                return self._send(404, {"error": "report not found"})
+            with open(path, "rb") as f:
+                return self._send(200, f.read(), content_type="text/markdown; charset=utf-8")
+
+        match = _BUNDLE_RE.match(path)
+        if match:
+            run_id, kind = match.groups()
+            job = self.queue.get(run_id)
+            if not job:
+                return self._send(404, {"error": "unknown run"})
+            bundle = get_bundle(run_id)
+            if bundle is None:
+                if job["status"] == "done":
+                    schedule_bundle(run_id)
+                return self._send(202, {"run_id": run_id, "status": "building" if job["status"] == "done" else job["status"]})
+            content_type = "application/pdf" if kind == "pdf" else "application/zip"
+            with open(bundle[kind], "rb") as f:
+                return self._send(200, f.read(), content_type=content_type)
+
+        self._send(404, {"error": "not found"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless API for submitting expense analyses.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--queue", default=None, help="Path of the job queue database")
+    args = parser.parse_args()
+
+    ApiHandler.queue = JobQueue(args.queue) if args.queue else JobQueue()
+    server = ThreadingHTTPServer((args.host, args.port), ApiHandler)
+    print(f"🌐 API listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
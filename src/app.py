@@ -2,7 +2,6 @@ import streamlit as st
 import sys
 import os
 from pathlib import Path
-import time
 from dotenv import load_dotenv
 import json
 
@@ -12,72 +11,76 @@ root_dir = current_dir.parent
 sys.path.append(str(root_dir))
 
 from crewai import Agent, Task, Crew, Process
-from src.tools.custom_tool import search_knowledge_base, access_memory
+from src.tools.custom_tool import search_knowledge_base, batch_search_knowledge_base, access_memory, query_spend_cube, canonicalize_vendor_names
 from crewai_tools import SerperDevTool
-
-# Create uploads directory if it doesn't exist
-upload_dir = current_dir / "uploads"
-upload_dir.mkdir(exist_ok=True)
-
-def create_crew():
-    """Create and return the crew with all agents and tasks"""
+from src.utils.run_memory import start_run_memory, release_run_memory
+from src.utils.llm import create_llm
+from src.utils.llm_scheduler import INTERACTIVE, get_scheduler
+from src.utils.run_profile import RunProfile
+from src.utils.invoice_loader import load_invoice_files
+from src.utils.invoice_store import InvoiceStore
+from src.utils.spend_cube import SPEND_CUBE_FILE, SpendCube, register_cube, release_cube
+from src.utils.dashboard import render_spend_dashboard
+from src.utils.vendor_index import get_vendor_index
+from src.utils.checkpoints import RunCheckpoints, files_fingerprint
+from src.utils.report_bundle import bundle_status, get_bundle, schedule_bundle
+from src.utils.report_verifier import verify_run, format_verification
+from src.utils.runs import REPORTS, new_run_id, get_run_dir, run_file, list_runs, save_run_input
+
+
+def create_crew(run_id, priority=INTERACTIVE, profile=None, checkpoints=None, inputs=""):
+    """Create and return the crew of the tasks left to run (None if all are checkpointed), writing reports into the run directory"""
     search_tool = SerperDevTool()
+    output_dir = get_run_dir(run_id)
+    checkpoints = checkpoints or RunCheckpoints(run_id)
 
-    supervisor = Agent(
-        role="Supervisor",
-        goal="Coordinate agents and ensure consistency of results",
-        backstory="""
-            You are an experienced supervisor in charge of coordinating the entire expense analysis workflow.
-            Your responsibilities include:
-            - Verifying consistency between different reports
-            - Detecting anomalies in results
-            - Relaunching analyses when necessary
-            - Ensuring overall deliverable quality
-            - Centralizing activity logging
-            You have an excellent overview and know when to intervene to optimize the process.
-        """,
-        verbose=True
-    )
+    def llm_for(role, task):
+        # Route each agent to a model tier; all share the process-wide LLM scheduler
+        return create_llm(priority=priority, agent=role, task=task, profile=profile)
 
     analyst = Agent(
         role="Expense Analyst",
         goal="Create detailed expense analysis and categorization from invoice data",
+        llm=llm_for("Expense Analyst", "analysis"),
         backstory="""
             You are a meticulous expense analyst with expertise in financial data analysis
             and cost categorization. You excel at breaking down expenses, identifying patterns,
             and providing actionable cost-saving insights.
         """,
         verbose=True,
-        tools=[search_knowledge_base, access_memory],
+        tools=[search_knowledge_base, batch_search_knowledge_base, access_memory, query_spend_cube, canonicalize_vendor_names],
     )
 
     reporter = Agent(
         role="Financial Reporter",
         goal="Write a clear and structured financial report based on expense analysis",
+        llm=llm_for("Financial Reporter", "write_report"),
         backstory="""
             You are a skilled financial writer, specializing in turning raw data into
             professional, structured reports. Your mission is to make financial insights
             easy to understand and actionable.
         """,
         verbose=True,
-        tools=[search_knowledge_base, access_memory]
+        tools=[search_knowledge_base, batch_search_knowledge_base, access_memory, query_spend_cube]
     )
 
     compliance_auditor = Agent(
         role="Compliance Auditor",
         goal="Verify invoices for errors, fraud, and compliance issues",
+        llm=llm_for("Compliance Auditor", "audit"),
         backstory="""
             You are a meticulous financial auditor with a keen eye for detail.
             Your role is to ensure invoices comply with company policies and detect 
             any inconsistencies, errors, or signs of fraud.
         """,
         verbose=True,   
-        tools=[search_knowledge_base, access_memory]
+        tools=[search_knowledge_base, batch_search_knowledge_base, access_memory]
     )
 
     supplier_negotiator = Agent(
         role="Supplier Negotiator",
         goal="Find alternative suppliers with better pricing and negotiate discounts",
+        llm=llm_for("Supplier Negotiator", "find_and_negotiate"),
         backstory="""
             You are a skilled procurement specialist and negotiator. Your mission is to 
             identify alternative suppliers that offer similar products at lower costs 
@@ -92,7 +95,8 @@ def create_crew():
             Analyze all expense data to create a detailed breakdown report.
             
             Steps to follow:
-            1. Group expenses by vendor
+            1. Group expenses by vendor (use the Canonicalize Vendor Names tool so that
+               spellings of the same supplier are counted as one vendor)
             2. Calculate total spend
             3. Identify cost-saving opportunities
             4. Compare with industry benchmarks
@@ -103,7 +107,7 @@ def create_crew():
             - Cost optimization recommendations
         """,
         expected_output="An expense analysis report with clear sections and actionable recommendations in markdown format.",
-        output_file="expense_report.md",
+        callback=checkpoints.task_callback("analysis", os.path.join(output_dir, "expense_report.md")),
         agent=analyst
     )
 
@@ -117,9 +121,11 @@ def create_crew():
             - Trends & Anomalies
             - Strategic Recommendations
             - Next Steps
+
+            Use the Query Spend Cube tool for monthly trends and anomalies.
         """,
         expected_output="A clear, concise, and strategic financial report in Markdown format.",
-        output_file="final_expense_report.md",
+        callback=checkpoints.task_callback("write_report", os.path.join(output_dir, "final_expense_report.md")),
         agent=reporter,
         depends_on=[analysis_task]
     )
@@ -135,7 +141,7 @@ def create_crew():
             - Suspicious patterns
         """,
         expected_output="A compliance audit report in Markdown format.",
-        output_file="compliance_audit.md",
+        callback=checkpoints.task_callback("audit", os.path.join(output_dir, "compliance_audit.md")),
         agent=compliance_auditor,
         depends_on=[analysis_task]
     )
@@ -151,37 +157,129 @@ def create_crew():
             4. Implementation plan
         """,
         expected_output="A supplier negotiation report in Markdown format.",
-        output_file="negotiated_suppliers.md",
+        callback=checkpoints.task_callback("find_and_negotiate", os.path.join(output_dir, "negotiated_suppliers.md")),
         agent=supplier_negotiator,
         depends_on=[analysis_task, audit_task]
     )
 
+    # Supervision is done by the deterministic verifier after the run (see
+    # create_supervision_crew), so no manager LLM sits between the tasks
+    # Tasks already checkpointed with the same inputs are skipped on resume
+    tasks = checkpoints.plan([
+        ("analysis", analysis_task, []),
+        ("write_report", write_report_task, ["analysis"]),
+        ("audit", audit_task, ["analysis"]),
+        ("find_and_negotiate", find_and_negotiate_task, ["analysis", "audit"]),
+    ], inputs=inputs)
+    if not tasks:
+        return None
+
+    crew = Crew(
+        agents=[analyst, reporter, compliance_auditor, supplier_negotiator],
+        tasks=tasks,
+        process=Process.sequential,
+        verbose=True
+    )
+
+    return crew
+
+def create_supervision_crew(run_id, verification, priority=INTERACTIVE, profile=None, checkpoints=None):
+    """Create the supervisor crew, only needed when the numeric cross-check finds mismatches"""
+    output_dir = get_run_dir(run_id)
+    checkpoints = checkpoints or RunCheckpoints(run_id)
+
+    def llm_for(role, task):
+        return create_llm(priority=priority, agent=role, task=task, profile=profile)
+
+    supervisor = Agent(
+        role="Supervisor",
+        goal="Coordinate agents and ensure consistency of results",
+        llm=llm_for("Supervisor", "supervision"),
+        backstory="""
+            You are an experienced supervisor in charge of coordinating the entire expense analysis workflow.
+            Your responsibilities include:
+            - Verifying consistency between different reports
+            - Detecting anomalies in results
+            - Relaunching analyses when necessary
+            - Ensuring overall deliverable quality
+            - Centralizing activity logging
+            You have an excellent overview and know when to intervene to optimize the process.
+        """,
+        verbose=True,
+        tools=[access_memory]
+    )
+
     supervision_task = Task(
-        description="""
-            Supervise the entire analysis process and ensure quality results.
-            
-            Tasks:
-            1. Verify report consistency
-            2. Validate recommendations
-            3. Check calculations
-            4. Ensure completeness
+        description=f"""
+            The automatic numeric cross-check of the expense reports found mismatches.
+            Review them, decide which figures are correct and explain the corrections.
+
+            {format_verification(verification)}
         """,
         expected_output="A supervision report in Markdown format.",
-        output_file="supervision_report.md",
-        agent=supervisor,
-        depends_on=[analysis_task, write_report_task, audit_task, find_and_negotiate_task]
+        callback=checkpoints.task_callback("supervision", os.path.join(output_dir, "supervision_report.md")),
+        agent=supervisor
     )
 
-    # Create Crew with hierarchical process
-    crew = Crew(
-        agents=[analyst, reporter, compliance_auditor, supplier_negotiator],
-        tasks=[analysis_task, write_report_task, audit_task, find_and_negotiate_task, supervision_task],
-        process=Process.hierarchical,
-        manager_agent=supervisor,
+    # Same mismatches as a checkpointed supervision: restore its report instead
+    tasks = checkpoints.plan([("supervision", supervision_task, [])])
+    if not tasks:
+        return None
+
+    return Crew(
+        agents=[supervisor],
+        tasks=tasks,
+        process=Process.sequential,
         verbose=True
     )
 
-    return crew
+def run_analysis(run_id, priority=INTERACTIVE, invoice_files=None, stop=None):
+    """Run or resume the crew for a run id, cross-check the reports and supervise only on mismatches"""
+    # A resumed run adds to the calls, cost and timings of the tasks already done
+    profile = RunProfile.load(run_id, run_file(run_id, "profile.json"))
+    # Every write to the run folder first checks `stop` (set by a worker that lost the job)
+    checkpoints = RunCheckpoints(run_id, stop=stop)
+    if invoice_files is None:
+        # Resuming: reuse the invoices the run was started with
+        invoice_files = checkpoints.load_inputs().get("invoice_files", [])
+    invoice_files = [str(f) for f in invoice_files]
+    checkpoints.save_inputs({"invoice_files": invoice_files})
+    memory = start_run_memory(run_id, path=run_file(run_id, "memory.json"))
+    try:
+        # Precompute the spend cube of tabular invoices for the agents and the checks; it
+        # subscribes to the store first, so it is built while the invoices are loaded
+        cube = SpendCube(InvoiceStore()) if invoice_files else None
+        if cube is not None:
+            load_invoice_files(invoice_files, cube.store)
+            register_cube(run_id, cube)
+            # Computed figures are in the run memory before the first agent starts
+            cube.store_figures(memory)
+            # Persisted for the dashboard, which never re-runs the agents
+            checkpoints.check_stop()
+            cube.save(run_file(run_id, SPEND_CUBE_FILE))
+        # Checkpointed tasks are skipped; only failed, changed and downstream tasks run
+        crew = create_crew(run_id, priority=priority, profile=profile, checkpoints=checkpoints,
+                           inputs=files_fingerprint(invoice_files))
+        result = crew.kickoff() if crew else checkpoints.last_output(["find_and_negotiate", "audit", "write_report", "analysis"])
+        # Deterministic cross-check; the supervisor LLM only runs on real mismatches
+        checkpoints.check_stop()
+        verification = verify_run(run_id, expense_data=cube)
+        if verification["mismatches"]:
+            supervision = create_supervision_crew(run_id, verification, priority=priority, profile=profile,
+                                                  checkpoints=checkpoints)
+            if supervision:
+                supervision.kickoff()
+    finally:
+        release_run_memory(run_id)
+        release_cube(run_id)
+        get_vendor_index().save()
+        if not checkpoints.stopped:
+            profile.save(run_file(run_id, "profile.json"))
+    # One PDF + ZIP of all reports, built off the request path and cached by run id; the
+    # run files it ships are all written by now
+    checkpoints.check_stop()
+    schedule_bundle(run_id)
+    return result
 
 def save_api_keys(keys):
     """Save API keys to .env file"""
@@ -249,6 +347,10 @@ def main():
             save_api_keys(new_api_keys)
             st.success("API keys saved successfully!")
 
+    # LLM scheduler metrics (shared by all sessions of this server)
+    with st.sidebar.expander("📈 LLM Queue", expanded=False):
+        st.json(get_scheduler().metrics())
+
     # Main content area
     st.markdown("---")
 
@@ -270,16 +372,8 @@ def main():
     )
 
     if uploaded_files:
-        # Save uploaded files
-        try:
-            for uploaded_file in uploaded_files:
-                file_path = upload_dir / uploaded_file.name
-                with open(file_path, "wb") as f:
-                    f.write(uploaded_file.getbuffer())
-            st.success(f"✅ Successfully uploaded {len(uploaded_files)} files")
-        except Exception as e:
-            st.error(f"❌ Error saving uploaded files: {str(e)}")
-            st.stop()
+        # Saved into the run's inputs folder when the analysis starts
+        st.success(f"✅ {len(uploaded_files)} files ready for analysis")
     else:
         st.info("⚠️ Please upload your invoice files before starting the analysis")
 
@@ -318,6 +412,22 @@ def main():
         st.warning(f"⚠️ Please configure the following API keys first: {', '.join(missing_keys)}")
         st.stop()
     
+    # Resume a failed or interrupted run from its last completed task
+    previous_runs = list_runs()
+    if previous_runs:
+        with st.expander("⏯️ Resume a Previous Run", expanded=False):
+            resume_run = st.selectbox("Run to resume", previous_runs, key="resume_run")
+            completed = RunCheckpoints(resume_run).completed()
+            st.caption(f"Completed tasks: {', '.join(completed) if completed else 'none'}")
+            if st.button("⏯️ Resume Analysis", use_container_width=True):
+                st.session_state["run_id"] = resume_run
+                with st.spinner("🤖 Resuming the analysis from its last completed task..."):
+                    try:
+                        run_analysis(resume_run)
+                        st.success("🎉 Analysis resumed and completed successfully!")
+                    except Exception as e:
+                        st.error(f"❌ Error during AI analysis: {str(e)}")
+    
     if not uploaded_files:
         st.warning("⚠️ Please upload invoice files before starting the analysis")
         st.stop()
@@ -338,10 +448,12 @@ def main():
                 5. 📝 Generating final reports...
                 """)
                 
-                # Create and run the crew
-                crew = create_crew()
+                # Create and run the crew in its own run directory
+                run_id = new_run_id()
+                st.session_state["run_id"] = run_id
                 try:
-                    result = crew.kickoff()
+                    invoice_files = [save_run_input(run_id, f.name, f.getbuffer()) for f in uploaded_files]
+                    result = run_analysis(run_id, invoice_files=invoice_files)
                 except Exception as e:
                     st.error(f"❌ Error during AI analysis: {str(e)}")
                     st.stop()
@@ -361,35 +473,66 @@ def main():
     st.markdown("---")
     st.header("📑 Generated Reports")
     
-    # List of reports
-    reports = [
-        ("expense_report.md", "📊 Expense Analysis"),
-        ("final_expense_report.md", "📑 Final Report"),
-        ("compliance_audit.md", "🔍 Compliance Audit"),
-        ("negotiated_suppliers.md", "💼 Supplier Negotiations")
-    ]
+    # Pick the run to display (defaults to this session's latest run)
+    runs = list_runs()
+    if not runs:
+        st.info("No report generated yet. Run the analysis to generate reports.")
+    else:
+        session_run = st.session_state.get("run_id")
+        selected_run = st.selectbox(
+            "Run",
+            runs,
+            index=runs.index(session_run) if session_run in runs else 0
+        )
     
-    # Create tabs for each report
-    tabs = st.tabs([name for _, name in reports])
+        # Bundled PDF/ZIP of the run, built in the background once the run is done
+        status = bundle_status(selected_run)
+        if status == "ready":
+            bundle = get_bundle(selected_run)
+            col1, col2 = st.columns(2)
+            with open(bundle["pdf"], "rb") as f:
+                col1.download_button("⬇️ Download All Reports (PDF)", f.read(), file_name=f"expense_reports_{selected_run}.pdf",
+                                     mime="application/pdf", use_container_width=True)
+            with open(bundle["zip"], "rb") as f:
+                col2.download_button("⬇️ Download Everything (ZIP)", f.read(), file_name=f"expense_reports_{selected_run}.zip",
+                                     mime="application/zip", use_container_width=True)
+        elif status == "failed":
+            st.warning("⚠️ The report bundle could not be built for this run.")
+        else:
+            if status == "missing":
+                schedule_bundle(selected_run)
+            st.info("📦 The PDF/ZIP bundle of this run is being prepared, refresh in a moment.")
     
-    for i, ((filename, _), tab) in enumerate(zip(reports, tabs)):
-        with tab:
-            try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    st.markdown(content)
+        # Create tabs for each report
+        tabs = st.tabs(["📊 Dashboard"] + [name for _, name in REPORTS])
+        with tabs[0]:
+            render_spend_dashboard(selected_run)
+    
+        for i, ((filename, _), tab) in enumerate(zip(REPORTS, tabs[1:])):
+            with tab:
+                try:
+                    with open(run_file(selected_run, filename), 'r', encoding='utf-8') as f:
+                        content = f.read()
+                        st.markdown(content)
                     
-                    # Download button for each report
-                    st.download_button(
-                        f"⬇️ Download {filename}",
-                        content,
-                        file_name=filename,
-                        mime="text/markdown"
-                    )
-            except FileNotFoundError:
-                st.info(f"No report generated yet. Run the analysis to generate {filename}.")
-            except Exception as e:
-                st.error(f"❌ Error loading report {filename}: {str(e)}")
+                        # Download button for each report
+                        st.download_button(
+                            f"⬇️ Download {filename}",
+                            content,
+                            file_name=filename,
+                            mime="text/markdown"
+                        )
+                except FileNotFoundError:
+                    st.info(f"No report generated yet. Run the analysis to generate {filename}.")
+                except Exception as e:
+                    st.error(f"❌ Error loading report {filename}: {str(e)}")
+
+        # Per-model latency and cost profile of the selected run
+        profile_path = run_file(selected_run, "profile.json")
+        if os.path.exists(profile_path):
+            with st.expander("⏱️ Run Profile (per model)"):
+                with open(profile_path, 'r', encoding='utf-8') as f:
+                    st.json(json.load(f))
 
     # Footer
     st.markdown("---")
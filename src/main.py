@@ -1,105 +1,165 @@
 from crewai import Agent, Task, Crew
-from tools.custom_tool import search_knowledge_base
-from src.utils.pdf_converter import convert_markdown_to_pdf
-
-
-analyst = Agent(
-    role="Expense Analyst",
-    goal="Create detailed expense analysis and categorization from invoice data",
-    backstory="""
-        You are a meticulous expense analyst with expertise in financial data analysis
-        and cost categorization. You excel at breaking down expenses, identifying patterns,
-        and providing actionable cost-saving insights.
-    """,
-    verbose=True,
-    tools=[search_knowledge_base],
-)
-reporter = Agent(
-    role="Financial Reporter",
-    goal="Write a clear and structured financial report based on expense analysis",
-    backstory="""
-        You are a skilled financial writer, specializing in turning raw data into
-        professional, structured reports. Your mission is to make financial insights
-        easy to understand and actionable.
-    """,
-    verbose=True,
-)
-compliance_auditor = Agent(
-    role="Compliance Auditor",
-    goal="Verify invoices for errors, fraud, and compliance issues",
-    backstory="""
-        You are a meticulous financial auditor with a keen eye for detail.
-        Your role is to ensure invoices comply with company policies and detect 
-        any inconsistencies, errors, or signs of fraud.
-    """,
-    verbose=True,
-)
-analysis_task = Task(
-    description="""
-        Search, find, and analyze invoices to create a detailed expense drilldown report.
+from tools.custom_tool import search_knowledge_base, batch_search_knowledge_base, access_memory, canonicalize_vendor_names
+from src.utils.run_memory import start_run_memory, release_run_memory
+from src.utils.runs import new_run_id, get_run_dir, run_file
+from src.utils.llm import create_llm
+from src.utils.run_profile import RunProfile
+from src.utils.report_verifier import verify_run
+from src.utils.vendor_index import get_vendor_index
+from src.utils.checkpoints import RunCheckpoints
+from src.utils.report_bundle import build_bundle
+import argparse
+import os
+
+
+def create_crew(run_id, profile, checkpoints):
+    """Create the crew of the tasks left to run (None if all are checkpointed), writing reports into the run directory"""
+    output_dir = get_run_dir(run_id)
+
+    def llm_for(role, task):
+        # Route each agent to a model tier and record its calls in the run profile
+        return create_llm(agent=role, task=task, profile=profile)
+
+    analyst = Agent(
+        role="Expense Analyst",
+        goal="Create detailed expense analysis and categorization from invoice data",
+        llm=llm_for("Expense Analyst", "analysis"),
+        backstory="""
+            You are a meticulous expense analyst with expertise in financial data analysis
+            and cost categorization. You excel at breaking down expenses, identifying patterns,
+            and providing actionable cost-saving insights.
+        """,
+        verbose=True,
+        tools=[search_knowledge_base, batch_search_knowledge_base, access_memory, canonicalize_vendor_names],
+    )
+    reporter = Agent(
+        role="Financial Reporter",
+        goal="Write a clear and structured financial report based on expense analysis",
+        llm=llm_for("Financial Reporter", "write_report"),
+        backstory="""
+            You are a skilled financial writer, specializing in turning raw data into
+            professional, structured reports. Your mission is to make financial insights
+            easy to understand and actionable.
+        """,
+        verbose=True,
+        tools=[access_memory],
+    )
+    compliance_auditor = Agent(
+        role="Compliance Auditor",
+        goal="Verify invoices for errors, fraud, and compliance issues",
+        llm=llm_for("Compliance Auditor", "audit"),
+        backstory="""
+            You are a meticulous financial auditor with a keen eye for detail.
+            Your role is to ensure invoices comply with company policies and detect 
+            any inconsistencies, errors, or signs of fraud.
+        """,
+        verbose=True,
+        tools=[access_memory],
+    )
+    analysis_task = Task(
+        description="""
+            Search, find, and analyze invoices to create a detailed expense drilldown report.
         
-        Steps to follow:
-        1. Group expenses and calculate total spend by vendor.
-        2. Calculate the gross total spend.
-        3. Identify potential cost-saving opportunities.
+            Steps to follow:
+            1. Group expenses and calculate total spend by vendor, merging spellings of the same
+               supplier with the Canonicalize Vendor Names tool.
+            2. Calculate the gross total spend.
+            3. Identify potential cost-saving opportunities.
         
-        The report should include:
-        - An executive summary.
-        - A vendor-wise breakdown.
-        - Recommendations for cost optimization.
-    """,
-    expected_output="""
-        An expense analysis report with clear sections and actionable recommendations in markdown format.
-    """,
-    output_file="expense_report.md",
-    agent=analyst,
-)
-write_report_task = Task(
-    description="""
-        Draft a well-structured financial report based on the expense analysis.
-
-        **Instructions:**
-        - Organize the report with an introduction, detailed analysis, and conclusion.
-        - Summarize expenses by vendor.
-        - Provide strategic cost-saving recommendations.
-        - Format using Markdown with appropriate headings.
-
-        **Suggested Sections:**
-        1. Introduction
-        2. Expense Analysis
-        3. Vendor Breakdown
-        4. Cost-Saving Opportunities
-        5. Conclusion & Recommendations
-    """,
-    expected_output="A professional financial report in Markdown format.",
-    output_file="final_expense_report.md",  # 📄 Save the final structured report
-    agent=reporter,
-)
-audit_task = Task(
-    description="""
-        Review and verify invoices to identify errors, fraud, or compliance issues.
-
-        **Steps:**
-        1. Detect duplicate invoices.
-        2. Check for abnormal amounts or suspicious patterns.
-        3. Verify if all invoices follow company policies.
-        4. Flag any issues and provide recommendations.
-
-        **Expected output:**
-        - A summary of all detected issues.
-        - Recommended actions for correction.
-    """,
-    expected_output="A compliance audit report in Markdown format.",
-    output_file="compliance_audit.md",
-    agent=compliance_auditor,
-)
-# Convert Markdown reports to PDF after CrewAI execution
-md_reports = ["compliance_audit.md", "expense_report.md", "final_expense_report.md"]
-
-for md_file in md_reports:
-    convert_markdown_to_pdf(md_file, output_folder="reports")
+            The report should include:
+            - An executive summary.
+            - A vendor-wise breakdown.
+            - Recommendations for cost optimization.
+        """,
+        expected_output="""
+            An expense analysis report with clear sections and actionable recommendations in markdown format.
+        """,
+        callback=checkpoints.task_callback("analysis", os.path.join(output_dir, "expense_report.md")),
+        agent=analyst,
+    )
+    write_report_task = Task(
+        description="""
+            Draft a well-structured financial report based on the expense analysis.
+
+            **Instructions:**
+            - Organize the report with an introduction, detailed analysis, and conclusion.
+            - Summarize expenses by vendor.
+            - Provide strategic cost-saving recommendations.
+            - Format using Markdown with appropriate headings.
+
+            **Suggested Sections:**
+            1. Introduction
+            2. Expense Analysis
+            3. Vendor Breakdown
+            4. Cost-Saving Opportunities
+            5. Conclusion & Recommendations
+        """,
+        expected_output="A professional financial report in Markdown format.",
+        callback=checkpoints.task_callback("write_report", os.path.join(output_dir, "final_expense_report.md")),  # 📄 Save the final structured report
+        agent=reporter,
+    )
+    audit_task = Task(
+        description="""
+            Review and verify invoices to identify errors, fraud, or compliance issues.
+
+            **Steps:**
+            1. Detect duplicate invoices.
+            2. Check for abnormal amounts or suspicious patterns.
+            3. Verify if all invoices follow company policies.
+            4. Flag any issues and provide recommendations.
+
+            **Expected output:**
+            - A summary of all detected issues.
+            - Recommended actions for correction.
+        """,
+        expected_output="A compliance audit report in Markdown format.",
+        callback=checkpoints.task_callback("audit", os.path.join(output_dir, "compliance_audit.md")),
+        agent=compliance_auditor,
+    )
+
+    # Sequential crew: each task gets the outputs of all previous ones
+    tasks = checkpoints.plan([
+        ("analysis", analysis_task, []),
+        ("write_report", write_report_task, ["analysis"]),
+        ("audit", audit_task, ["analysis", "write_report"]),
+    ])
+    if not tasks:
+        return None
+    return Crew(agents=[analyst, reporter, compliance_auditor], tasks=tasks, verbose=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the expense analysis crew.")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Resume a failed or interrupted run from its last completed task")
+    args, _ = parser.parse_known_args()
+
+    run_id = args.resume or new_run_id()
+    output_dir = get_run_dir(run_id)
+    # A resumed run adds to the calls, cost and timings of the tasks already done
+    profile = RunProfile.load(run_id, run_file(run_id, "profile.json"))
+    checkpoints = RunCheckpoints(run_id)
+
+    start_run_memory(run_id, path=run_file(run_id, "memory.json"))
+    try:
+        crew = create_crew(run_id, profile, checkpoints)
+        if crew:
+            crew.kickoff()
+        else:
+            print(f"✅ All tasks of run {run_id} are already completed")
+    finally:
+        release_run_memory(run_id)
+        get_vendor_index().save()
+        profile.save(run_file(run_id, "profile.json"))
+
+    # Deterministic numeric cross-check of the generated reports
+    verification = verify_run(run_id)
+    print(f"🔎 Cross-check: {verification['checked']} figures checked, {len(verification['mismatches'])} mismatches")
+
+    # Single PDF (with table of contents) and ZIP of all the reports
+    build_bundle(run_id)
+
+    print(f"📁 Run {run_id} saved in {output_dir} (resume with: python src/main.py --resume {run_id})")
+
 
 if __name__ == "__main__":
-    crew = Crew(agents=[analyst, reporter, compliance_auditor], 
-    tasks=[analysis_task, write_report_task, audit_task], verbose=True)
-    crew.kickoff()
\ No newline at end of file
+    main()
@@ -1,18 +1,142 @@
 from needle.v1 import NeedleClient
 from crewai.tools import tool
+from src.utils.currency import currency_note
+from src.utils.knowledge_search import batch_search, format_chunks, search_with_memory
+from src.utils.run_memory import active_run_id, get_run_memory
+from src.utils.spend_cube import get_cube
+from src.utils.vendor_index import get_vendor_index
+
+# access_memory filter value matching entries of every kind
+ALL_KINDS = "all"
+
 
 @tool("Search Knowledge Base")
 def search_knowledge_base(query: str) -> str:
     """
     Retrieve information from your knowledge base containing unstructured data such as
     invoices, reports, emails, and more.
-    
+
     Args:
         query (str): The search query to find relevant invoice data.
     """
     ndl = NeedleClient()
-    return ndl.collections.search(
-        collection_id="clt_01JKBAHP3419YYWZ7CQJ59S60N",  # Replace with your actual collection ID
-        text=query,
-        top_k=20,
-    )
\ No newline at end of file
+    return format_chunks(search_with_memory(ndl, get_run_memory(), query))
+
+
+@tool("Batch Search Knowledge Base")
+def batch_search_knowledge_base(queries: list) -> str:
+    """
+    Run several knowledge base searches at once (e.g. one per vendor or topic) and
+    return the merged, de-duplicated chunks. Prefer this over calling
+    "Search Knowledge Base" repeatedly. Queries that fail are listed in the result.
+
+    Args:
+        queries (list): The search queries to run.
+    """
+    # The memory is resolved here: worker threads do not see the active run
+    return batch_search(NeedleClient(), get_run_memory(), queries)
+
+
+@tool("Access Memory")
+def access_memory(action: str, key: str = "", content: str = "", query: str = "", kind: str = ALL_KINDS) -> str:
+    """
+    Read and write the shared memory of the current analysis run. Check it before
+    searching the knowledge base: chunks already retrieved by other agents, computed
+    figures and conclusions are stored here.
+
+    Args:
+        action (str): "store", "get", "search" or "list".
+        key (str): Entry key for "store" and "get" (e.g. "figure:total_spend").
+        content (str): Value to store for "store".
+        query (str): Words to look for with "search".
+        kind (str): "figure", "conclusion" or "note" for "store" (default "note"); filter for
+            "search" and "list", where "all" or empty matches every kind.
+    """
+    memory = get_run_memory()
+    action = action.strip().lower()
+    kind = kind.strip().lower()
+    kind_filter = None if kind in ("", ALL_KINDS) else kind
+    if action == "store":
+        if not key:
+            return "A key is required to store an entry."
+        memory.put(key, content, kind=kind_filter or "note")
+        return f"Stored {key}."
+    if action == "get":
+        entry = memory.get(key)
+        return entry["content"] if entry else f"No entry for {key}."
+    if action == "search":
+        entries = memory.search(query or key, kind=kind_filter)
+        if not entries:
+            return "No matching entries in memory."
+        return "\n".join(f"\n[{e['key']}] ({e['kind']})\n{e['content']}" for e in entries)
+    if action == "list":
+        entries = memory.entries(kind=kind_filter)
+        return "\n".join(f"{e['key']} ({e['kind']})" for e in entries) or "Memory is empty."
+    return f"Unknown action {action!r}. Use store, get, search or list."
+
+
+@tool("Query Spend Cube")
+def query_spend_cube(group_by: str = "month", vendor: str = "", category: str = "", start_month: str = "", end_month: str = "") -> str:
+    """
+    Answer spend trend questions from the precomputed vendor x month x category
+    aggregates of the uploaded invoices, without searching raw documents.
+
+    Args:
+        group_by (str): Comma-separated dimensions among "vendor", "month" and "category"
+            (e.g. "month" for a trend, "vendor,month" per vendor), "total" for the grand
+            total, or "anomalies" for unusual vendor-months.
+        vendor (str): Restrict to this vendor.
+        category (str): Restrict to this category.
+        start_month (str): First month, YYYY-MM.
+        end_month (str): Last month, YYYY-MM.
+    """
+    cube = get_cube(active_run_id())
+    if cube is None:
+        return "No invoice aggregates are available for this run."
+    filters = {
+        "vendor": (get_vendor_index().lookup(vendor) or vendor) if vendor else None,
+        "category": category or None,
+        "start_month": start_month or None,
+        "end_month": end_month or None,
+    }
+    group_by = group_by.strip().lower()
+    try:
+        if group_by == "anomalies":
+            anomalies = cube.anomalies(**filters)
+            if not anomalies:
+                return "No anomalies found."
+            lines = ["| Vendor | Month | Spend | Vendor median |", "|---|---|---|---|"]
+            lines += [f"| {a['vendor']} | {a['month']} | {a['total']:,.2f} | {a['median']:,.2f} |" for a in anomalies]
+            return "\n".join(lines)
+        by = () if group_by == "total" else tuple(d.strip() for d in group_by.split(",") if d.strip())
+        result = cube.rollup(by, **filters)
+    except ValueError as e:
+        return f"Invalid query: {e}"
+    note = currency_note(cube.reporting, cube.unconverted, cube.stale)
+    note = f"\nNote: {note}" if note else ""
+    if not by:
+        return f"Total spend: {result[()]:,.2f} {cube.reporting}{note}"
+    rows = sorted(result.items()) if "month" in by else sorted(result.items(), key=lambda item: -item[1])
+    lines = [f"| {' | '.join(by)} | Spend ({cube.reporting}) |", "|" + "---|" * (len(by) + 1)]
+    for key, total in rows:
+        labels = key if isinstance(key, tuple) else (key,)
+        lines.append(f"| {' | '.join(labels)} | {total:,.2f} |")
+    return "\n".join(lines) + note
+
+
+@tool("Canonicalize Vendor Names")
+def canonicalize_vendor_names(names: list) -> str:
+    """
+    Map vendor names as written on invoices to canonical vendor names, so that spellings
+    of the same supplier ("ACME Inc.", "Acme Incorporated", "ACME INC") are grouped
+    together. Use it before grouping or totalling expenses by vendor.
+
+    Args:
+        names (list): Vendor names as found in the invoices.
+    """
+    mapping = get_vendor_index().canonicalize(str(name) for name in names if str(name).strip())
+    if not mapping:
+        return "No vendor names given."
+    lines = ["| Name on invoice | Canonical vendor |", "|---|---|"]
+    lines += [f"| {name} | {canonical} |" for name, canonical in mapping.items()]
+    return "\n".join(lines)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import time
+
+from src.utils.run_memory import get_run_memory
+from src.utils.runs import atomic_write, get_run_dir, save_task_output
+
+CHECKPOINT_DIR = "checkpoints"
+INPUTS_FILE = "inputs.json"
+
+
+class RunStopped(RuntimeError):
+    """Raised before a write when a run must stop, e.g. its job was handed to another worker."""
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of JSON-serializable parts."""
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def files_fingerprint(paths) -> str:
+    """Hash of the names and contents of input files (missing files count as changed)."""
+    digests = []
+    for path in sorted(str(p) for p in paths or []):
+        digest = hashlib.sha256()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        digests.append((os.path.basename(path), digest.hexdigest()))
+    return fingerprint(digests)
+
+
+class RunCheckpoints:
+    """
+    Per-task checkpoints of a run, saved under runs/<run_id>/checkpoints/.
+
+    Each completed task stores its output, the fingerprint of its inputs (run inputs,
+    task definition and upstream fingerprints) and the upstream tasks it was given as
+    context; the run memory, which holds the tool results, is saved alongside. When a
+    run is resumed, tasks whose fingerprint is unchanged are skipped and only the
+    failed, interrupted or changed tasks and their downstream tasks run again.
+
+    Args:
+        run_id (str): Identifier of the run.
+        stop (threading.Event): Set when the run must stop; every write of the run
+            checks it first and raises RunStopped.
+    """
+
+    def __init__(self, run_id: str, stop=None):
+        self.run_id = run_id
+        self.stop = stop
+        self.folder = os.path.join(get_run_dir(run_id), CHECKPOINT_DIR)
+        self._fingerprints = {}
+        self._upstream = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.folder, f"{name}.json")
+
+    def load(self, name: str):
+        try:
+            with open(self._path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop is not None and self.stop.is_set()
+
+    def check_stop(self):
+        """Raises RunStopped if the run must stop; called before writing to the run folder."""
+        if self.stopped:
+            raise RunStopped(f"Run {self.run_id} was stopped")
+
+    def save(self, name: str, output: str, report_path: str = None):
+        """Records a completed task, then persists the run memory (tool results)."""
+        self.check_stop()
+        checkpoint = {
+            "task": name,
+            "fingerprint": self._fingerprints.get(name),
+            "context": self._upstream.get(name, []),
+            "output": output,
+            "report_path": report_path,
+            "completed_at": time.time(),
+        }
+        atomic_write(self._path(name), json.dumps(checkpoint, ensure_ascii=False, indent=2))
+        get_run_memory(self.run_id).save()
+
+    def completed(self) -> list:
+        """Names of the tasks with a checkpoint."""
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(f[:-5] for f in os.listdir(self.folder) if f.endswith(".json"))
+
+    def task_callback(self, name: str, report_path: str):
+        """
+        Returns a CrewAI task callback that saves the report, stores the output in the run
+        memory as the task's conclusion for downstream agents, and checkpoints the task.
+
+        Args:
+            name (str): Task name.
+            report_path (str): Markdown report written by the task.
+        """
+        save_report = save_task_output(report_path)
+
+        def callback(output):
+            # Raising here makes CrewAI abort the crew before the next task
+            self.check_stop()
+            save_report(output)
+            content = getattr(output, "raw", None) or getattr(output, "raw_output", None) or str(output)
+            get_run_memory(self.run_id).put(f"conclusion:{name}", content, kind="conclusion",
+                                            agent=getattr(output, "agent", None))
+            self.save(name, content, report_path)
+        return callback
+
+    # ------------------------------------------------------------------- inputs
+
+    def save_inputs(self, inputs: dict):
+        self.check_stop()
+        atomic_write(os.path.join(get_run_dir(self.run_id), INPUTS_FILE), json.dumps(inputs, indent=2, default=str))
+
+    def load_inputs(self) -> dict:
+        path = os.path.join(get_run_dir(self.run_id), INPUTS_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # --------------------------------------------------------------------- plan
+
+    def plan(self, tasks, inputs: str = "") -> list:
+        """
+        Returns the tasks that still have to run, in order.
+
+        A task is skipped when its checkpoint was made with the same fingerprint and
+        none of its upstream tasks runs again. Skipped tasks get their report restored
+        from the checkpoint, and pending tasks receive the checkpointed outputs of their
+        skipped upstream tasks in their description.
+
+        Args:
+            tasks (list): (name, Task, upstream task names) tuples, in execution order.
+            inputs (str): Fingerprint of the run inputs (e.g. the invoice files).
+        """
+        pending = []
+        pending_names = set()
+        checkpoints = {}
+        for name, task, upstream in tasks:
+            agent = getattr(task.agent, "role", None)
+            self._fingerprints[name] = fingerprint(
+                inputs, task.description, task.expected_output, agent,
+                [self._fingerprints.get(u) for u in upstream],
+            )
+            self._upstream[name] = list(upstream)
+            checkpoint = self.load(name)
+            fresh = checkpoint is not None and checkpoint.get("fingerprint") == self._fingerprints[name]
+            if fresh and not pending_names.intersection(upstream):
+                checkpoints[name] = checkpoint
+                if checkpoint.get("report_path"):
+                    self.check_stop()
+                    atomic_write(checkpoint["report_path"], checkpoint["output"])
+                continue
+
+            done = [u for u in upstream if u in checkpoints]
+            if done:
+                context = "\n\n".join(f"### Result of the {u} step\n\n{checkpoints[u]['output']}" for u in done)
+                task.description = f"{task.description}\n\nResults of the completed steps:\n\n{context}"
+            pending.append(task)
+            pending_names.add(name)
+        return pending
+
+    def last_output(self, names) -> str:
+        """
+        Output of the last checkpointed task, used when nothing was left to run.
+
+        Args:
+            names (list): Task names, newest (last in execution order) first.
+        """
+        for name in names:
+            checkpoint = self.load(name)
+            if checkpoint:
+                return checkpoint["output"]
+        return None
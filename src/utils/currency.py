@@ -0,0 +1,245 @@
+import csv
+import os
+import threading
+from datetime import date
+
+import numpy as np
+
+from src.utils.invoice_store import AMOUNT_SCALE, NO_DATE
+
+# Local rate table: CSV with columns date (YYYY-MM-DD), currency, rate, where rate is
+# the number of currency units per 1 BASE_CURRENCY unit on that date. Without it,
+# amounts are kept in their own currency.
+RATES_PATH = os.getenv("FX_RATES_PATH", os.path.join("rates", "fx_rates.csv"))
+# Invoices dated more than this many days after the last rate of their currency (or
+# before its first rate) are converted with a stale rate and flagged
+MAX_RATE_AGE_DAYS = int(os.getenv("FX_MAX_RATE_AGE_DAYS", "31"))
+BASE_CURRENCY = "USD"
+REPORTING_CURRENCY = os.getenv("REPORTING_CURRENCY", "USD")
+
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£"}
+
+
+def format_amount(amount: float, currency: str = REPORTING_CURRENCY) -> str:
+    """Formats an amount with its currency symbol (or ISO code)."""
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    return f"{symbol}{amount:,.2f}" if symbol else f"{amount:,.2f} {currency}"
+
+
+def currency_note(reporting: str, unconverted=(), stale=()) -> str:
+    """Warning sentence for totals that mix currencies or rely on stale exchange rates ("" if neither)."""
+    notes = []
+    if unconverted:
+        notes.append(f"Amounts in {', '.join(sorted(unconverted))} have no exchange rates and are not converted "
+                     f"to {reporting}.")
+    if stale:
+        notes.append(f"Some amounts in {', '.join(sorted(stale))} are dated outside the exchange rate table and "
+                     f"are converted with the nearest available rate.")
+    return " ".join(notes)
+
+
+class RateTable:
+    """
+    Date-indexed exchange rates, stored as one sorted array of dates per currency.
+
+    Conversion factors are looked up with an as-of join (latest rate on or before the
+    invoice date) and memoized per (currency, date, reporting currency), so repeated
+    runs in the same process reuse them.
+
+    Args:
+        rates (dict): currency -> (date ordinals, rates) arrays, sorted by date.
+    """
+
+    def __init__(self, rates: dict):
+        self._rates = {
+            currency: (np.asarray(ordinals, dtype=np.int32), np.asarray(values, dtype=np.float64))
+            for currency, (ordinals, values) in rates.items()
+        }
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_csv(cls, path: str = RATES_PATH):
+        rows = {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                currency = row["currency"].strip().upper()
+                rows.setdefault(currency, []).append((date.fromisoformat(row["date"].strip()).toordinal(), float(row["rate"])))
+        rates = {}
+        for currency, values in rows.items():
+            values.sort()
+            rates[currency] = ([d for d, _ in values], [r for _, r in values])
+        return cls(rates)
+
+    @property
+    def currencies(self):
+        return {BASE_CURRENCY, *self._rates}
+
+    def _as_of(self, currency: str, ordinals: np.ndarray) -> np.ndarray:
+        """Vectorized as-of lookup of the rates of one currency for many dates."""
+        if currency == BASE_CURRENCY:
+            return np.ones(len(ordinals), dtype=np.float64)
+        if currency not in self._rates:
+            raise ValueError(f"No exchange rates for currency {currency!r}")
+        dates, values = self._rates[currency]
+        # Undated invoices use the latest rate; dates before the table use the first one
+        # (flagged by out_of_range)
+        lookup = np.where(ordinals == NO_DATE, np.iinfo(np.int32).max, ordinals)
+        index = np.searchsorted(dates, lookup, side="right") - 1
+        return values[np.clip(index, 0, len(dates) - 1)]
+
+    def out_of_range(self, currency: str, ordinals, reporting: str = REPORTING_CURRENCY,
+                     max_age_days: int = MAX_RATE_AGE_DAYS) -> np.ndarray:
+        """
+        Flags the dates whose conversion uses a rate from outside the table: before the
+        first rate, or more than max_age_days after the last one, of either currency.
+        Undated invoices are not flagged.
+        """
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        flagged = np.zeros(len(ordinals), dtype=bool)
+        for code in {currency, reporting} - {BASE_CURRENCY}:
+            dates = self._rates[code][0]
+            flagged |= (ordinals < dates[0]) | (ordinals > int(dates[-1]) + max_age_days)
+        return flagged & (ordinals != NO_DATE)
+
+    def factors(self, currency: str, ordinals, reporting: str = REPORTING_CURRENCY) -> np.ndarray:
+        """
+        Returns the factors converting `currency` amounts on the given dates to `reporting`.
+
+        Args:
+            currency (str): Source currency.
+            ordinals (array): Invoice dates as date ordinals (NO_DATE when unknown).
+            reporting (str): Reporting currency.
+        """
+        ordinals = np.asarray(ordinals, dtype=np.int32)
+        if currency == reporting:
+            return np.ones(len(ordinals), dtype=np.float64)
+        unique, inverse = np.unique(ordinals, return_inverse=True)
+        result = np.empty(len(unique), dtype=np.float64)
+        with self._lock:
+            cached = [self._memo.get((currency, int(d), reporting)) for d in unique]
+        missing = np.array([f is None for f in cached], dtype=bool)
+        if missing.any():
+            days = unique[missing]
+            computed = self._as_of(reporting, days) / self._as_of(currency, days)
+            with self._lock:
+                for day, factor in zip(days.tolist(), computed.tolist()):
+                    self._memo[(currency, day, reporting)] = factor
+            result[missing] = computed
+        if (~missing).any():
+            result[~missing] = [f for f in cached if f is not None]
+        return result[inverse]
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+_warned = set()
+
+
+def _warn_once(message: str):
+    if message not in _warned:
+        _warned.add(message)
+        print(f"⚠️ {message}")
+
+
+def get_rate_table(path: str = None):
+    """
+    Returns the cached rate table for a CSV file, reloading it only when the file changes.
+
+    Args:
+        path (str): Rate table, RATES_PATH by default.
+
+    Returns:
+        RateTable: The table, or None (with a warning) if the file does not exist.
+    """
+    path = path or RATES_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except FileNotFoundError:
+        _warn_once(f"No exchange rate table at {path}: amounts are kept in their own currency")
+        return None
+    with _tables_lock:
+        cached = _tables.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _tables[path] = (mtime, RateTable.from_csv(path))
+        return cached[1]
+
+
+def normalize_cents(currencies, ordinals, amounts, currency_names, reporting: str = REPORTING_CURRENCY, table: RateTable = None,
+                    unconverted: set = None, stale: set = None) -> np.ndarray:
+    """
+    Converts a batch of amounts to the reporting currency in one vectorized pass.
+
+    Amounts in a currency the rate table cannot convert (or all foreign amounts, when
+    there is no rate table) are kept in their own currency, with a warning, and their
+    currency is added to `unconverted` so totals can be flagged as mixed. Amounts dated
+    outside the table's rates (see RateTable.out_of_range) are converted with the
+    nearest rate, with a warning, and their currency is added to `stale`.
+
+    Args:
+        currencies (array): Dictionary-encoded currency codes.
+        ordinals (array): Invoice dates as date ordinals.
+        amounts (array): Amounts in integer cents of their own currency.
+        currency_names (list): Currency code -> ISO currency name.
+        reporting (str): Reporting currency.
+        table (RateTable): Rate table (the local cached table by default).
+        unconverted (set): Collects the currencies left unconverted.
+        stale (set): Collects the currencies converted with rates outside the table's dates.
+
+    Returns:
+        np.ndarray: Amounts in integer cents of the reporting currency.
+    """
+    currencies = np.asarray(currencies)
+    amounts = np.asarray(amounts, dtype=np.int64)
+    if all(currency_names[code] == reporting for code in np.unique(currencies)):
+        return amounts.copy()
+    table = table or get_rate_table()
+    ordinals = np.asarray(ordinals)
+    factors = np.ones(len(amounts), dtype=np.float64)
+    for code in np.unique(currencies):
+        currency = currency_names[code]
+        if currency == reporting:
+            continue
+        if table is None or not {currency, reporting} <= table.currencies:
+            if table is not None:
+                _warn_once(f"No exchange rates from {currency} to {reporting}: {currency} amounts are not converted")
+            if unconverted is not None:
+                unconverted.add(currency)
+            continue
+        mask = currencies == code
+        factors[mask] = table.factors(currency, ordinals[mask], reporting)
+        if table.out_of_range(currency, ordinals[mask], reporting).any():
+            _warn_once(f"Some {currency} invoices are dated outside the exchange rate table: "
+                       f"they are converted with the nearest {currency}/{reporting} rate")
+            if stale is not None:
+                stale.add(currency)
+    return np.rint(amounts * factors).astype(np.int64)
+
+
+def vendor_totals_cents_in(store, reporting: str = REPORTING_CURRENCY, table: RateTable = None,
+                           unconverted: set = None, stale: set = None) -> np.ndarray:
+    """
+    Returns total cents per vendor code of an InvoiceStore, in the reporting currency.
+
+    Args:
+        store (InvoiceStore): Loaded invoices.
+        reporting (str): Reporting currency.
+        table (RateTable): Rate table (the local cached table by default).
+        unconverted (set): Collects the currencies left unconverted (see normalize_cents).
+        stale (set): Collects the currencies converted with stale rates (see normalize_cents).
+    """
+    totals = np.zeros(len(store.vendors), dtype=np.int64)
+    for chunk in store.iter_chunks():
+        cents = normalize_cents(chunk["currency"], chunk["date"], chunk["amount"], store.currencies.values, reporting, table,
+                                unconverted, stale)
+        np.add.at(totals, chunk["vendor"], cents)
+    return totals
+
+
+def vendor_totals_in(store, reporting: str = REPORTING_CURRENCY, table: RateTable = None, unconverted: set = None,
+                     stale: set = None) -> dict:
+    """Returns vendor -> total expense of an InvoiceStore, converted to the reporting currency."""
+    totals = vendor_totals_cents_in(store, reporting, table, unconverted, stale)
+    return {vendor: int(cents) / AMOUNT_SCALE for vendor, cents in zip(store.vendors.values, totals)}
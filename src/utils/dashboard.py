@@ -0,0 +1,94 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+from src.utils.currency import format_amount
+from src.utils.runs import run_file
+from src.utils.spend_cube import SPEND_CUBE_FILE, UNKNOWN_MONTH, flag_anomalies, month_label
+from src.utils.spend_frames import (
+    DRILL_DOWN_ROWS, build_spend_frames, drill_down, filter_frame, monthly_trend, vendor_breakdown,
+)
+
+
+# Shared across sessions and never mutated, so frames are not copied on each rerun
+@st.cache_resource(show_spinner="Loading spend cube...", max_entries=8)
+def load_spend_frames(path: str, mtime: float):
+    """
+    Cached build_spend_frames of a persisted spend cube.
+
+    Args:
+        path (str): Spend cube file of a run.
+        mtime (float): Modification time of the file, so a rewritten cube is reloaded.
+    """
+    return build_spend_frames(path)
+
+
+def render_spend_dashboard(run_id: str):
+    """
+    Interactive spend dashboard of a run: vendor breakdown, monthly trends, anomalies and
+    invoice drill-down. Reads the run's persisted spend cube only; no agent is re-run.
+    """
+    path = run_file(run_id, SPEND_CUBE_FILE)
+    if not os.path.exists(path):
+        st.info("No spend data for this run. Upload CSV or Excel invoices to enable the dashboard.")
+        return
+    cells, invoices, currency, unconverted, stale = load_spend_frames(path, os.path.getmtime(path))
+    if cells.empty:
+        st.info("The uploaded invoice files contain no amounts.")
+        return
+    if unconverted:
+        st.warning(f"⚠️ No exchange rates for {', '.join(unconverted)}: those amounts are shown unconverted in the {currency} totals.")
+    if stale:
+        st.warning(f"⚠️ Some {', '.join(stale)} invoices are dated outside the exchange rate table: they are converted "
+                   "with the nearest available rate.")
+
+    # Filters
+    col1, col2, col3 = st.columns(3)
+    vendors = col1.multiselect("Vendors", list(cells["vendor"].cat.categories), key=f"dash-vendors-{run_id}")
+    categories = col2.multiselect("Categories", list(cells["category"].cat.categories), key=f"dash-categories-{run_id}")
+    months = sorted(int(m) for m in cells["month"].unique() if m != UNKNOWN_MONTH)
+    month_range = None
+    if len(months) > 1:
+        start, end = col3.select_slider(
+            "Months", options=months, value=(months[0], months[-1]),
+            format_func=month_label, key=f"dash-months-{run_id}"
+        )
+        # Undated invoices stay visible until the range is narrowed
+        if (start, end) != (months[0], months[-1]):
+            month_range = (start, end)
+
+    view = filter_frame(cells, vendors, categories, month_range)
+    metric1, metric2, metric3 = st.columns(3)
+    metric1.metric("Total spend", format_amount(view["total"].sum(), currency))
+    metric2.metric("Invoices", f"{int(view['invoices'].sum()):,}")
+    metric3.metric("Vendors", view["vendor"].nunique())
+
+    # Vendor breakdown and monthly trend by category
+    left, right = st.columns(2)
+    with left:
+        st.subheader("Spend by vendor")
+        st.bar_chart(vendor_breakdown(view))
+    with right:
+        st.subheader("Monthly trend")
+        trend = monthly_trend(view)
+        if trend.empty:
+            st.info("No dated invoices in this selection.")
+        else:
+            st.line_chart(trend)
+
+    st.subheader("Anomalies")
+    vendor_months = view.groupby(["vendor", "month"], observed=True)["total"].sum()
+    anomalies = flag_anomalies({(vendor, month_label(month)): total for (vendor, month), total in vendor_months.items()})
+    if anomalies:
+        st.dataframe(pd.DataFrame(anomalies), use_container_width=True, hide_index=True)
+    else:
+        st.success("No unusual vendor-month spend in this selection.")
+
+    # Drill-down to the invoices of the selection
+    st.subheader("Invoices")
+    shown = sorted(view["vendor"].unique().tolist())
+    vendor = st.selectbox("Vendor", ["All vendors"] + shown, key=f"dash-drill-{run_id}")
+    rows, matching = drill_down(invoices, [vendor] if vendor != "All vendors" else vendors, categories, month_range)
+    st.caption(f"{matching:,} invoices (showing up to {DRILL_DOWN_ROWS:,}), totals in {currency}")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
@@ -0,0 +1,110 @@
+import os
+import numpy as np
+import pandas as pd
+from src.utils.invoice_store import AMOUNT_SCALE, NO_DATE, InvoiceStore, to_cents
+from src.utils.vendor_index import VendorIndex, get_vendor_index
+
+TABULAR_EXTENSIONS = {".csv", ".xlsx", ".xls"}
+
+# datetime64 counts days from 1970-01-01, which is date ordinal 719163
+_EPOCH_ORDINAL = 719163
+
+# Accepted column names (lower-case) for each invoice field
+COLUMN_ALIASES = {
+    "vendor": ("vendor", "supplier", "vendor_name", "supplier_name", "payee", "fournisseur"),
+    "amount": ("amount", "total", "total_amount", "amount_total", "montant", "montant_ttc"),
+    "currency": ("currency", "devise"),
+    "date": ("date", "invoice_date", "date_facture"),
+    "category": ("category", "expense_category", "categorie", "catégorie"),
+}
+
+
+def _match_columns(columns):
+    lookup = {str(c).strip().lower(): c for c in columns}
+    found = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in lookup:
+                found[field] = lookup[alias]
+                break
+    return found
+
+
+def _amounts_to_cents(amounts: pd.Series):
+    """Returns (cents, valid mask) for an amount column; malformed amounts are invalid."""
+    if pd.api.types.is_numeric_dtype(amounts):
+        values = amounts.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.isfinite(values)
+        return np.rint(np.where(valid, values, 0) * AMOUNT_SCALE).astype(np.int64), valid
+    cents = np.zeros(len(amounts), dtype=np.int64)
+    valid = np.zeros(len(amounts), dtype=bool)
+    for i, amount in enumerate(amounts.tolist()):
+        if amount is None or pd.isna(amount):
+            continue
+        try:
+            cents[i] = to_cents(amount)
+            valid[i] = True
+        except ValueError:
+            pass
+    return cents, valid
+
+
+def _date_ordinals(dates: pd.Series) -> np.ndarray:
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]")
+    return np.where(np.isnat(days), NO_DATE, days.astype(np.int64) + _EPOCH_ORDINAL)
+
+
+def load_invoice_files(paths, store: InvoiceStore = None, default_currency: str = "USD",
+                       vendor_index: VendorIndex = None) -> InvoiceStore:
+    """
+    Loads tabular invoice files (CSV, Excel) into an InvoiceStore.
+
+    Each file is appended column by column, so aggregates subscribed to the store (see
+    SpendCube) are updated chunk by chunk during the load, without a second pass.
+
+    Files without vendor and amount columns, and non-tabular files (PDF, images, text),
+    are skipped: those are only searched through the knowledge base. Rows whose amount
+    cannot be parsed are skipped and counted in `store.skipped_rows`.
+
+    Args:
+        paths (list): Uploaded invoice files.
+        store (InvoiceStore): Store to append to (a new one by default).
+        default_currency (str): Currency of rows without a currency column.
+        vendor_index (VendorIndex): Index mapping vendor spellings to canonical vendors
+            (the shared alias table by default).
+    """
+    store = store if store is not None else InvoiceStore()
+    vendor_index = vendor_index if vendor_index is not None else get_vendor_index()
+    for path in paths:
+        extension = os.path.splitext(str(path))[1].lower()
+        if extension not in TABULAR_EXTENSIONS:
+            continue
+        df = pd.read_csv(path) if extension == ".csv" else pd.read_excel(path)
+        columns = _match_columns(df.columns)
+        if "vendor" not in columns or "amount" not in columns:
+            print(f"⚠️ Skipping {path}: no vendor/amount columns")
+            continue
+
+        amounts = df[columns["amount"]]
+        cents, valid = _amounts_to_cents(amounts)
+        malformed = int((~valid & amounts.notna().to_numpy()).sum())
+        if malformed:
+            print(f"⚠️ Skipped {malformed} rows of {path} with a malformed amount")
+        store.skipped_rows += malformed
+        df = df[valid]
+
+        vendors = df[columns["vendor"]].fillna("Unknown").astype(str).str.strip()
+        # Each distinct spelling is resolved once, then mapped over the column
+        vendors = vendors.map(vendor_index.canonicalize(vendors.unique()))
+        currencies = (df[columns["currency"]].fillna(default_currency).astype(str).str.strip().str.upper()
+                      if "currency" in columns else pd.Series(default_currency, index=df.index))
+        dates = (pd.to_datetime(df[columns["date"]], errors="coerce")
+                 if "date" in columns else pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]"))
+        categories = ([None if pd.isna(c) else str(c).strip() or None for c in df[columns["category"]]]
+                      if "category" in columns else [None] * len(df))
+
+        store.extend_columns(vendors.tolist(), cents[valid], currencies.tolist(), _date_ordinals(dates), categories)
+    # Seal the tail so subscribers have seen every row once the load returns
+    store.flush()
+    vendor_index.save()
+    return store
@@ -0,0 +1,382 @@
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_right
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Amounts are stored as fixed-point integers (cents) to avoid float drift in totals
+AMOUNT_SCALE = 100
+
+# Column name -> (array typecode, numpy dtype)
+COLUMNS = {
+    "vendor": ("i", np.int32),
+    "currency": ("i", np.int32),
+    "amount": ("q", np.int64),
+    "date": ("i", np.int32),
+    "category": ("i", np.int32),
+}
+
+NO_DATE = 0
+UNCATEGORIZED = "Uncategorized"
+
+
+# Characters kept when parsing an amount string: digits, separators and signs
+_AMOUNT_NOISE_RE = re.compile(r"[^0-9.,()+-]")
+_GROUPED_RE = re.compile(r"[0-9]{1,3}([.,])[0-9]{3}(?:\1[0-9]{3})*")
+
+
+def parse_amount(text: str) -> Decimal:
+    """
+    Parses an amount string written with any currency symbol or code and local separators.
+
+    "$1,234.56", "€1 234,56", "1.234,56 EUR", "CHF 1'234.50" and "(12.00)" are accepted.
+    A separator is read as the decimal mark when it is the last of both kinds, or when it
+    is the only one and is not followed by exactly three digits.
+
+    Raises:
+        ValueError: If the text holds no valid amount.
+    """
+    cleaned = _AMOUNT_NOISE_RE.sub("", text)
+    negative = cleaned.startswith("-") or (cleaned.startswith("(") and cleaned.endswith(")"))
+    digits = cleaned.strip("()+-")
+    if not digits or not re.fullmatch(r"[0-9.,]*[0-9][0-9.,]*", digits):
+        raise ValueError(f"Invalid amount: {text!r}")
+
+    last_dot, last_comma = digits.rfind("."), digits.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        decimal_mark = "." if last_dot > last_comma else ","
+    elif last_dot >= 0 or last_comma >= 0:
+        mark = "." if last_dot >= 0 else ","
+        integer, _, fraction = digits.rpartition(mark)
+        thousands = digits.count(mark) > 1 or (len(fraction) == 3 and integer.strip("0") != "")
+        decimal_mark = None if thousands else mark
+    else:
+        decimal_mark = None
+
+    if decimal_mark:
+        integer, _, fraction = digits.rpartition(decimal_mark)
+    else:
+        integer, fraction = digits, ""
+    grouped = not re.fullmatch(r"[0-9]*", integer)
+    if (grouped and not _GROUPED_RE.fullmatch(integer)) or not re.fullmatch(r"[0-9]*", fraction):
+        raise ValueError(f"Invalid amount: {text!r}")
+    integer = integer.replace(".", "").replace(",", "")
+    value = Decimal(f"{integer or 0}.{fraction or 0}")
+    return -value if negative else value
+
+
+def to_cents(amount) -> int:
+    """
+    Converts an amount (number, Decimal or string) to integer cents.
+
+    Raises:
+        ValueError: If the amount is not a finite number.
+    """
+    if isinstance(amount, str):
+        amount = parse_amount(amount)
+    if isinstance(amount, Decimal):
+        if not amount.is_finite():
+            raise ValueError(f"Invalid amount: {amount!r}")
+    if isinstance(amount, Decimal):
+        return int((amount * AMOUNT_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    amount = float(amount)
+    if amount != amount or amount in (float("inf"), float("-inf")):
+        raise ValueError(f"Invalid amount: {amount!r}")
+    return int(round(amount * AMOUNT_SCALE))
+
+
+class Dictionary:
+    """Dictionary encoding for repeated strings such as vendor or currency names."""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+
+class InvoiceRow:
+    """Lightweight read-only view over a single row of an InvoiceStore."""
+
+    __slots__ = ("_store", "_chunk", "_offset")
+
+    def __init__(self, store, chunk, offset):
+        self._store = store
+        self._chunk = chunk
+        self._offset = offset
+
+    def _get(self, column):
+        return int(self._chunk[column][self._offset])
+
+    @property
+    def vendor(self) -> str:
+        return self._store.vendors.values[self._get("vendor")]
+
+    @property
+    def currency(self) -> str:
+        return self._store.currencies.values[self._get("currency")]
+
+    @property
+    def amount_cents(self) -> int:
+        return self._get("amount")
+
+    @property
+    def amount(self) -> float:
+        return self._get("amount") / AMOUNT_SCALE
+
+    @property
+    def category(self) -> str:
+        return self._store.categories.values[self._get("category")]
+
+    @property
+    def date(self):
+        ordinal = self._get("date")
+        return date.fromordinal(ordinal) if ordinal != NO_DATE else None
+
+    def __repr__(self):
+        return (f"InvoiceRow(vendor={self.vendor!r}, amount={self.amount:.2f}, currency={self.currency!r}, "
+                f"date={self.date}, category={self.category!r})")
+
+
+class InvoiceStore:
+    """
+    Columnar in-memory store for invoice lines.
+
+    Rows are appended into typed array buffers and sealed into fixed-size numpy
+    chunks. Once sealed chunks exceed the memory budget, new chunks are spilled to
+    memory-mapped files so multi-million-line histories fit in a single worker.
+
+    Args:
+        memory_budget (int): Maximum bytes of sealed chunks kept in RAM.
+        spill_dir (str): Folder for memory-mapped chunk files (temporary folder by default).
+        chunk_rows (int): Number of rows per sealed chunk.
+    """
+
+    def __init__(self, memory_budget: int = 256 * 1024 * 1024, spill_dir: str = None, chunk_rows: int = 65536):
+        self.memory_budget = memory_budget
+        self.chunk_rows = chunk_rows
+        self.vendors = Dictionary()
+        self.currencies = Dictionary()
+        self.categories = Dictionary()
+        self._listeners = []
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._chunks = []
+        self._chunk_starts = []
+        self._resident_bytes = 0
+        self._spilled_files = []
+        self._size = 0
+        # Rows rejected by the loader (malformed amounts)
+        self.skipped_rows = 0
+        self._reset_buffers()
+
+    def _reset_buffers(self):
+        self._buffers = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+
+    # ------------------------------------------------------------------ ingest
+
+    def append(self, vendor: str, amount, currency: str = "USD", invoice_date: date = None, category: str = None):
+        """
+        Appends a single invoice line.
+
+        Args:
+            vendor (str): Raw vendor name.
+            amount: Invoice amount (number, Decimal or string).
+            currency (str): ISO currency code.
+            invoice_date (date): Invoice date, if known.
+            category (str): Expense category, if known.
+
+        Raises:
+            ValueError: If the amount cannot be parsed; nothing is appended.
+        """
+        cents = to_cents(amount)
+        buffers = self._buffers
+        buffers["vendor"].append(self.vendors.encode(vendor))
+        buffers["currency"].append(self.currencies.encode(currency))
+        buffers["amount"].append(cents)
+        buffers["date"].append(invoice_date.toordinal() if invoice_date else NO_DATE)
+        buffers["category"].append(self.categories.encode(category or UNCATEGORIZED))
+        self._size += 1
+        if len(buffers["amount"]) >= self.chunk_rows:
+            self._seal()
+
+    def extend(self, rows):
+        """Appends an iterable of (vendor, amount, currency, invoice_date, category) tuples."""
+        for row in rows:
+            self.append(*row)
+
+    def extend_columns(self, vendors, cents, currencies, ordinals, categories):
+        """
+        Appends a batch of rows given as columns, sealing chunks as they fill up.
+
+        Distinct strings are dictionary-encoded once per batch and the buffers are extended
+        in bulk, so subscribers (see SpendCube) fold each chunk in during the load.
+
+        Args:
+            vendors (sequence): Vendor names.
+            cents (array): Amounts in integer cents.
+            currencies (sequence): ISO currency codes.
+            ordinals (array): Invoice dates as date ordinals (NO_DATE when unknown).
+            categories (sequence): Expense categories (None when unknown).
+        """
+        columns = {
+            "vendor": self._encode_column(self.vendors, vendors),
+            "currency": self._encode_column(self.currencies, currencies),
+            "amount": np.asarray(cents, dtype=np.int64),
+            "date": np.asarray(ordinals, dtype=np.int32),
+            "category": self._encode_column(self.categories, [c or UNCATEGORIZED for c in categories]),
+        }
+        total = len(columns["amount"])
+        start = 0
+        while start < total:
+            stop = min(total, start + self.chunk_rows - len(self._buffers["amount"]))
+            for name, values in columns.items():
+                self._buffers[name].frombytes(values[start:stop].astype(COLUMNS[name][1]).tobytes())
+            self._size += stop - start
+            start = stop
+            if len(self._buffers["amount"]) >= self.chunk_rows:
+                self._seal()
+
+    @staticmethod
+    def _encode_column(dictionary, values) -> np.ndarray:
+        values = np.asarray(values, dtype=object)
+        if not len(values):
+            return np.zeros(0, dtype=np.int32)
+        distinct, inverse = np.unique(values, return_inverse=True)
+        codes = np.array([dictionary.encode(value) for value in distinct.tolist()], dtype=np.int32)
+        return codes[inverse.reshape(-1)]
+
+    def _seal(self):
+        length = len(self._buffers["amount"])
+        if not length:
+            return
+        nbytes = sum(buf.itemsize * len(buf) for buf in self._buffers.values())
+        if self._resident_bytes + nbytes <= self.memory_budget:
+            chunk = {name: np.frombuffer(buf, dtype=COLUMNS[name][1]).copy() for name, buf in self._buffers.items()}
+            self._resident_bytes += nbytes
+        else:
+            chunk = self._spill(self._buffers, length)
+        self._chunk_starts.append(self._size - length)
+        self._chunks.append(chunk)
+        self._reset_buffers()
+        for listener in self._listeners:
+            listener(chunk)
+
+    def flush(self):
+        """Seals the pending rows into a chunk so that subscribers see them."""
+        self._seal()
+
+    def subscribe(self, listener):
+        """
+        Calls `listener(chunk)` for every sealed chunk, existing ones included.
+
+        Used to maintain incremental aggregates (see SpendCube) as invoices are ingested.
+        """
+        for chunk in self._chunks:
+            listener(chunk)
+        self._listeners.append(listener)
+
+    def _spill(self, buffers, length):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="invoice_store_")
+        os.makedirs(self._spill_dir, exist_ok=True)
+        chunk = {}
+        for name, buf in buffers.items():
+            path = os.path.join(self._spill_dir, f"chunk_{len(self._chunks):05d}_{name}.bin")
+            with open(path, "wb") as f:
+                buf.tofile(f)
+            chunk[name] = np.memmap(path, dtype=COLUMNS[name][1], mode="r", shape=(length,))
+            self._spilled_files.append(path)
+        return chunk
+
+    # ------------------------------------------------------------------ access
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index: int) -> InvoiceRow:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("invoice index out of range")
+        sealed_rows = self._size - len(self._buffers["amount"])
+        if index >= sealed_rows:
+            return InvoiceRow(self, self._buffers, index - sealed_rows)
+        position = bisect_right(self._chunk_starts, index) - 1
+        return InvoiceRow(self, self._chunks[position], index - self._chunk_starts[position])
+
+    def __iter__(self):
+        for index in range(self._size):
+            yield self[index]
+
+    def iter_chunks(self):
+        """
+        Yields each chunk as a dict of numpy columns, including the unsealed tail.
+
+        The tail columns are zero-copy views over the append buffers and must not be
+        kept after iteration.
+        """
+        yield from self._chunks
+        if len(self._buffers["amount"]):
+            yield {name: np.frombuffer(buf, dtype=COLUMNS[name][1]) for name, buf in self._buffers.items()}
+
+    @property
+    def resident_bytes(self) -> int:
+        return self._resident_bytes + sum(buf.itemsize * len(buf) for buf in self._buffers.values())
+
+    @property
+    def spilled_bytes(self) -> int:
+        return sum(os.path.getsize(path) for path in self._spilled_files)
+
+    # ------------------------------------------------------------- aggregation
+
+    def vendor_totals_cents(self) -> np.ndarray:
+        """Returns total cents per vendor code, aggregated chunk by chunk."""
+        totals = np.zeros(len(self.vendors), dtype=np.int64)
+        for chunk in self.iter_chunks():
+            np.add.at(totals, chunk["vendor"], chunk["amount"])
+        return totals
+
+    def vendor_totals(self) -> dict:
+        """
+        Returns the vendor -> total expense dict expected by generate_charts.
+        """
+        totals = self.vendor_totals_cents()
+        return {vendor: int(cents) / AMOUNT_SCALE for vendor, cents in zip(self.vendors.values, totals)}
+
+    def close(self):
+        """Releases memory-mapped chunks and deletes spilled files."""
+        self._chunks = []
+        self._chunk_starts = []
+        self._resident_bytes = 0
+        self._size = 0
+        self._reset_buffers()
+        for path in self._spilled_files:
+            if os.path.exists(path):
+                os.remove(path)
+        self._spilled_files = []
+        if self._owns_spill_dir and self._spill_dir and os.path.isdir(self._spill_dir):
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
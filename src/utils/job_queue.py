@@ -0,0 +1,217 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from src.utils.llm_scheduler import BATCH
+from src.utils.runs import RUNS_DIR, new_run_id
+
+QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(RUNS_DIR, "jobs.db"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    worker TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority, submitted_at);
+"""
+
+_COLUMNS = ("run_id", "status", "priority", "params", "worker", "error", "attempts",
+            "submitted_at", "started_at", "heartbeat_at", "finished_at")
+
+
+class JobQueue:
+    """
+    Persistent local job queue backed by SQLite.
+
+    Any number of worker processes can share the same database file: jobs are claimed
+    atomically, so each job runs exactly once. Jobs whose worker stopped sending
+    heartbeats are requeued.
+
+    Args:
+        path (str): SQLite database file.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit connection, closed after each operation
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        return job
+
+    def submit(self, params: dict = None, priority: int = BATCH) -> str:
+        """
+        Queues a new analysis run and returns its run id.
+
+        Args:
+            params (dict): Run parameters, passed to the worker.
+            priority (int): Scheduler priority (lower runs first).
+        """
+        run_id = new_run_id()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (run_id, status, priority, params, submitted_at) VALUES (?, ?, ?, ?, ?)",
+                (run_id, QUEUED, priority, json.dumps(params or {}), time.time()),
+            )
+        return run_id
+
+    def claim(self, worker: str):
+        """Atomically takes the next queued job for a worker, or returns None."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = ? ORDER BY priority, submitted_at LIMIT 1",
+                    (QUEUED,),
+                ).fetchone()
+                now = time.time()
+                if row is not None:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ? WHERE run_id = ?",
+                        (RUNNING, worker, now, now, row[0]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = self._to_job(row)
+        job.update(status=RUNNING, worker=worker, attempts=job["attempts"] + 1, started_at=now, heartbeat_at=now)
+        return job
+
+    def heartbeat(self, run_id: str, worker: str) -> bool:
+        """Refreshes the heartbeat of a job; False if the worker no longer owns it."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE run_id = ? AND worker = ? AND status = ?",
+                (time.time(), run_id, worker, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, run_id: str, worker: str) -> bool:
+        """
+        Marks a job done. Returns False, leaving the job untouched, if the worker no longer
+        owns it (the job was requeued after missed heartbeats and possibly claimed again).
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = NULL WHERE run_id = ? AND worker = ? AND status = ?",
+                (DONE, time.time(), run_id, worker, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, run_id: str, worker: str, error: str) -> bool:
+        """Marks a job failed; like complete(), only if the worker still owns it."""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE run_id = ? AND worker = ? AND status = ?",
+                (FAILED, time.time(), error, run_id, worker, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def requeue_stale(self, timeout: float = 300.0, max_attempts: int = 3) -> int:
+        """Requeues running jobs whose worker has not sent a heartbeat for `timeout` seconds."""
+        cutoff = time.time() - timeout
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'worker lost' WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                (FAILED, RUNNING, cutoff, max_attempts),
+            )
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, cutoff),
+            )
+            return cursor.rowcount
+
+    def get(self, run_id: str):
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._to_job(row)
+
+    def list(self, status: str = None, limit: int = 100):
+        query = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        args = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY submitted_at DESC LIMIT ?"
+        with self._connect() as conn:
+            rows = conn.execute(query, args + (limit,)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def counts(self) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0, **dict(rows)}
+
+
+class JobHeartbeat:
+    """
+    Sends the heartbeat of a running job from a background thread while the job runs.
+
+    `lost` is set as soon as a heartbeat finds the job no longer owned by the worker
+    (it was requeued after missed heartbeats and possibly claimed by another worker);
+    the run must then stop writing to the run folder.
+
+    Args:
+        queue (JobQueue): Queue holding the job.
+        run_id (str): The running job.
+        worker (str): Worker that claimed the job.
+        interval (float): Seconds between heartbeats.
+    """
+
+    def __init__(self, queue: JobQueue, run_id: str, worker: str, interval: float):
+        self.queue = queue
+        self.run_id = run_id
+        self.worker = worker
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            if not self.queue.heartbeat(self.run_id, self.worker):
+                self.lost.set()
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+COLLECTION_ID = "clt_01JKBAHP3419YYWZ7CQJ59S60N"  # Replace with your actual collection ID
+TOP_K = 20
+MAX_PARALLEL_SEARCHES = 8
+
+
+def _search(ndl, query: str, top_k: int = TOP_K):
+    return ndl.collections.search(
+        collection_id=COLLECTION_ID,
+        text=query,
+        top_k=top_k,
+    )
+
+
+def _chunk_id(chunk):
+    chunk_id = getattr(chunk, "id", None)
+    if chunk_id is None and isinstance(chunk, dict):
+        chunk_id = chunk.get("id")
+    return chunk_id if chunk_id is not None else _chunk_content(chunk)
+
+
+def _chunk_content(chunk):
+    if isinstance(chunk, dict):
+        return chunk.get("content", "")
+    return getattr(chunk, "content", str(chunk))
+
+
+def format_chunks(entries) -> str:
+    return "\n".join(f"\n[{e['key'][len('chunk:'):]}]\n{e['content']}" for e in entries)
+
+
+def search_with_memory(ndl, memory, query: str):
+    """Returns the chunk entries for a query, searching Needle only on a memory miss."""
+    cached = memory.cached_search(query)
+    if cached is not None:
+        return cached
+    chunks = _search(ndl, query) or []
+    return memory.store_search(query, [(_chunk_id(c), _chunk_content(c)) for c in chunks])
+
+
+def batch_search(ndl, memory, queries) -> str:
+    """
+    Runs several knowledge base searches in parallel and merges their chunks.
+
+    A failing query does not discard the others: its error is listed in the output.
+
+    Args:
+        ndl (NeedleClient): Needle client.
+        memory (RunMemory): Memory of the run, which caches the searches.
+        queries (list): The search queries to run.
+
+    Returns:
+        str: The de-duplicated chunks, each with the queries that returned it.
+    """
+    if isinstance(queries, str):
+        queries = [queries]
+    queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    if not queries:
+        return "No queries provided."
+
+    results, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL_SEARCHES, len(queries))) as executor:
+        futures = {query: executor.submit(search_with_memory, ndl, memory, query) for query in queries}
+        for query, future in futures.items():
+            try:
+                results[query] = future.result()
+            except Exception as e:
+                failed[query] = e
+
+    # Merge chunks across queries, keeping the first occurrence of each chunk
+    merged = {}
+    for query, entries in results.items():
+        for entry in entries:
+            if entry["key"] not in merged:
+                merged[entry["key"]] = (entry["content"], [query])
+            else:
+                merged[entry["key"]][1].append(query)
+
+    lines = [f"{len(merged)} unique chunks for {len(results)} queries."]
+    if failed:
+        lines.append(f"{len(failed)} queries failed and returned nothing:")
+        lines += [f"- {query}: {error}" for query, error in failed.items()]
+    for key, (content, matched) in merged.items():
+        lines.append(f"\n[{key[len('chunk:'):]}] (queries: {'; '.join(matched)})\n{content}")
+    return "\n".join(lines)
@@ -0,0 +1,63 @@
+import os
+from crewai import LLM
+from src.utils.llm_scheduler import INTERACTIVE, ScheduledCallsMixin
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL_NAME", "gpt-4o-mini")
+
+# Model tiers: small/fast models for formatting and extraction, large ones for analysis
+MODEL_TIERS = {
+    "fast": os.getenv("LLM_MODEL_FAST", "gpt-4o-mini"),
+    "large": os.getenv("LLM_MODEL_LARGE", "gpt-4o"),
+}
+
+# Routing policy: task overrides win over the agent's default tier
+AGENT_TIERS = {
+    "Supervisor": "large",
+    "Expense Analyst": "large",
+    "Financial Reporter": "fast",
+    "Compliance Auditor": "large",
+    "Supplier Negotiator": "large",
+}
+TASK_TIERS = {
+    "analysis": "large",
+    "write_report": "fast",
+    "audit": "large",
+    "find_and_negotiate": "large",
+    "supervision": "large",
+}
+
+
+class ScheduledLLM(ScheduledCallsMixin, LLM):
+    """CrewAI LLM whose calls go through the process-wide LLM scheduler."""
+
+
+def route_model(agent: str = None, task: str = None) -> str:
+    """
+    Returns the model for an agent role and/or task name according to the routing policy.
+
+    Args:
+        agent (str): Agent role, e.g. "Financial Reporter".
+        task (str): Task name, e.g. "write_report".
+    """
+    tier = TASK_TIERS.get(task) or AGENT_TIERS.get(agent)
+    return MODEL_TIERS.get(tier, DEFAULT_MODEL)
+
+
+def create_llm(model: str = None, priority: int = INTERACTIVE, agent: str = None, task: str = None, profile=None, **kwargs) -> ScheduledLLM:
+    """
+    Creates a scheduled LLM for one of the crew's agents.
+
+    Args:
+        model (str): Explicit model name; routed from agent/task when omitted.
+        priority (int): Scheduler priority, INTERACTIVE or BATCH.
+        agent (str): Agent role used for routing and profiling.
+        task (str): Task name used for routing.
+        profile (RunProfile): Run profile that records calls per model.
+        **kwargs: Extra crewai.LLM arguments. OPENAI_BASE_URL is honoured so runs
+            can target a local fake endpoint.
+    """
+    base_url = kwargs.pop("base_url", None) or os.getenv("OPENAI_BASE_URL")
+    if base_url:
+        kwargs["base_url"] = base_url
+    model = model or route_model(agent, task)
+    return ScheduledLLM(model=model, priority=priority, profile=profile, agent=agent, **kwargs)
@@ -0,0 +1,284 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+
+# Lower value = served first
+INTERACTIVE = 0
+BATCH = 10
+
+WINDOW_SECONDS = 60.0
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "RateLimitError",
+    "APITimeoutError",
+    "APIConnectionError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "Timeout",
+}
+
+
+def estimate_tokens(messages, max_completion_tokens: int = None) -> int:
+    """Rough token estimate (4 characters per token) for a prompt plus its completion."""
+    if isinstance(messages, str):
+        chars = len(messages)
+    else:
+        chars = sum(len(str(m.get("content", "")) if isinstance(m, dict) else str(m)) for m in messages)
+    return chars // 4 + (1000 if max_completion_tokens is None else max_completion_tokens)
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(exc) -> bool:
+    """Returns True for rate-limit, timeout and transient server errors."""
+    return _status_code(exc) in RETRYABLE_STATUS or type(exc).__name__ in RETRYABLE_ERRORS
+
+
+def _retry_after(exc):
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """
+    Process-wide gate for LLM requests.
+
+    Every request waits in a priority queue until a concurrency slot is free and the
+    requests-per-minute and tokens-per-minute budgets allow it, then runs with
+    jittered exponential backoff on rate limits and transient errors.
+
+    Args:
+        max_concurrency (int): Maximum number of requests in flight.
+        requests_per_minute (int): Requests budget over a sliding minute (0 disables it).
+        tokens_per_minute (int): Tokens budget over a sliding minute (0 disables it).
+        max_retries (int): Retries per request on retryable errors.
+        backoff_base (float): First backoff delay in seconds.
+        backoff_cap (float): Maximum backoff delay in seconds.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 60.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._clock = clock
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._window = deque()
+        self._window_tokens = 0
+        self._stats = {"completed": 0, "failed": 0, "retries": 0, "wait_seconds": 0.0}
+
+    # ---------------------------------------------------------------- budgets
+
+    def _expire(self, now):
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            _, tokens = self._window.popleft()
+            self._window_tokens -= tokens
+
+    def _budget_delay(self, tokens, now):
+        """Seconds until a request of `tokens` fits in the per-minute budgets."""
+        self._expire(now)
+        delay = 0.0
+        if self.requests_per_minute and len(self._window) >= self.requests_per_minute:
+            index = len(self._window) - self.requests_per_minute
+            delay = max(delay, self._window[index][0] + WINDOW_SECONDS - now)
+        if self.tokens_per_minute and self._window and self._window_tokens + tokens > self.tokens_per_minute:
+            # Wait until enough of the oldest requests leave the window
+            excess = self._window_tokens + tokens - self.tokens_per_minute
+            for timestamp, used in self._window:
+                excess -= used
+                if excess <= 0:
+                    break
+            delay = max(delay, timestamp + WINDOW_SECONDS - now)
+        return delay
+
+    # ------------------------------------------------------------------ slots
+
+    def acquire(self, priority: int = INTERACTIVE, tokens: int = 0):
+        """Blocks until the request is at the head of the queue and fits the budgets."""
+        entry = (priority, next(self._seq))
+        started = self._clock()
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    if self._waiting[0] == entry and self._in_flight < self.max_concurrency:
+                        delay = self._budget_delay(tokens, self._clock())
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            now = self._clock()
+            self._window.append((now, tokens))
+            self._window_tokens += tokens
+            self._stats["wait_seconds"] += now - started
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    # -------------------------------------------------------------------- run
+
+    def backoff(self, attempt: int, exc=None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(exc) if exc is not None else None
+        return max(delay, retry_after or 0.0)
+
+    def run(self, fn, priority: int = INTERACTIVE, tokens: int = 0):
+        """
+        Runs `fn()` through the scheduler, retrying retryable errors.
+
+        Args:
+            fn (callable): The LLM request to run.
+            priority (int): INTERACTIVE, BATCH or any integer (lower runs first).
+            tokens (int): Estimated tokens used by the request.
+        """
+        attempt = 0
+        while True:
+            self.acquire(priority, tokens)
+            try:
+                result = fn()
+            except Exception as exc:
+                self.release()
+                if attempt >= self.max_retries or not is_retryable(exc):
+                    with self._cond:
+                        self._stats["failed"] += 1
+                    raise
+                with self._cond:
+                    self._stats["retries"] += 1
+                self._sleep(self.backoff(attempt, exc))
+                attempt += 1
+                continue
+            self.release()
+            with self._cond:
+                self._stats["completed"] += 1
+            return result
+
+    # ---------------------------------------------------------------- metrics
+
+    def metrics(self) -> dict:
+        """Returns queue depth per priority, in-flight requests, budget usage and counters."""
+        with self._cond:
+            self._expire(self._clock())
+            depth = {}
+            for priority, _ in self._waiting:
+                depth[priority] = depth.get(priority, 0) + 1
+            return {
+                "queue_depth": len(self._waiting),
+                "queue_depth_by_priority": depth,
+                "in_flight": self._in_flight,
+                "requests_last_minute": len(self._window),
+                "tokens_last_minute": self._window_tokens,
+                **self._stats,
+            }
+
+
+class ScheduledCallsMixin:
+    """
+    Routes the call() of an LLM class through an LLMScheduler and records each call in a
+    run profile. Mixed in before the LLM class (see src.utils.llm.ScheduledLLM), whose
+    call(messages, ...) performs one provider request and whose `model` and `max_tokens`
+    attributes describe it.
+    """
+
+    def __init__(self, *args, priority: int = INTERACTIVE, scheduler=None, profile=None, agent: str = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.priority = priority
+        self.scheduler = scheduler or get_scheduler()
+        self.profile = profile
+        self.agent = agent
+
+    def call(self, messages, *args, **kwargs):
+        tokens = estimate_tokens(messages, getattr(self, "max_tokens", None))
+        attempts = []  # provider latency of each attempt, queue wait and backoff excluded
+
+        def attempt():
+            started = time.monotonic()
+            try:
+                return super(ScheduledCallsMixin, self).call(messages, *args, **kwargs)
+            finally:
+                attempts.append(time.monotonic() - started)
+
+        submitted = time.monotonic()
+        try:
+            result = self.scheduler.run(attempt, priority=self.priority, tokens=tokens)
+        except Exception:
+            self._record(submitted, attempts, messages, "", error=True)
+            raise
+        self._record(submitted, attempts, messages, result)
+        return result
+
+    def _record(self, submitted, attempts, messages, result, error=False):
+        if self.profile is None:
+            return
+        provider_seconds = sum(attempts)
+        completion_tokens = len(str(result or "")) // 4
+        self.profile.record(
+            self.model,
+            self.agent,
+            provider_seconds,
+            estimate_tokens(messages, 0),
+            completion_tokens,
+            error=error,
+            queue_seconds=max(time.monotonic() - submitted - provider_seconds, 0.0),
+            attempts=len(attempts),
+        )
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """
+    Returns the process-wide scheduler, configured from the environment:
+    LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_RETRIES.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "4")),
+                requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")),
+                tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "5")),
+            )
+        return _scheduler
@@ -1,54 +1,173 @@
 import os
+import re
 import markdown2
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-
-def generate_charts(data, output_folder):
+from src.utils.invoice_store import InvoiceStore, AMOUNT_SCALE
+from src.utils.runs import atomic_target
+from src.utils.currency import REPORTING_CURRENCY, format_amount, vendor_totals_cents_in, vendor_totals_in
+from src.utils.spend_cube import SpendCube
+from src.utils.vendor_index import canonicalize_totals
+
+def _save_figure(fig, path):
+    tmp_path = atomic_target(path)
+    fig.savefig(tmp_path, format="png")
+    os.replace(tmp_path, path)
+
+def generate_charts(data, output_folder, currency=REPORTING_CURRENCY):
     """
     Generates financial charts (pie chart & bar chart) and saves them as images.
     
     Args:
-        data (dict): Expense data by vendor.
+        data (dict | InvoiceStore | SpendCube): Expense data by vendor; a dict is plotted as given.
         output_folder (str): Folder to save charts.
+        currency (str): Reporting currency (InvoiceStore amounts are converted to it).
     """
     os.makedirs(output_folder, exist_ok=True)
 
     # Convert data to DataFrame
-    df = pd.DataFrame(list(data.items()), columns=['Vendor', 'Total Expense'])
-
+    if isinstance(data, SpendCube):
+        # Vendor rollup of the precomputed cube, already in the cube's reporting currency
+        currency = data.reporting
+        df = pd.DataFrame(list(data.vendor_totals().items()), columns=['Vendor', 'Total Expense'])
+    elif isinstance(data, InvoiceStore):
+        # Build columns straight from the store's aggregates, normalized to one currency
+        df = pd.DataFrame({'Vendor': data.vendors.values, 'Total Expense': vendor_totals_cents_in(data, currency) / AMOUNT_SCALE})
+    else:
+        df = pd.DataFrame(list(data.items()), columns=['Vendor', 'Total Expense'])
+
+    # Charts are drawn on standalone figures (not pyplot's global state) so that
+    # concurrent runs can render in parallel, and saved atomically.
     # Pie Chart
     pie_chart_path = os.path.join(output_folder, "expense_pie_chart.png")
-    plt.figure(figsize=(5, 5))
-    plt.pie(df["Total Expense"], labels=df["Vendor"], autopct='%1.1f%%', colors=plt.cm.Paired.colors)
-    plt.title("Expense Distribution by Vendor")
-    plt.savefig(pie_chart_path)
-    plt.close()
+    fig = Figure(figsize=(5, 5))
+    ax = fig.subplots()
+    ax.pie(df["Total Expense"], labels=df["Vendor"], autopct='%1.1f%%', colors=plt.cm.Paired.colors)
+    ax.set_title("Expense Distribution by Vendor")
+    _save_figure(fig, pie_chart_path)
 
     # Bar Chart
     bar_chart_path = os.path.join(output_folder, "expense_bar_chart.png")
-    plt.figure(figsize=(6, 4))
-    plt.bar(df["Vendor"], df["Total Expense"], color=plt.cm.Paired.colors)
-    plt.xlabel("Vendor")
-    plt.ylabel("Total Expense ($)")
-    plt.title("Expense per Vendor")
-    plt.xticks(rotation=45)
-    plt.savefig(bar_chart_path)
-    plt.close()
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.bar(df["Vendor"], df["Total Expense"], color=plt.cm.Paired.colors)
+    ax.set_xlabel("Vendor")
+    ax.set_ylabel(f"Total Expense ({currency})")
+    ax.set_title("Expense per Vendor")
+    ax.tick_params(axis="x", labelrotation=45)
+    _save_figure(fig, bar_chart_path)
 
     return pie_chart_path, bar_chart_path
 
-def convert_markdown_to_pdf(md_file: str, output_folder: str = "reports", expense_data=None):
+def generate_trend_chart(data, output_folder, currency=REPORTING_CURRENCY):
+    """
+    Generates a monthly spend trend chart and saves it as an image.
+
+    Args:
+        data (SpendCube | dict): Precomputed spend aggregates, or month (YYYY-MM) -> total.
+        output_folder (str): Folder to save the chart.
+        currency (str): Reporting currency of a month -> total dict.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    if isinstance(data, SpendCube):
+        currency = data.reporting
+        data = data.monthly_series()
+    series = {month: total for month, total in data.items() if month != "unknown"}
+
+    trend_chart_path = os.path.join(output_folder, "expense_trend_chart.png")
+    fig = Figure(figsize=(6, 4))
+    ax = fig.subplots()
+    ax.plot(list(series), list(series.values()), marker="o")
+    ax.set_xlabel("Month")
+    ax.set_ylabel(f"Total Expense ({currency})")
+    ax.set_title("Monthly Expense Trend")
+    ax.tick_params(axis="x", labelrotation=45)
+    fig.tight_layout()
+    _save_figure(fig, trend_chart_path)
+
+    return trend_chart_path
+
+_STYLES = None
+
+def get_pdf_styles():
+    """Paragraph styles shared by every report PDF, built once per process."""
+    global _STYLES
+    if _STYLES is None:
+        styles = getSampleStyleSheet()
+        _STYLES = {
+            "title": ParagraphStyle('TitleStyle', parent=styles['Title'], fontSize=16, textColor=colors.darkblue, spaceAfter=10),
+            "subtitle": ParagraphStyle('SubtitleStyle', parent=styles['Heading2'], fontSize=12, textColor=colors.black, spaceAfter=8),
+            "normal": ParagraphStyle('NormalStyle', parent=styles['Normal'], fontSize=10, leading=14),
+        }
+    return _STYLES
+
+_HEADING_RE = re.compile(r"^(?:<h([1-6])[^>]*>(.*?)</h\1>|(#{1,2}) (.*))$")
+_CELL_RE = re.compile(r"</t[hd]>\s*<t[hd][^>]*>")
+_BLOCK_TAG_RE = re.compile(r"</?(?:p|ul|ol|table|thead|tbody|tr|th|td|pre|code|blockquote|hr|div)\b[^>]*/?>")
+
+def markdown_to_flowables(md_content: str, styles=None, toc_level=None):
+    """
+    Converts Markdown to PDF flowables (headings, paragraphs, list items, table rows).
+
+    Args:
+        md_content (str): Markdown content.
+        styles (dict): Styles from get_pdf_styles().
+        toc_level (int): If set, level-1 and level-2 headings are tagged for a table of
+            contents at this level.
+    """
+    styles = styles or get_pdf_styles()
+    html_content = markdown2.markdown(md_content, extras=["tables"])
+    elements = []
+    for line in html_content.split("\n"):
+        line = line.strip()
+        heading = _HEADING_RE.match(line)
+        if heading:
+            level = int(heading.group(1)) if heading.group(1) else len(heading.group(3))
+            text = heading.group(2) if heading.group(1) else heading.group(4)
+            paragraph = Paragraph(text, styles["title"] if level == 1 else styles["subtitle"])
+            if toc_level is not None and level <= 2:
+                paragraph.toc_entry = (toc_level, re.sub(r"<[^>]+>", "", text))
+            elements.append(paragraph)
+            continue
+        line = _CELL_RE.sub(" | ", line.replace("<li>", "• ").replace("</li>", ""))
+        line = _BLOCK_TAG_RE.sub("", line).strip()
+        if line:
+            elements.append(Paragraph(line, styles["normal"]))
+            elements.append(Spacer(1, 6))
+    return elements
+
+def expense_table(vendor_totals: dict, currency: str = REPORTING_CURRENCY):
+    """Returns the vendor -> total expense table flowable."""
+    data = [["Vendor", f"Total Expense ({currency})"]]
+    for vendor, expense in vendor_totals.items():
+        data.append([vendor, format_amount(expense, currency)])
+
+    table = Table(data, colWidths=[200, 100])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ]))
+    return table
+
+def convert_markdown_to_pdf(md_file: str, output_folder: str = "reports", expense_data=None, currency: str = REPORTING_CURRENCY):
     """
     Converts a Markdown file to a well-formatted PDF with tables and charts.
     
     Args:
         md_file (str): Path to the Markdown file.
         output_folder (str): Folder where the PDF will be stored.
-        expense_data (dict): Expense data for generating tables and charts.
+        expense_data (dict | InvoiceStore | SpendCube): Expense data for generating tables and charts.
+        currency (str): Reporting currency of the table and charts.
     """
     os.makedirs(output_folder, exist_ok=True)
 
@@ -56,63 +175,46 @@ def convert_markdown_to_pdf(md_file: str, output_folder: str = "reports", expens
     with open(md_file, "r", encoding="utf-8") as f:
         md_content = f.read()
 
-    # Convert Markdown to HTML
-    html_content = markdown2.markdown(md_content)
-
     # Define PDF output path
     pdf_filename = os.path.splitext(os.path.basename(md_file))[0] + ".pdf"
     pdf_path = os.path.join(output_folder, pdf_filename)
 
     # Create PDF document
-    doc = SimpleDocTemplate(pdf_path, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle('TitleStyle', parent=styles['Title'], fontSize=16, textColor=colors.darkblue, spaceAfter=10)
-    subtitle_style = ParagraphStyle('SubtitleStyle', parent=styles['Heading2'], fontSize=12, textColor=colors.black, spaceAfter=8)
-    normal_style = ParagraphStyle('NormalStyle', parent=styles['Normal'], fontSize=10, leading=14)
-
-    elements = []
+    tmp_pdf_path = atomic_target(pdf_path)
+    doc = SimpleDocTemplate(tmp_pdf_path, pagesize=letter)
+    styles = get_pdf_styles()
 
     # Add content from Markdown
-    for line in html_content.split("\n"):
-        line = line.strip()
-        if line.startswith("# "):
-            elements.append(Paragraph(line[2:], title_style))
-        elif line.startswith("## "):
-            elements.append(Paragraph(line[3:], subtitle_style))
-        else:
-            elements.append(Paragraph(line, normal_style))
-        elements.append(Spacer(1, 10))
+    elements = markdown_to_flowables(md_content, styles)
 
     # Add Expense Table if Data Available
     if expense_data:
-        data = [["Vendor", "Total Expense ($)"]]
-        for vendor, expense in expense_data.items():
-            data.append([vendor, f"${expense:,.2f}"])
-
-        table = Table(data, colWidths=[200, 100])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-
-        elements.append(Paragraph("Expense Breakdown", subtitle_style))
-        elements.append(table)
+        if isinstance(expense_data, SpendCube):
+            currency = expense_data.reporting
+            vendor_totals = expense_data.vendor_totals()
+        elif isinstance(expense_data, InvoiceStore):
+            vendor_totals = vendor_totals_in(expense_data, currency)
+        else:
+            # Merge spellings of the same known supplier, without registering new names
+            vendor_totals = canonicalize_totals(expense_data)
+
+        # The table and the charts show the same vendor totals
+        elements.append(Paragraph("Expense Breakdown", styles["subtitle"]))
+        elements.append(expense_table(vendor_totals, currency))
         elements.append(Spacer(1, 20))
 
         # Generate and Add Charts
-        pie_chart_path, bar_chart_path = generate_charts(expense_data, output_folder)
+        pie_chart_path, bar_chart_path = generate_charts(vendor_totals, output_folder, currency)
         elements.append(Image(pie_chart_path, width=300, height=300))
         elements.append(Spacer(1, 20))
         elements.append(Image(bar_chart_path, width=400, height=250))
 
+        if isinstance(expense_data, SpendCube):
+            elements.append(Spacer(1, 20))
+            elements.append(Image(generate_trend_chart(expense_data, output_folder), width=400, height=250))
+
     # Build PDF
     doc.build(elements)
+    os.replace(tmp_pdf_path, pdf_path)
 
     print(f"✅ PDF saved at: {pdf_path}")
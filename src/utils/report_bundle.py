@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.platypus import Image, PageBreak, Paragraph, SimpleDocTemplate, Spacer
+from reportlab.platypus.tableofcontents import TableOfContents
+
+from src.utils.checkpoints import fingerprint
+from src.utils.currency import currency_note
+from src.utils.pdf_converter import (
+    expense_table, generate_charts, generate_trend_chart, get_pdf_styles, markdown_to_flowables,
+)
+from src.utils.runs import REPORTS, atomic_target, atomic_write, get_run_dir, run_file
+from src.utils.spend_cube import SPEND_CUBE_FILE, load_cube_rollups
+
+EXPORT_DIR = "export"
+BUNDLE_PDF = "expense_reports.pdf"
+BUNDLE_ZIP = "expense_reports.zip"
+MANIFEST_FILE = "bundle.json"
+
+# Run files that change the bundle, and extra files shipped in the ZIP
+_ZIP_EXTRAS = ["verification.json", "profile.json"]
+
+# Shipped in the ZIP but not rendered, so rewriting them does not make the bundle stale
+_UNTRACKED = {"profile.json"}
+
+
+def _export_path(run_id: str, filename: str) -> str:
+    return os.path.join(get_run_dir(run_id), EXPORT_DIR, filename)
+
+
+def _sources(run_id: str) -> list:
+    filenames = [filename for filename, _ in REPORTS] + [SPEND_CUBE_FILE] + _ZIP_EXTRAS
+    return [(filename, run_file(run_id, filename)) for filename in filenames if os.path.exists(run_file(run_id, filename))]
+
+
+def _sources_fingerprint(run_id: str) -> str:
+    return fingerprint([(filename, os.path.getsize(path), os.path.getmtime(path))
+                        for filename, path in _sources(run_id) if filename not in _UNTRACKED])
+
+
+class _BundleDocTemplate(SimpleDocTemplate):
+    """Registers tagged headings in the table of contents and the PDF outline."""
+
+    def afterFlowable(self, flowable):
+        entry = getattr(flowable, "toc_entry", None)
+        if entry is None:
+            return
+        level, text = entry
+        key = f"toc-{id(flowable)}"
+        self.canv.bookmarkPage(key)
+        self.canv.addOutlineEntry(text, key, level=level, closed=level > 0)
+        self.notify("TOCEntry", (level, text, self.page, key))
+
+
+def _heading(text: str, style, level: int) -> Paragraph:
+    paragraph = Paragraph(text, style)
+    paragraph.toc_entry = (level, text)
+    return paragraph
+
+
+def build_bundle(run_id: str) -> dict:
+    """
+    Renders every report of a run into one PDF (shared styles, charts rendered once,
+    table of contents) and zips it with the Markdown reports, charts and run files.
+
+    The bundle is rebuilt only when a source file of the run changed since the last
+    build; otherwise the cached manifest is returned.
+
+    Args:
+        run_id (str): Identifier of the run.
+
+    Returns:
+        dict: Manifest with the "pdf" and "zip" paths and the sources fingerprint.
+    """
+    manifest = get_bundle(run_id)
+    if manifest is not None:
+        return manifest
+
+    sources_fingerprint = _sources_fingerprint(run_id)
+    export_dir = os.path.join(get_run_dir(run_id), EXPORT_DIR)
+    os.makedirs(export_dir, exist_ok=True)
+    styles = get_pdf_styles()
+
+    # Charts are rendered once for the whole bundle, from the persisted spend cube
+    charts = []
+    cube_path = run_file(run_id, SPEND_CUBE_FILE)
+    vendor_totals, currency, unconverted, stale = None, None, [], []
+    if os.path.exists(cube_path):
+        vendor_totals, monthly, currency, unconverted, stale = load_cube_rollups(cube_path)
+        if vendor_totals:
+            pie_chart_path, bar_chart_path = generate_charts(vendor_totals, export_dir, currency)
+            charts = [(pie_chart_path, 300, 300), (bar_chart_path, 400, 250)]
+            if any(month != "unknown" for month in monthly):
+                charts.append((generate_trend_chart(monthly, export_dir, currency), 400, 250))
+
+    toc = TableOfContents()
+    toc.levelStyles = [
+        ParagraphStyle("TOCLevel0", parent=styles["normal"], fontSize=11, leftIndent=10, firstLineIndent=-10, spaceBefore=6),
+        ParagraphStyle("TOCLevel1", parent=styles["normal"], fontSize=9, leftIndent=25, firstLineIndent=-10),
+    ]
+    elements = [Paragraph(f"Expense Analysis — Run {run_id}", styles["title"]), Spacer(1, 12),
+                Paragraph("Contents", styles["subtitle"]), toc]
+
+    if vendor_totals:
+        elements += [PageBreak(), _heading("Expense Breakdown", styles["title"], 0)]
+        if unconverted or stale:
+            elements += [Paragraph(currency_note(currency, unconverted, stale), styles["normal"]), Spacer(1, 12)]
+        elements += [expense_table(vendor_totals, currency), Spacer(1, 20)]
+        for path, width, height in charts:
+            elements += [Image(path, width=width, height=height), Spacer(1, 20)]
+
+    for filename, label in REPORTS:
+        path = run_file(run_id, filename)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            md_content = f.read()
+        elements += [PageBreak(), _heading(label, styles["title"], 0)]
+        elements += markdown_to_flowables(md_content, styles, toc_level=1)
+
+    pdf_path = _export_path(run_id, BUNDLE_PDF)
+    tmp_pdf_path = atomic_target(pdf_path)
+    try:
+        # Two passes: the table of contents needs the page numbers of the first one
+        _BundleDocTemplate(tmp_pdf_path, pagesize=letter, title=f"Expense reports {run_id}").multiBuild(elements)
+        os.replace(tmp_pdf_path, pdf_path)
+    finally:
+        if os.path.exists(tmp_pdf_path):
+            os.remove(tmp_pdf_path)
+
+    zip_path = _export_path(run_id, BUNDLE_ZIP)
+    tmp_zip_path = atomic_target(zip_path)
+    try:
+        with zipfile.ZipFile(tmp_zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(pdf_path, BUNDLE_PDF)
+            for filename, path in _sources(run_id):
+                if filename != SPEND_CUBE_FILE:
+                    archive.write(path, filename)
+            for path, _, _ in charts:
+                archive.write(path, os.path.join("charts", os.path.basename(path)))
+        os.replace(tmp_zip_path, zip_path)
+    finally:
+        if os.path.exists(tmp_zip_path):
+            os.remove(tmp_zip_path)
+
+    manifest = {"run_id": run_id, "fingerprint": sources_fingerprint, "pdf": pdf_path, "zip": zip_path, "built_at": time.time()}
+    atomic_write(_export_path(run_id, MANIFEST_FILE), json.dumps(manifest, indent=2))
+    print(f"📦 Report bundle of run {run_id} saved in {export_dir}")
+    return manifest
+
+
+def get_bundle(run_id: str):
+    """Returns the manifest of the run's bundle if it is up to date with the run's reports, else None."""
+    path = _export_path(run_id, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    fresh = manifest.get("fingerprint") == _sources_fingerprint(run_id)
+    if fresh and os.path.exists(manifest["pdf"]) and os.path.exists(manifest["zip"]):
+        return manifest
+    return None
+
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-bundle")
+_futures = {}
+_futures_lock = threading.Lock()
+
+
+def schedule_bundle(run_id: str):
+    """Builds the run's bundle in a background thread (once per run at a time) and returns the future."""
+    with _futures_lock:
+        future = _futures.get(run_id)
+        if future is None or future.done():
+            future = _futures[run_id] = _executor.submit(build_bundle, run_id)
+        return future
+
+
+def bundle_status(run_id: str) -> str:
+    """Returns "ready", "building", "failed" or "missing"."""
+    with _futures_lock:
+        future = _futures.get(run_id)
+    if future is not None and not future.done():
+        return "building"
+    if get_bundle(run_id) is not None:
+        return "ready"
+    if future is not None and future.exception() is not None:
+        return "failed"
+    return "missing"
@@ -0,0 +1,233 @@
+import json
+import os
+import re
+from src.utils.currency import REPORTING_CURRENCY, format_amount, vendor_totals_in
+from src.utils.invoice_store import InvoiceStore, parse_amount
+from src.utils.runs import REPORTS, atomic_write, run_file
+from src.utils.spend_cube import SpendCube
+from src.utils.vendor_index import get_vendor_index
+
+SUPERVISION_REPORT = "supervision_report.md"
+
+# Amounts with thousands separators (a comma or space followed by exactly three
+# digits, or dots before a decimal comma) and a decimal point or comma:
+# 1,234.56 / 1 234,5 / 1.234,56 / 1234,5
+_NUMBER = (
+    r"\d{1,3}(?:,\d{3}(?!\d))+(?:\.\d+)?"
+    r"|\d{1,3}(?:\.\d{3}(?!\d))+,\d+"
+    r"|\d{1,3}(?:[ \u00a0\u202f]\d{3}(?!\d))+(?:[.,]\d+)?"
+    r"|\d+(?:[.,]\d+)?"
+)
+# $1,234.56 / €1 234,5 / 1,234.56 USD / 1 234,56 € / $12.5k
+_MONEY_RE = re.compile(
+    rf"(?:(?P<symbol>[$€£])\s?(?P<num1>{_NUMBER})\s?(?P<suffix1>[kKmM])?\b)"
+    rf"|(?:(?P<num2>{_NUMBER})\s?(?P<suffix2>[kKmM])?\s?(?:(?P<code>USD|EUR|GBP)\b|[$€£]))"
+)
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+_TOTAL_RE = re.compile(r"\b(gross\s+)?total\b", re.IGNORECASE)
+_SKIP_LABEL_RE = re.compile(r"\b(saving|savings|reduction|discount|potential|average|%|percent)\b", re.IGNORECASE)
+
+
+def _parse_money(match) -> float:
+    number = match.group("num1") or match.group("num2")
+    suffix = match.group("suffix1") or match.group("suffix2")
+    value = float(parse_amount(number))
+    if suffix:
+        value *= _SUFFIXES[suffix.lower()]
+    return value
+
+
+def normalize_label(label: str) -> str:
+    """Normalizes a vendor label for comparison ("**ACME Inc.**:" -> "acme inc")."""
+    label = re.sub(r"[*_`#|:\-–]+", " ", label)
+    label = re.sub(r"[^\w\s&]", "", label)
+    return " ".join(label.lower().split())
+
+
+def extract_figures(markdown: str) -> dict:
+    """
+    Extracts the stated gross totals and per-vendor amounts from a Markdown report.
+
+    Figures are read from table rows ("| Vendor | $1,234 |") and labelled lines
+    ("- **Vendor**: $1,234"). Labels mentioning savings, discounts or averages are
+    ignored, as they are not spend figures. Other labels may also be categories or
+    months: verify_reports only keeps those naming a known vendor.
+
+    Args:
+        markdown (str): Report content.
+
+    Returns:
+        dict: {"totals": [float], "vendors": {normalized vendor: float}}
+    """
+    totals = []
+    vendors = {}
+    for line in markdown.splitlines():
+        line = line.strip()
+        if not line or set(line) <= set("|-: "):
+            continue
+        if line.startswith("|"):
+            cells = [c.strip() for c in line.strip("|").split("|")]
+            label = cells[0]
+            rest = " | ".join(cells[1:])
+        elif ":" in line:
+            label, rest = line.split(":", 1)
+        else:
+            continue
+        match = _MONEY_RE.search(rest)
+        if not match or _SKIP_LABEL_RE.search(label) or _SKIP_LABEL_RE.search(rest[:match.start()]):
+            continue
+        value = _parse_money(match)
+        if _TOTAL_RE.search(label):
+            totals.append(value)
+            continue
+        name = normalize_label(label)
+        if name and not name.isdigit() and name not in vendors:
+            vendors[name] = value
+    return {"totals": totals, "vendors": vendors}
+
+
+def _close(a: float, b: float, rel_tol: float, abs_tol: float) -> bool:
+    return abs(a - b) <= max(abs_tol, rel_tol * max(abs(a), abs(b)))
+
+
+def verify_reports(reports: dict, expense_data=None, rel_tol: float = 0.01, abs_tol: float = 1.0,
+                   vendor_index=None) -> dict:
+    """
+    Cross-checks the figures of several reports against each other and against the
+    computed invoice aggregates. Vendor figures are those whose label is a vendor of
+    expense_data or of the vendor index.
+
+    Args:
+        reports (dict): Report name -> Markdown content.
+        expense_data (dict | InvoiceStore | SpendCube): Computed vendor -> total expense, if available.
+        rel_tol (float): Relative tolerance for rounding in reports.
+        abs_tol (float): Absolute tolerance for rounding in reports.
+        vendor_index (VendorIndex): Canonical vendor names (the shared alias table by default).
+
+    Returns:
+        dict: {"checked": int, "mismatches": [dict], "figures": {report: figures}, "currency": str,
+        "unconverted": [currencies left unconverted in the computed aggregates],
+        "stale": [currencies converted with rates outside the rate table's dates]}
+    """
+    currency, unconverted, stale = REPORTING_CURRENCY, set(), set()
+    if isinstance(expense_data, SpendCube):
+        currency, unconverted, stale = expense_data.reporting, expense_data.unconverted, expense_data.stale
+        expense_data = expense_data.vendor_totals()
+    elif isinstance(expense_data, InvoiceStore):
+        expense_data = vendor_totals_in(expense_data, unconverted=unconverted, stale=stale)
+    vendor_index = vendor_index if vendor_index is not None else get_vendor_index()
+
+    def vendor_key(label):
+        # Spellings of the same supplier ("ACME Inc." / "Acme Incorporated") share a key
+        canonical = vendor_index.lookup(label)
+        return normalize_label(canonical or label), canonical is not None
+
+    expected = {}
+    for vendor, total in (expense_data or {}).items():
+        key, _ = vendor_key(vendor)
+        expected[key] = expected.get(key, 0.0) + float(total)
+    expected_total = sum(expected.values()) if expected else None
+
+    figures = {}
+    for name, content in reports.items():
+        found = extract_figures(content)
+        # Only labels naming a known vendor count: breakdowns by category or month are
+        # not vendor figures. A vendor stated twice, in any spelling, is checked against
+        # its first figure (extract_figures applies the same rule to identical labels).
+        vendors = {}
+        for label, amount in found["vendors"].items():
+            key, known = vendor_key(label)
+            if known or key in expected:
+                vendors.setdefault(key, amount)
+        figures[name] = {"totals": found["totals"], "vendors": vendors}
+    mismatches = []
+    checked = 0
+
+    def check(report, what, stated, reference, source):
+        nonlocal checked
+        checked += 1
+        if not _close(stated, reference, rel_tol, abs_tol):
+            mismatches.append({
+                "report": report,
+                "figure": what,
+                "stated": stated,
+                "expected": reference,
+                "source": source,
+            })
+
+    for report, found in figures.items():
+        vendor_sum = sum(found["vendors"].values())
+        # Internal consistency: listed vendors can never exceed the stated total
+        if found["totals"] and found["vendors"]:
+            checked += 1
+            total = found["totals"][0]
+            if vendor_sum > total and not _close(vendor_sum, total, rel_tol, abs_tol):
+                mismatches.append({
+                    "report": report,
+                    "figure": "sum of vendor amounts",
+                    "stated": vendor_sum,
+                    "expected": total,
+                    "source": "stated total",
+                })
+        # Against computed aggregates
+        if expected:
+            for total in found["totals"][:1]:
+                check(report, "gross total", total, expected_total, "invoice aggregates")
+            for vendor, amount in found["vendors"].items():
+                if vendor in expected:
+                    check(report, f"vendor {vendor}", amount, expected[vendor], "invoice aggregates")
+
+    # Across reports: compare every report with the first one (the expense analysis)
+    names = list(figures)
+    for report in names[1:]:
+        mine, theirs = figures[report], figures[names[0]]
+        if mine["totals"] and theirs["totals"]:
+            check(report, "gross total", mine["totals"][0], theirs["totals"][0], names[0])
+        for vendor in mine["vendors"].keys() & theirs["vendors"].keys():
+            check(report, f"vendor {vendor}", mine["vendors"][vendor], theirs["vendors"][vendor], names[0])
+
+    return {"checked": checked, "mismatches": mismatches, "figures": figures, "currency": currency,
+            "unconverted": sorted(unconverted), "stale": sorted(stale)}
+
+
+def format_verification(result: dict) -> str:
+    """Renders a verification result as a Markdown supervision report."""
+    lines = ["# Supervision Report", "", "## Numeric Cross-Check", ""]
+    lines.append(f"- Figures checked: {result['checked']}")
+    lines.append(f"- Mismatches: {len(result['mismatches'])}")
+    currency = result.get("currency", REPORTING_CURRENCY)
+    if result.get("unconverted"):
+        lines.append(f"- Not converted to {currency} (no exchange rates): {', '.join(result['unconverted'])}")
+    if result.get("stale"):
+        lines.append(f"- Converted with rates from outside the rate table's dates: {', '.join(result['stale'])}")
+    lines.append("")
+    if result["mismatches"]:
+        lines.append("| Report | Figure | Stated | Expected | Compared with |")
+        lines.append("|---|---|---|---|---|")
+        for m in result["mismatches"]:
+            stated, expected = format_amount(m["stated"], currency), format_amount(m["expected"], currency)
+            lines.append(f"| {m['report']} | {m['figure']} | {stated} | {expected} | {m['source']} |")
+    else:
+        lines.append("All reported figures are consistent with each other and with the computed aggregates.")
+    return "\n".join(lines) + "\n"
+
+
+def verify_run(run_id: str, expense_data=None, **tolerances) -> dict:
+    """
+    Verifies the reports of a run and writes supervision_report.md and verification.json.
+
+    Args:
+        run_id (str): Identifier of the run.
+        expense_data (dict | InvoiceStore | SpendCube): Computed vendor -> total expense, if available.
+        **tolerances: rel_tol / abs_tol passed to verify_reports.
+    """
+    reports = {}
+    for filename, _ in REPORTS:
+        path = run_file(run_id, filename)
+        if filename != SUPERVISION_REPORT and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                reports[filename] = f.read()
+    result = verify_reports(reports, expense_data, **tolerances)
+    atomic_write(run_file(run_id, "verification.json"), json.dumps(result, indent=2))
+    atomic_write(run_file(run_id, SUPERVISION_REPORT), format_verification(result))
+    return result
@@ -0,0 +1,208 @@
+import json
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+DEFAULT_RUN_ID = "default"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokens(text: str):
+    return set(_TOKEN_RE.findall(str(text).lower()))
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(_TOKEN_RE.findall(str(query).lower()))
+
+
+class RunMemory:
+    """
+    Shared memory for a single analysis run.
+
+    Stores retrieved chunks, computed figures and intermediate conclusions so that
+    every agent of the crew can reuse what a previous agent already found. Entries
+    are indexed by key and by the words of their content.
+
+    Args:
+        run_id (str): Identifier of the run this memory belongs to.
+        path (str): Optional JSON file used to persist the memory.
+    """
+
+    def __init__(self, run_id: str = DEFAULT_RUN_ID, path: str = None):
+        self.run_id = run_id
+        self.path = path
+        self._entries = {}
+        self._index = {}
+        self._searches = {}
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self.load()
+
+    # ------------------------------------------------------------------ entries
+
+    def put(self, key: str, content, kind: str = "note", agent: str = None):
+        """
+        Stores (or replaces) an entry.
+
+        Args:
+            key (str): Unique key, e.g. "figure:total_spend" or "chunk:<id>".
+            content: Text or JSON-serializable value.
+            kind (str): "chunk", "figure", "conclusion" or "note".
+            agent (str): Role of the agent that produced the entry.
+        """
+        with self._lock:
+            self._unindex(key)
+            entry = {"key": key, "kind": kind, "content": content, "agent": agent, "created_at": time.time()}
+            self._entries[key] = entry
+            for token in _tokens(key) | _tokens(content):
+                self._index.setdefault(token, set()).add(key)
+        return entry
+
+    def _unindex(self, key):
+        old = self._entries.get(key)
+        if old is None:
+            return
+        for token in _tokens(key) | _tokens(old["content"]):
+            keys = self._index.get(token)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._index[token]
+
+    def get(self, key: str):
+        with self._lock:
+            return self._entries.get(key)
+
+    def entries(self, kind: str = None):
+        with self._lock:
+            return [e for e in self._entries.values() if kind is None or e["kind"] == kind]
+
+    def search(self, query: str, limit: int = 10, kind: str = None):
+        """
+        Returns the entries sharing the most words with the query, best first.
+        """
+        with self._lock:
+            scores = {}
+            for token in _tokens(query):
+                for key in self._index.get(token, ()):
+                    scores[key] = scores.get(key, 0) + 1
+            ranked = sorted(
+                (self._entries[key] for key in scores),
+                key=lambda e: (scores[e["key"]], e["created_at"]),
+                reverse=True,
+            )
+            return [e for e in ranked if kind is None or e["kind"] == kind][:limit]
+
+    # ------------------------------------------------------- knowledge base cache
+
+    def cached_search(self, query: str):
+        """Returns the chunk entries of a previous identical knowledge base search, or None."""
+        with self._lock:
+            keys = self._searches.get(_normalize_query(query))
+            if keys is None:
+                return None
+            return [self._entries[key] for key in keys if key in self._entries]
+
+    def store_search(self, query: str, chunks, agent: str = None):
+        """
+        Records knowledge base chunks returned for a query.
+
+        Args:
+            query (str): The search query.
+            chunks (list): (chunk_id, content) pairs.
+            agent (str): Role of the agent that ran the search.
+        """
+        with self._lock:
+            keys = []
+            for chunk_id, content in chunks:
+                key = f"chunk:{chunk_id}"
+                if key not in self._entries:
+                    self.put(key, content, kind="chunk", agent=agent)
+                keys.append(key)
+            self._searches[_normalize_query(query)] = keys
+            return [self._entries[key] for key in keys]
+
+    # -------------------------------------------------------------- persistence
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            data = {"run_id": self.run_id, "entries": list(self._entries.values()), "searches": self._searches}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str = None):
+        path = path or self.path
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            for entry in data.get("entries", []):
+                self.put(entry["key"], entry["content"], kind=entry.get("kind", "note"), agent=entry.get("agent"))
+                self._entries[entry["key"]]["created_at"] = entry.get("created_at", time.time())
+            self._searches.update(data.get("searches", {}))
+
+
+_memories = {}
+_memories_lock = threading.Lock()
+_run_tokens = {}
+_active_run_id = ContextVar("active_run_id", default=None)
+
+
+def active_run_id():
+    """Returns the id of the run active in the current context, or None outside a run."""
+    return _active_run_id.get()
+
+
+def get_run_memory(run_id: str = None) -> RunMemory:
+    """
+    Returns the memory of the given run (the active run by default).
+
+    Raises:
+        RuntimeError: If no run is active or the run has no memory (not started or released).
+    """
+    run_id = run_id or _active_run_id.get()
+    if run_id is None:
+        raise RuntimeError("No active run: run memory is only available while an analysis runs.")
+    with _memories_lock:
+        memory = _memories.get(run_id)
+    if memory is None:
+        raise RuntimeError(f"No memory for run {run_id!r}: the run was not started or is finished.")
+    return memory
+
+
+def start_run_memory(run_id: str, path: str = None) -> RunMemory:
+    """
+    Creates a fresh memory for a run and makes it the active one.
+
+    Args:
+        run_id (str): Identifier of the run.
+        path (str): Optional JSON file to persist the memory to.
+    """
+    with _memories_lock:
+        memory = _memories[run_id] = RunMemory(run_id, path)
+        _run_tokens[run_id] = _active_run_id.set(run_id)
+    return memory
+
+
+def release_run_memory(run_id: str):
+    """Saves and forgets the memory of a finished run, and restores the previously active run."""
+    with _memories_lock:
+        memory = _memories.pop(run_id, None)
+        token = _run_tokens.pop(run_id, None)
+    if token is not None:
+        try:
+            _active_run_id.reset(token)
+        except ValueError:
+            # Released from another context than the one that started the run
+            if _active_run_id.get() == run_id:
+                _active_run_id.set(None)
+    if memory is not None:
+        memory.save()
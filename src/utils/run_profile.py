@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+from src.utils.runs import atomic_write
+
+# Approximate USD prices per 1M tokens (input, output), used for cost estimates only
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+class RunProfile:
+    """
+    Per-model latency and cost accounting for a single run.
+
+    Args:
+        run_id (str): Identifier of the run being profiled.
+    """
+
+    def __init__(self, run_id: str = None):
+        self.run_id = run_id
+        self._models = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, run_id: str, path: str):
+        """Returns the profile saved at `path`, so a resumed run adds to the calls already made."""
+        profile = cls(run_id)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                models = json.load(f).get("models", {})
+            for stats in models.values():
+                # Averages are derived again by summary()
+                stats.pop("avg_seconds", None)
+                stats.pop("avg_queue_seconds", None)
+            profile._models = models
+        return profile
+
+    def record(self, model: str, agent: str, seconds: float, prompt_tokens: int, completion_tokens: int, error: bool = False,
+               queue_seconds: float = 0.0, attempts: int = 1):
+        """
+        Records one LLM call.
+
+        Args:
+            seconds (float): Time spent in the provider, summed over the attempts.
+            queue_seconds (float): Time spent waiting in the scheduler queue and in retry backoff.
+            attempts (int): Provider requests made for the call (1 + retries).
+        """
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+        with self._lock:
+            stats = self._models.setdefault(model, {
+                "calls": 0,
+                "attempts": 0,
+                "errors": 0,
+                "seconds": 0.0,
+                "queue_seconds": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "estimated_cost_usd": 0.0,
+                "agents": {},
+            })
+            stats["calls"] += 1
+            stats["attempts"] += attempts
+            stats["errors"] += int(error)
+            stats["seconds"] += seconds
+            stats["queue_seconds"] += queue_seconds
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+            stats["estimated_cost_usd"] += cost
+            stats["agents"][agent] = stats["agents"].get(agent, 0) + 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            models = json.loads(json.dumps(self._models))
+        for stats in models.values():
+            # Provider latency per request, and scheduler wait per call
+            stats["avg_seconds"] = stats["seconds"] / stats["attempts"] if stats["attempts"] else 0.0
+            stats["avg_queue_seconds"] = stats["queue_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        return {
+            "run_id": self.run_id,
+            "models": models,
+            "total_seconds": sum(s["seconds"] for s in models.values()),
+            "total_queue_seconds": sum(s["queue_seconds"] for s in models.values()),
+            "total_estimated_cost_usd": sum(s["estimated_cost_usd"] for s in models.values()),
+        }
+
+    def save(self, path: str):
+        atomic_write(path, json.dumps(self.summary(), indent=2))
@@ -0,0 +1,141 @@
+import os
+import re
+import tempfile
+import uuid
+from datetime import datetime
+
+RUNS_DIR = os.getenv("RUNS_DIR", "runs")
+
+# Folder of a run holding the invoice files it was started with
+INPUTS_DIR = "inputs"
+
+# Only folder the API may read invoice files from; other paths are rejected
+INPUTS_ROOT = os.getenv("INPUTS_ROOT", "invoices")
+
+# Report filename -> display label, in the order the crew produces them
+REPORTS = [
+    ("expense_report.md", "📊 Expense Analysis"),
+    ("final_expense_report.md", "📑 Final Report"),
+    ("compliance_audit.md", "🔍 Compliance Audit"),
+    ("negotiated_suppliers.md", "💼 Supplier Negotiations"),
+    ("supervision_report.md", "🧭 Supervision"),
+]
+
+_RUN_ID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def new_run_id() -> str:
+    """Returns a unique, sortable run id such as 20250101-120000-1a2b3c4d."""
+    return f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def get_run_dir(run_id: str, create: bool = True) -> str:
+    """
+    Returns the output directory of a run.
+
+    Args:
+        run_id (str): Identifier of the run.
+        create (bool): Create the directory if it does not exist.
+    """
+    if not _RUN_ID_RE.match(run_id):
+        raise ValueError(f"Invalid run id: {run_id!r}")
+    path = os.path.join(RUNS_DIR, run_id)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def run_file(run_id: str, filename: str) -> str:
+    """Returns the path of a file inside a run directory."""
+    return os.path.join(get_run_dir(run_id), filename)
+
+
+def save_run_input(run_id: str, filename: str, content: bytes) -> str:
+    """
+    Saves an uploaded invoice file into the run's inputs folder, so concurrent runs never
+    share or overwrite each other's files.
+
+    Args:
+        run_id (str): Identifier of the run.
+        filename (str): Name of the uploaded file; any folder part is dropped.
+        content (bytes): File content.
+
+    Returns:
+        str: Path of the saved file.
+    """
+    name = os.path.basename(str(filename).replace("\\", "/"))
+    if name in ("", ".", ".."):
+        raise ValueError(f"Invalid input file name: {filename!r}")
+    path = os.path.join(get_run_dir(run_id), INPUTS_DIR, name)
+    atomic_write(path, content, mode="wb")
+    return path
+
+
+def resolve_input_file(path: str, root: str = None) -> str:
+    """
+    Resolves an invoice file submitted by path, relative to the inputs root.
+
+    Args:
+        path (str): File path, relative to the inputs root.
+        root (str): Inputs root (INPUTS_ROOT by default).
+
+    Raises:
+        ValueError: If the path leaves the inputs root (absolute path, "..", symlink) or
+            is not an existing file.
+    """
+    root = os.path.realpath(root or INPUTS_ROOT)
+    resolved = os.path.realpath(os.path.join(root, str(path)))
+    if os.path.commonpath([root, resolved]) != root or not os.path.isfile(resolved):
+        raise ValueError(f"Invoice file not found in the inputs folder: {path!r}")
+    return resolved
+
+
+def list_runs():
+    """Returns the ids of all runs on disk, most recent first."""
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    return sorted(
+        (name for name in os.listdir(RUNS_DIR) if os.path.isdir(os.path.join(RUNS_DIR, name))),
+        reverse=True,
+    )
+
+
+def atomic_write(path: str, content, mode: str = "w"):
+    """
+    Writes a file atomically: readers see either the old or the new content.
+
+    Args:
+        path (str): Destination file.
+        content (str | bytes): Content to write.
+        mode (str): "w" for text, "wb" for bytes.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, mode, **({"encoding": "utf-8"} if "b" not in mode else {})) as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_target(path: str) -> str:
+    """Returns a temporary sibling path for writers that need a filename; commit with os.replace."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.tmp-{uuid.uuid4().hex[:8]}{ext}"
+
+
+def save_task_output(path: str):
+    """
+    Returns a CrewAI task callback that atomically saves the task output to a file.
+
+    Args:
+        path (str): Destination Markdown file.
+    """
+    def callback(output):
+        content = getattr(output, "raw", None) or getattr(output, "raw_output", None) or str(output)
+        atomic_write(path, content)
+    return callback
@@ -0,0 +1,352 @@
+import os
+import threading
+import zipfile
+
+import numpy as np
+
+from src.utils.currency import REPORTING_CURRENCY, currency_note, normalize_cents
+from src.utils.invoice_store import AMOUNT_SCALE, COLUMNS, NO_DATE
+from src.utils.runs import atomic_target
+
+DIMENSIONS = ("vendor", "month", "category")
+UNKNOWN_MONTH = -1
+
+# Persisted cube of a run, read by the dashboard
+SPEND_CUBE_FILE = "spend_cube.npz"
+
+# Vendors listed in the spend-by-vendor figure stored in the run memory
+MEMORY_TOP_VENDORS = 50
+
+# datetime64 counts days from 1970-01-01, which is date ordinal 719163
+_EPOCH_ORDINAL = 719163
+
+
+def dates_from_ordinals(ordinals) -> np.ndarray:
+    """Converts date ordinals to datetime64[D] (NaT for undated rows)."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    days = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+    return np.where(ordinals == NO_DATE, np.datetime64("NaT", "D"), days)
+
+
+def months_from_ordinals(ordinals) -> np.ndarray:
+    """Converts date ordinals to months since 1970-01 (UNKNOWN_MONTH for undated rows)."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    days = (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+    months = days.astype("datetime64[M]").astype(np.int64)
+    return np.where(ordinals == NO_DATE, UNKNOWN_MONTH, months)
+
+
+def month_label(month: int) -> str:
+    """Formats a month index as YYYY-MM."""
+    if month == UNKNOWN_MONTH:
+        return "unknown"
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+def parse_month(label: str) -> int:
+    """Parses a YYYY-MM label into a month index."""
+    year, month = label.strip()[:7].split("-")
+    return (int(year) - 1970) * 12 + int(month) - 1
+
+
+class SpendCube:
+    """
+    Precomputed vendor x month x category spend aggregates over an InvoiceStore.
+
+    The cube subscribes to the store and folds each sealed chunk in as invoices are
+    ingested (one vectorized pass per chunk, amounts normalized to the reporting
+    currency), so slice and rollup queries only touch aggregated cells. Create it on
+    the store before loading invoices: chunks sealed earlier are replayed once.
+
+    Args:
+        store (InvoiceStore): Invoices to aggregate.
+        reporting (str): Reporting currency of the aggregates.
+        table (RateTable): Rate table for currency conversion (local cached table by default).
+    """
+
+    def __init__(self, store, reporting: str = REPORTING_CURRENCY, table=None):
+        self.store = store
+        self.reporting = reporting
+        self._table = table
+        # Currencies without exchange rates, whose amounts are kept unconverted
+        self.unconverted = set()
+        # Currencies converted with rates from outside the rate table's dates
+        self.stale = set()
+        self._cells = {}
+        self._arrays = None
+        self._lock = threading.RLock()
+        store.subscribe(self._ingest)
+
+    def _normalize(self, chunk) -> np.ndarray:
+        return normalize_cents(chunk["currency"], chunk["date"], chunk["amount"], self.store.currencies.values,
+                               self.reporting, self._table, self.unconverted, self.stale)
+
+    def _ingest(self, chunk):
+        cents = self._normalize(chunk)
+        keys = np.stack([
+            np.asarray(chunk["vendor"], dtype=np.int64),
+            months_from_ordinals(chunk["date"]),
+            np.asarray(chunk["category"], dtype=np.int64),
+        ], axis=1)
+        cells, inverse = np.unique(keys, axis=0, return_inverse=True)
+        sums = np.zeros(len(cells), dtype=np.int64)
+        np.add.at(sums, inverse.reshape(-1), cents)
+        counts = np.bincount(inverse.reshape(-1), minlength=len(cells))
+        with self._lock:
+            for (vendor, month, category), total, count in zip(cells.tolist(), sums.tolist(), counts.tolist()):
+                cell = self._cells.get((vendor, month, category))
+                self._cells[(vendor, month, category)] = (cell[0] + total, cell[1] + count) if cell else (total, count)
+            self._arrays = None
+
+    def _columns(self):
+        """Cell arrays (vendor, month, category, cents, count), rebuilt only after updates."""
+        self.store.flush()
+        with self._lock:
+            if self._arrays is None:
+                keys = list(self._cells)
+                values = list(self._cells.values())
+                self._arrays = {
+                    "vendor": np.array([k[0] for k in keys], dtype=np.int64),
+                    "month": np.array([k[1] for k in keys], dtype=np.int64),
+                    "category": np.array([k[2] for k in keys], dtype=np.int64),
+                    "cents": np.array([v[0] for v in values], dtype=np.int64),
+                    "count": np.array([v[1] for v in values], dtype=np.int64),
+                }
+            return self._arrays
+
+    def _mask(self, columns, vendor=None, category=None, start_month=None, end_month=None):
+        mask = np.ones(len(columns["cents"]), dtype=bool)
+        if vendor is not None:
+            codes = [self.store.vendors.codes.get(v, -1) for v in _as_list(vendor)]
+            mask &= np.isin(columns["vendor"], codes)
+        if category is not None:
+            codes = [self.store.categories.codes.get(c, -1) for c in _as_list(category)]
+            mask &= np.isin(columns["category"], codes)
+        if start_month is not None:
+            mask &= columns["month"] >= parse_month(start_month)
+        if end_month is not None:
+            mask &= columns["month"] <= parse_month(end_month)
+        return mask
+
+    def rollup(self, by=("vendor",), vendor=None, category=None, start_month=None, end_month=None) -> dict:
+        """
+        Aggregates the cube along some dimensions, optionally on a slice.
+
+        Args:
+            by (tuple): Dimensions to keep, among "vendor", "month" and "category"
+                (empty for the grand total).
+            vendor (str | list): Only these vendors.
+            category (str | list): Only these categories.
+            start_month (str): First month (YYYY-MM), inclusive.
+            end_month (str): Last month (YYYY-MM), inclusive.
+
+        Returns:
+            dict: key -> total in the reporting currency. Keys are labels for a single
+            dimension and tuples of labels for several.
+        """
+        if isinstance(by, str):
+            by = (by,)
+        unknown = set(by) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}")
+        columns = self._columns()
+        mask = self._mask(columns, vendor, category, start_month, end_month)
+        if not by:
+            return {(): int(columns["cents"][mask].sum()) / AMOUNT_SCALE}
+        keys = np.stack([columns[d][mask] for d in by], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        sums = np.zeros(len(groups), dtype=np.int64)
+        np.add.at(sums, inverse.reshape(-1), columns["cents"][mask])
+        result = {}
+        for group, cents in zip(groups.tolist(), sums.tolist()):
+            labels = tuple(self._label(d, code) for d, code in zip(by, group))
+            result[labels[0] if len(by) == 1 else labels] = cents / AMOUNT_SCALE
+        return result
+
+    def _label(self, dimension, code):
+        if dimension == "vendor":
+            return self.store.vendors.values[code]
+        if dimension == "category":
+            return self.store.categories.values[code]
+        return month_label(code)
+
+    def vendor_totals(self, **filters) -> dict:
+        """Returns the vendor -> total dict expected by generate_charts."""
+        return self.rollup(("vendor",), **filters)
+
+    def monthly_series(self, **filters) -> dict:
+        """Returns month (YYYY-MM) -> total, in chronological order, for trend charts."""
+        series = self.rollup(("month",), **filters)
+        return dict(sorted(series.items()))
+
+    def anomalies(self, threshold: float = 3.0, **filters) -> list:
+        """
+        Flags vendor-months whose spend deviates from the vendor's median month by more
+        than `threshold` median absolute deviations.
+        """
+        return flag_anomalies(self.rollup(("vendor", "month"), **filters), threshold)
+
+    def store_figures(self, memory):
+        """
+        Stores the grand total, the vendor rollup and the monthly series in a run memory
+        as "figure" entries, so agents reuse the computed figures instead of re-deriving them.
+
+        Args:
+            memory (RunMemory): Memory of the run.
+        """
+        columns = self._columns()
+        total = int(columns["cents"].sum()) / AMOUNT_SCALE
+        note = currency_note(self.reporting, self.unconverted, self.stale)
+        memory.put("figure:total_spend", f"Total spend: {total:,.2f} {self.reporting} over "
+                   f"{int(columns['count'].sum()):,} invoices. {note}".rstrip(), kind="figure")
+        vendors = sorted(self.vendor_totals().items(), key=lambda item: -item[1])
+        lines = [f"Spend by vendor ({self.reporting}), highest first:"]
+        lines += [f"- {vendor}: {amount:,.2f}" for vendor, amount in vendors[:MEMORY_TOP_VENDORS]]
+        if len(vendors) > MEMORY_TOP_VENDORS:
+            lines.append(f"... and {len(vendors) - MEMORY_TOP_VENDORS} more vendors (see the spend cube).")
+        memory.put("figure:spend_by_vendor", "\n".join(lines), kind="figure")
+        lines = [f"Spend by month ({self.reporting}):"]
+        lines += [f"- {month}: {amount:,.2f}" for month, amount in self.monthly_series().items()]
+        memory.put("figure:spend_by_month", "\n".join(lines), kind="figure")
+
+    def save(self, path: str):
+        """
+        Persists the cube cells, the labels and the invoice columns (amounts normalized
+        to the reporting currency, for drill-down) to a single .npz file.
+
+        Invoice columns are streamed chunk by chunk into the archive, and normalized
+        amounts are recomputed per chunk (conversion factors are memoized), so spilled
+        chunks are never loaded into memory all at once.
+
+        Args:
+            path (str): Destination file, usually SPEND_CUBE_FILE in the run directory.
+        """
+        columns = self._columns()
+        # All rows are sealed by _columns(), so the chunks cover every invoice
+        rows = sum(len(chunk["amount"]) for chunk in self.store.iter_chunks())
+        tmp_path = atomic_target(path)
+        try:
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+                for name, values in columns.items():
+                    _write_npy(archive, f"cell_{name}", values)
+                for name in ("vendor", "date", "category", "currency", "amount"):
+                    _write_npy_chunks(archive, f"invoice_{name}", COLUMNS[name][1], rows,
+                                      (chunk[name] for chunk in self.store.iter_chunks()))
+                _write_npy_chunks(archive, "invoice_cents", np.int64, rows,
+                                  (self._normalize(chunk) for chunk in self.store.iter_chunks()))
+                _write_npy(archive, "vendors", np.array(self.store.vendors.values, dtype=str))
+                _write_npy(archive, "categories", np.array(self.store.categories.values, dtype=str))
+                _write_npy(archive, "currencies", np.array(self.store.currencies.values, dtype=str))
+                _write_npy(archive, "reporting", np.array(self.reporting))
+                _write_npy(archive, "unconverted", np.array(sorted(self.unconverted), dtype=str))
+                _write_npy(archive, "stale", np.array(sorted(self.stale), dtype=str))
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def _write_npy(archive, name: str, array):
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+        np.lib.format.write_array(f, np.asarray(array), allow_pickle=False)
+
+
+def _write_npy_chunks(archive, name: str, dtype, length: int, parts):
+    """Writes a 1-D array of `length` items to an .npz archive from consecutive parts."""
+    dtype = np.dtype(dtype)
+    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (length,)}
+    written = 0
+    with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+        np.lib.format.write_array_header_1_0(f, header)
+        for part in parts:
+            part = np.ascontiguousarray(part, dtype=dtype)
+            f.write(part.tobytes())
+            written += len(part)
+    if written != length:
+        raise ValueError(f"{name}: wrote {written} rows, expected {length}")
+
+
+def load_cube_arrays(path: str) -> dict:
+    """Loads a cube saved with SpendCube.save as a dict of numpy arrays."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_cube_rollups(path: str):
+    """
+    Vendor and monthly rollups of a cube saved with SpendCube.save.
+
+    Returns:
+        tuple: (vendor -> total, month (YYYY-MM) -> total in chronological order, reporting currency,
+        currencies left unconverted in the totals, currencies converted with stale rates)
+    """
+    arrays = load_cube_arrays(path)
+    vendors = arrays["vendors"].tolist()
+    by_vendor = np.zeros(len(vendors), dtype=np.int64)
+    np.add.at(by_vendor, arrays["cell_vendor"], arrays["cell_cents"])
+    months, inverse = np.unique(arrays["cell_month"], return_inverse=True)
+    by_month = np.zeros(len(months), dtype=np.int64)
+    np.add.at(by_month, inverse.reshape(-1), arrays["cell_cents"])
+    vendor_totals = {vendor: cents / AMOUNT_SCALE for vendor, cents in zip(vendors, by_vendor.tolist()) if cents}
+    monthly = {month_label(month): cents / AMOUNT_SCALE for month, cents in zip(months.tolist(), by_month.tolist())}
+    return vendor_totals, monthly, str(arrays["reporting"]), cube_unconverted(arrays), cube_stale(arrays)
+
+
+def cube_unconverted(arrays: dict) -> list:
+    """Currencies left unconverted in a saved cube (cubes saved before this flag have none)."""
+    return arrays["unconverted"].tolist() if "unconverted" in arrays else []
+
+
+def cube_stale(arrays: dict) -> list:
+    """Currencies converted with stale rates in a saved cube (cubes saved before this flag have none)."""
+    return arrays["stale"].tolist() if "stale" in arrays else []
+
+
+def flag_anomalies(totals: dict, threshold: float = 3.0) -> list:
+    """
+    Median/MAD outlier rule over vendor-month totals.
+
+    Args:
+        totals (dict): (vendor, month label) -> total.
+        threshold (float): Deviation, in median absolute deviations, above which a month is flagged.
+    """
+    flagged = []
+    by_vendor = {}
+    for (vendor, month), total in totals.items():
+        if month != "unknown":
+            by_vendor.setdefault(vendor, []).append((month, total))
+    for vendor, points in by_vendor.items():
+        if len(points) < 3:
+            continue
+        values = np.array([total for _, total in points])
+        median = np.median(values)
+        mad = np.median(np.abs(values - median)) or max(abs(median) * 0.1, 1.0)
+        for month, total in points:
+            score = (total - median) / mad
+            if abs(score) > threshold:
+                flagged.append({"vendor": vendor, "month": month, "total": total, "median": float(median), "score": float(score)})
+    return sorted(flagged, key=lambda a: -abs(a["score"]))
+
+
+def _as_list(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+_cubes = {}
+_cubes_lock = threading.Lock()
+
+
+def register_cube(run_id: str, cube: SpendCube):
+    """Makes a run's cube available to the agents' tools."""
+    with _cubes_lock:
+        _cubes[run_id] = cube
+
+
+def get_cube(run_id: str):
+    with _cubes_lock:
+        return _cubes.get(run_id)
+
+
+def release_cube(run_id: str):
+    with _cubes_lock:
+        _cubes.pop(run_id, None)
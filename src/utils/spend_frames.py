@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from src.utils.invoice_store import AMOUNT_SCALE
+from src.utils.spend_cube import (
+    UNKNOWN_MONTH, cube_stale, cube_unconverted, dates_from_ordinals, load_cube_arrays, month_label, months_from_ordinals,
+)
+
+# Invoices shown at once in the drill-down table
+DRILL_DOWN_ROWS = 1000
+
+
+def build_spend_frames(path: str):
+    """
+    Builds the cell and invoice frames of a persisted spend cube.
+
+    Args:
+        path (str): Spend cube file of a run.
+
+    Returns:
+        tuple: (cells, invoices, reporting currency, unconverted currencies, currencies converted
+        with stale rates) with categorical vendor and category columns.
+    """
+    arrays = load_cube_arrays(path)
+    vendors = arrays["vendors"].tolist()
+    categories = arrays["categories"].tolist()
+
+    cells = pd.DataFrame({
+        "vendor": pd.Categorical.from_codes(arrays["cell_vendor"], vendors),
+        "month": arrays["cell_month"],
+        "category": pd.Categorical.from_codes(arrays["cell_category"], categories),
+        "total": arrays["cell_cents"] / AMOUNT_SCALE,
+        "invoices": arrays["cell_count"],
+    })
+
+    invoices = pd.DataFrame({
+        "date": dates_from_ordinals(arrays["invoice_date"]),
+        "month": months_from_ordinals(arrays["invoice_date"]),
+        "vendor": pd.Categorical.from_codes(arrays["invoice_vendor"], vendors),
+        "category": pd.Categorical.from_codes(arrays["invoice_category"], categories),
+        "amount": arrays["invoice_amount"] / AMOUNT_SCALE,
+        "currency": pd.Categorical.from_codes(arrays["invoice_currency"], arrays["currencies"].tolist()),
+        "total": arrays["invoice_cents"] / AMOUNT_SCALE,
+    })
+    return cells, invoices, str(arrays["reporting"]), cube_unconverted(arrays), cube_stale(arrays)
+
+
+def filter_frame(frame, vendors=None, categories=None, month_range=None):
+    """Rows of a cell or invoice frame matching the selected vendors, categories and (first, last) month."""
+    mask = np.ones(len(frame), dtype=bool)
+    if vendors:
+        mask &= frame["vendor"].isin(vendors).to_numpy()
+    if categories:
+        mask &= frame["category"].isin(categories).to_numpy()
+    if month_range:
+        mask &= frame["month"].between(*month_range).to_numpy()
+    return frame[mask]
+
+
+def vendor_breakdown(cells, limit: int = 20):
+    """Spend per vendor of a cell frame, highest first."""
+    return cells.groupby("vendor", observed=True)["total"].sum().sort_values(ascending=False).head(limit)
+
+
+def monthly_trend(cells):
+    """Month label x category spend of the dated cells (empty when none is dated)."""
+    dated = cells[cells["month"] != UNKNOWN_MONTH]
+    if dated.empty:
+        return dated
+    trend = dated.pivot_table(index="month", columns="category", values="total", aggfunc="sum", observed=True).fillna(0)
+    trend.index = [month_label(m) for m in trend.index]
+    return trend
+
+
+def drill_down(invoices, vendors=None, categories=None, month_range=None, limit: int = DRILL_DOWN_ROWS):
+    """
+    Invoices of a selection, newest first, capped at `limit` rows.
+
+    Returns:
+        tuple: (shown rows without the month column, number of matching invoices)
+    """
+    rows = filter_frame(invoices, vendors, categories, month_range)
+    return rows.sort_values("date", ascending=False).head(limit).drop(columns="month"), len(rows)
@@ -0,0 +1,242 @@
+import difflib
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from src.utils.runs import RUNS_DIR, atomic_write
+
+# Alias table shared by all runs; it grows as new spellings are seen
+VENDOR_ALIASES_PATH = os.getenv("VENDOR_ALIASES_PATH", os.path.join(RUNS_DIR, "vendor_aliases.json"))
+
+# Minimum similarity for a name to be merged into an existing vendor
+MATCH_THRESHOLD = 0.86
+
+# Candidates scored per lookup, and n-grams too common to be useful for blocking
+MAX_CANDIDATES = 10
+MAX_BLOCK_SIZE = 1000
+
+# Legal forms and their normalized spelling; they stay in the key and must agree to merge
+LEGAL_FORMS = {
+    "ag": "ag", "bv": "bv", "co": "co", "company": "co", "corp": "corp", "corporation": "corp",
+    "gmbh": "gmbh", "inc": "inc", "incorporated": "inc", "llc": "llc", "llp": "llp", "limited": "ltd",
+    "ltd": "ltd", "plc": "plc", "pty": "pty", "sa": "sa", "sarl": "sarl", "sas": "sas", "spa": "spa",
+    "srl": "srl",
+}
+_NOISE_WORDS = {"the"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_vendor_name(name: str) -> str:
+    """Normalizes a vendor name for matching ("ACME Inc." and "Acme Incorporated" -> "acme inc")."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    tokens = _TOKEN_RE.findall(text.lower().replace("&", " and "))
+    kept = [LEGAL_FORMS.get(t, t) for t in tokens if t not in _NOISE_WORDS]
+    return " ".join(kept or tokens)
+
+
+def _split_key(key: str):
+    """Splits a normalized name into its core name, numbers and legal forms."""
+    tokens = key.split()
+    core = [t for t in tokens if t not in LEGAL_FORMS] or tokens
+    numbers = sorted(t for t in core if t.isdigit())
+    legal = {t for t in tokens if t in LEGAL_FORMS}
+    return " ".join(core), numbers, legal
+
+
+def compatible(a: str, b: str) -> bool:
+    """
+    Whether two normalized names may be fuzzily merged: their numbers must be identical
+    ("Store 1" is not "Store 2") and their legal forms must agree when both have one
+    ("Alpha SA" is not "Alpha SAS").
+    """
+    _, numbers_a, legal_a = _split_key(a)
+    _, numbers_b, legal_b = _split_key(b)
+    return numbers_a == numbers_b and (not legal_a or not legal_b or legal_a == legal_b)
+
+
+def _ngrams(key: str, n: int = 3) -> set:
+    padded = f" {key} "
+    return {padded[i:i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+def similarity(a: str, b: str) -> float:
+    """Similarity of the core of two normalized names: mean of trigram Dice and edit-based ratio."""
+    a, b = _split_key(a)[0], _split_key(b)[0]
+    grams_a, grams_b = _ngrams(a), _ngrams(b)
+    dice = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+    return (dice + difflib.SequenceMatcher(None, a, b).ratio()) / 2
+
+
+class VendorIndex:
+    """
+    Maps raw vendor names to canonical vendors.
+
+    Names are normalized (case, accents, punctuation, legal forms), then looked up in
+    the alias table. Unknown names are matched against the canonical vendors that share
+    character trigrams with them (blocking), so each lookup scores a handful of
+    candidates instead of every vendor; candidates with other numbers or legal forms are
+    never merged. Names that match nothing become new vendors. A wrong merge is undone
+    with unmerge(), which is saved with the table and wins over the learned aliases.
+
+    Args:
+        path (str): JSON alias table, loaded if it exists and written by save().
+        threshold (float): Minimum similarity to merge a name into an existing vendor.
+    """
+
+    def __init__(self, path: str = VENDOR_ALIASES_PATH, threshold: float = MATCH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._vendors = {}   # canonical key -> display name
+        self._aliases = {}   # normalized name -> canonical key
+        self._blocks = {}    # trigram -> canonical keys
+        self._manual = {}    # normalized name -> canonical key, set by merge() and unmerge()
+        self._mtime = None
+        self._lock = threading.RLock()
+        if path and os.path.exists(path):
+            self.refresh()
+
+    def __len__(self):
+        return len(self._vendors)
+
+    def _add_vendor(self, key: str, name: str):
+        self._vendors[key] = name
+        self._aliases.setdefault(key, key)
+        for gram in _ngrams(_split_key(key)[0]):
+            self._blocks.setdefault(gram, []).append(key)
+
+    def _match(self, key: str):
+        shared = {}
+        for gram in _ngrams(_split_key(key)[0]):
+            block = self._blocks.get(gram, ())
+            if len(block) > MAX_BLOCK_SIZE:
+                continue
+            for candidate in block:
+                shared[candidate] = shared.get(candidate, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:MAX_CANDIDATES]
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            if not compatible(key, candidate):
+                continue
+            score = similarity(key, candidate)
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def lookup(self, name: str):
+        """Returns the canonical name of a vendor, or None if it matches no known vendor."""
+        key = normalize_vendor_name(name)
+        if not key:
+            return None
+        with self._lock:
+            canonical = self._aliases.get(key) or self._match(key)
+            return self._vendors[canonical] if canonical else None
+
+    def canonical(self, name: str) -> str:
+        """Returns the canonical name of a vendor, registering the name (and alias) if new."""
+        key = normalize_vendor_name(name)
+        if not key:
+            return str(name).strip()
+        with self._lock:
+            canonical = self._aliases.get(key)
+            if canonical is None:
+                canonical = self._match(key)
+                if canonical is None:
+                    self._add_vendor(key, str(name).strip())
+                    canonical = key
+                self._aliases[key] = canonical
+            return self._vendors[canonical]
+
+    def canonicalize(self, names) -> dict:
+        """Returns raw name -> canonical name for the distinct names given."""
+        return {name: self.canonical(name) for name in dict.fromkeys(names)}
+
+    def merge(self, name: str, into: str) -> str:
+        """Maps a spelling to a known vendor, overriding the learned alias; returns the canonical name."""
+        with self._lock:
+            canonical = self._aliases.get(normalize_vendor_name(into))
+            if canonical is None:
+                raise KeyError(f"Unknown vendor: {into!r}")
+            return self._assign(normalize_vendor_name(name), canonical, name)
+
+    def unmerge(self, name: str) -> str:
+        """Undoes a wrong merge: the spelling becomes a vendor of its own; returns its canonical name."""
+        key = normalize_vendor_name(name)
+        with self._lock:
+            return self._assign(key, key, name)
+
+    def _assign(self, key: str, canonical: str, name: str) -> str:
+        if not key:
+            raise ValueError(f"Invalid vendor name: {name!r}")
+        if canonical not in self._vendors:
+            self._add_vendor(canonical, str(name).strip())
+        self._aliases[key] = canonical
+        self._manual[key] = canonical
+        return self._vendors[canonical]
+
+    # -------------------------------------------------------------- persistence
+
+    def refresh(self, path: str = None):
+        """Merges vendors and aliases saved by other runs into this index."""
+        path = path or self.path
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with self._lock:
+            for key, name in data.get("vendors", {}).items():
+                if key not in self._vendors:
+                    self._add_vendor(key, name)
+            for alias, key in data.get("aliases", {}).items():
+                if key in self._vendors:
+                    self._aliases.setdefault(alias, key)
+            # Manual corrections win over the aliases learned by any process
+            for alias, key in data.get("manual", {}).items():
+                self._manual.setdefault(alias, key)
+            for alias, key in self._manual.items():
+                if key in self._vendors:
+                    self._aliases[alias] = key
+            self._mtime = os.path.getmtime(path)
+
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            # Keep what other processes saved since this index was loaded
+            if os.path.exists(path):
+                self.refresh(path)
+            data = {"vendors": self._vendors, "aliases": self._aliases, "manual": self._manual}
+            atomic_write(path, json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True))
+            self._mtime = os.path.getmtime(path)
+
+    def is_stale(self) -> bool:
+        return bool(self.path) and os.path.exists(self.path) and os.path.getmtime(self.path) != self._mtime
+
+
+def canonicalize_totals(totals: dict, index: VendorIndex = None) -> dict:
+    """
+    Merges vendor -> total entries whose names refer to the same known vendor. Read-only:
+    unknown names are kept as they are and never added to the alias table.
+    """
+    index = index if index is not None else get_vendor_index()
+    merged = {}
+    for vendor, total in totals.items():
+        name = index.lookup(vendor) or vendor
+        merged[name] = merged.get(name, 0) + total
+    return merged
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_vendor_index(path: str = VENDOR_ALIASES_PATH) -> VendorIndex:
+    """Returns the process-wide index of an alias table, picking up entries saved by other processes."""
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = _indexes[path] = VendorIndex(path)
+        elif index.is_stale():
+            index.refresh()
+        return index
@@ -0,0 +1,116 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+import traceback
+from pathlib import Path
+
+# Add project root to Python path
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+from dotenv import load_dotenv
+from src.utils.checkpoints import RunStopped
+from src.utils.job_queue import JobHeartbeat, JobQueue
+from src.utils.runs import resolve_input_file, save_run_input
+
+HEARTBEAT_SECONDS = 30
+POLL_SECONDS = 2
+
+
+def job_invoice_files(run_id: str, params: dict):
+    """
+    Copies the invoice files of a job from the inputs root into the run's inputs folder.
+
+    Returns None when the job names no files, so a requeued run resumes with the
+    invoices it was started with.
+    """
+    paths = params.get("invoice_files")
+    if paths is None:
+        return None
+    invoice_files = []
+    for path in paths:
+        source = resolve_input_file(path)
+        with open(source, "rb") as f:
+            invoice_files.append(save_run_input(run_id, os.path.basename(source), f.read()))
+    return invoice_files
+
+
+def work(worker_id: str, queue_path: str = None, once: bool = False):
+    """
+    Worker loop: claims queued jobs and runs the analysis for each of them.
+
+    Args:
+        worker_id (str): Name of this worker, stored with the jobs it runs.
+        queue_path (str): Job queue database (default queue when omitted).
+        once (bool): Stop when the queue is empty instead of polling.
+    """
+    load_dotenv()
+    # Imported here so the API process does not load CrewAI
+    from src.app import run_analysis
+    from src.utils.report_bundle import schedule_bundle
+
+    queue = JobQueue(queue_path) if queue_path else JobQueue()
+    print(f"👷 Worker {worker_id} started")
+    while True:
+        queue.requeue_stale(timeout=HEARTBEAT_SECONDS * 10)
+        job = queue.claim(worker_id)
+        if job is None:
+            if once:
+                return
+            time.sleep(POLL_SECONDS)
+            continue
+
+        run_id = job["run_id"]
+        print(f"▶️ {worker_id} running {run_id}")
+        # A job requeued after missed heartbeats may be running on another worker: this
+        # one then stops before its next write to the run folder
+        with JobHeartbeat(queue, run_id, worker_id, HEARTBEAT_SECONDS) as heartbeat:
+            try:
+                invoice_files = job_invoice_files(run_id, job["params"])
+                run_analysis(run_id, priority=job["priority"], invoice_files=invoice_files, stop=heartbeat.lost)
+                # Wait for the report bundle so downloads are ready once the job is done
+                if not heartbeat.lost.is_set() and schedule_bundle(run_id).exception() is not None:
+                    print(f"⚠️ {worker_id} could not build the report bundle of {run_id}")
+            except RunStopped:
+                print(f"⚠️ {worker_id} lost {run_id} to another worker and stopped it")
+                continue
+            except Exception as e:
+                traceback.print_exc()
+                if queue.fail(run_id, worker_id, str(e)):
+                    print(f"❌ {worker_id} failed {run_id}: {e}")
+                else:
+                    print(f"⚠️ {worker_id} lost {run_id} to another worker; its failure is not recorded")
+                continue
+        if queue.complete(run_id, worker_id):
+            print(f"✅ {worker_id} finished {run_id}")
+        else:
+            print(f"⚠️ {worker_id} lost {run_id} to another worker; its result is not recorded")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run expense analysis workers for the job queue.")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--queue", default=None, help="Path of the job queue database")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    args = parser.parse_args()
+
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    if args.processes == 1:
+        work(f"{prefix}-0", args.queue, args.once)
+        return
+
+    processes = [
+        multiprocessing.Process(target=work, args=(f"{prefix}-{i}", args.queue, args.once))
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
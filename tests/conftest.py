@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def runs_dir(tmp_path, monkeypatch):
+    """Points the run directories at a temporary folder."""
+    from src.utils import runs
+
+    path = tmp_path / "runs"
+    monkeypatch.setattr(runs, "RUNS_DIR", str(path))
+    return path
@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from src.api import ApiHandler
+from src.utils import runs
+from src.utils.job_queue import JobQueue
+from src.utils.llm_scheduler import INTERACTIVE
+
+
+@pytest.fixture
+def api(tmp_path, runs_dir, monkeypatch):
+    inputs = tmp_path / "invoices"
+    (inputs / "2024").mkdir(parents=True)
+    (inputs / "2024" / "january.csv").write_text("vendor,amount\nAcme,10\n", encoding="utf-8")
+    (tmp_path / "secret.csv").write_text("x", encoding="utf-8")
+    os.symlink(tmp_path / "secret.csv", inputs / "link.csv")
+    monkeypatch.setattr(runs, "INPUTS_ROOT", str(inputs))
+
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    handler = type("Handler", (ApiHandler,), {"queue": queue, "log_message": lambda *args: None})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+
+    def request(method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}{path}", data=data, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=5) as response:
+                return response.status, json.load(response)
+        except urllib.error.HTTPError as error:
+            return error.code, json.load(error)
+
+    yield request, queue
+    server.shutdown()
+    server.server_close()
+
+
+def test_submit_and_get_run(api):
+    request, queue = api
+    status, body = request("POST", "/runs", {"priority": "interactive", "params": {"invoice_files": ["2024/january.csv"]}})
+    assert status == 202
+    job = queue.get(body["run_id"])
+    assert job["priority"] == INTERACTIVE and job["params"] == {"invoice_files": ["2024/january.csv"]}
+
+    status, body = request("GET", f"/runs/{body['run_id']}")
+    assert status == 200 and body["status"] == "queued"
+    assert request("GET", "/health")[1]["jobs"]["queued"] == 1
+
+
+@pytest.mark.parametrize("params", [
+    {"invoice_files": ["/etc/passwd"]},
+    {"invoice_files": ["../secret.csv"]},
+    {"invoice_files": ["link.csv"]},
+    {"invoice_files": ["missing.csv"]},
+    {"invoice_files": "2024/january.csv"},
+    {"invoice_files": ["2024/january.csv", "2024/../2024/january.csv"]},
+    {"command": "rm -rf /"},
+])
+def test_rejects_files_outside_the_inputs_root(api, params):
+    request, queue = api
+    status, body = request("POST", "/runs", {"params": params})
+    assert status == 400 and "error" in body
+    assert queue.counts()["queued"] == 0
+
+
+def test_unknown_routes_and_runs(api):
+    request, _ = api
+    assert request("GET", "/runs/unknown")[0] == 404
+    assert request("POST", "/jobs", {})[0] == 404
+    assert request("POST", "/runs", {"priority": "urgent"})[0] == 400
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.checkpoints import RunCheckpoints, files_fingerprint
+from src.utils.run_memory import get_run_memory, release_run_memory, start_run_memory
+from src.utils.runs import run_file
+
+
+def _tasks():
+    tasks = []
+    for name, upstream in [("analysis", []), ("write_report", ["analysis"]), ("audit", ["analysis", "write_report"])]:
+        task = SimpleNamespace(description=f"Do the {name} step", expected_output="Markdown",
+                               agent=SimpleNamespace(role=f"{name} agent"))
+        tasks.append((name, task, upstream))
+    return tasks
+
+
+@pytest.fixture
+def checkpoints(runs_dir):
+    start_run_memory("run-1", str(runs_dir / "run-1" / "memory.json"))
+    yield RunCheckpoints("run-1")
+    release_run_memory("run-1")
+
+
+def test_resume_after_partial_run(checkpoints):
+    tasks = _tasks()
+    assert len(checkpoints.plan(tasks, "inputs")) == 3
+    checkpoints.save("analysis", "analysis output", run_file("run-1", "analysis.md"))
+    checkpoints.save("write_report", "report output")
+    # The audit step failed: a resumed run only runs it, with the completed results as context
+    resumed = RunCheckpoints("run-1")
+    tasks = _tasks()
+    pending = resumed.plan(tasks, "inputs")
+    assert pending == [tasks[2][1]]
+    assert "analysis output" in pending[0].description and "report output" in pending[0].description
+    with open(run_file("run-1", "analysis.md"), encoding="utf-8") as f:
+        assert f.read() == "analysis output"
+    assert resumed.completed() == ["analysis", "write_report"]
+    assert resumed.last_output(["audit", "write_report", "analysis"]) == "report output"
+
+    resumed.save("audit", "audit output")
+    assert resumed.plan(_tasks(), "inputs") == []
+    assert resumed.last_output(["audit", "write_report", "analysis"]) == "audit output"
+
+
+def test_changed_inputs_or_task_run_again(checkpoints):
+    checkpoints.plan(_tasks(), "inputs")
+    for name in ["analysis", "write_report", "audit"]:
+        checkpoints.save(name, f"{name} output")
+    assert len(RunCheckpoints("run-1").plan(_tasks(), "other inputs")) == 3
+
+    tasks = _tasks()
+    tasks[1][1].description = "Write a shorter report"
+    assert [name for name, task, _ in tasks if task in RunCheckpoints("run-1").plan(tasks, "inputs")] == [
+        "write_report", "audit",
+    ]
+
+
+def test_files_fingerprint(tmp_path):
+    path = tmp_path / "invoices.csv"
+    path.write_text("vendor,amount\nAcme,10\n", encoding="utf-8")
+    before = files_fingerprint([str(path)])
+    assert files_fingerprint([str(path)]) == before
+    path.write_text("vendor,amount\nAcme,12\n", encoding="utf-8")
+    assert files_fingerprint([str(path)]) != before
+
+
+def test_inputs_roundtrip(checkpoints):
+    assert checkpoints.load_inputs() == {}
+    checkpoints.save_inputs({"invoice_files": ["a.csv"]})
+    assert checkpoints.load_inputs() == {"invoice_files": ["a.csv"]}
+
+
+def test_task_callback_stores_conclusion(checkpoints):
+    checkpoints.plan(_tasks(), "inputs")
+    callback = checkpoints.task_callback("analysis", run_file("run-1", "expense_report.md"))
+    callback(SimpleNamespace(raw="Acme is the largest vendor", agent="Analyst"))
+    entry = get_run_memory("run-1").get("conclusion:analysis")
+    assert (entry["kind"], entry["content"], entry["agent"]) == ("conclusion", "Acme is the largest vendor", "Analyst")
+    with open(run_file("run-1", "expense_report.md"), encoding="utf-8") as f:
+        assert f.read() == "Acme is the largest vendor"
+    assert checkpoints.load("analysis")["output"] == "Acme is the largest vendor"
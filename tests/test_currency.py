@@ -0,0 +1,97 @@
+import os
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.utils import currency
+from src.utils.currency import (
+    RateTable, currency_note, format_amount, get_rate_table, normalize_cents, vendor_totals_in,
+)
+from src.utils.invoice_store import InvoiceStore, NO_DATE
+
+
+@pytest.fixture
+def table():
+    ordinals = [date(2024, 1, 1).toordinal(), date(2024, 2, 1).toordinal()]
+    return RateTable({"EUR": (ordinals, [0.9, 0.8]), "GBP": (ordinals[:1], [0.5])})
+
+
+def test_format_amount():
+    assert format_amount(1234.5, "EUR") == "€1,234.50"
+    assert format_amount(10, "CHF") == "10.00 CHF"
+
+
+def test_as_of_factors(table):
+    days = [date(2024, 1, 15).toordinal(), date(2024, 3, 1).toordinal(), date(2023, 6, 1).toordinal(), NO_DATE]
+    # EUR -> USD: the latest rate on or before each date, the first rate before the table
+    assert table.factors("EUR", days, "USD") == pytest.approx([1 / 0.9, 1 / 0.8, 1 / 0.9, 1 / 0.8])
+    # Cross rate through the base currency, memoized
+    assert table.factors("GBP", days[:1], "EUR") == pytest.approx([0.9 / 0.5])
+    assert table.factors("GBP", days[:1], "EUR") == pytest.approx([0.9 / 0.5])
+    assert table.factors("USD", days, "USD").tolist() == [1.0] * 4
+
+
+def test_normalize_cents(table):
+    names = ["USD", "EUR"]
+    day = date(2024, 1, 2).toordinal()
+    cents = normalize_cents(np.array([0, 1, 1]), np.array([day] * 3), np.array([100, 900, 90]), names, "USD", table)
+    assert cents.tolist() == [100, 1000, 100]
+
+
+def test_missing_rates_keep_native_amounts(table, capsys):
+    unconverted = set()
+    cents = normalize_cents(np.array([0, 1]), np.array([NO_DATE, NO_DATE]), np.array([100, 500]), ["EUR", "SEK"],
+                            "USD", table, unconverted)
+    assert cents.tolist() == [125, 500]
+    assert unconverted == {"SEK"}
+    assert "SEK" in capsys.readouterr().out
+
+
+def test_dates_outside_the_table_are_flagged_stale(table, capsys):
+    days = np.array([date(2024, 2, 20).toordinal(), date(2024, 6, 1).toordinal(), date(2023, 6, 1).toordinal(), NO_DATE])
+    assert table.out_of_range("EUR", days, "USD").tolist() == [False, True, True, False]
+    assert table.out_of_range("EUR", days, "USD", max_age_days=200).tolist() == [False, False, True, False]
+    # A cross rate is stale when either currency's rates are
+    assert table.out_of_range("EUR", days[:1], "GBP").tolist() == [True]
+
+    stale, unconverted = set(), set()
+    cents = normalize_cents(np.array([0, 0]), days[:2], np.array([800, 800]), ["EUR"], "USD", table, unconverted, stale)
+    assert cents.tolist() == [1000, 1000]
+    assert stale == {"EUR"} and unconverted == set()
+    assert "outside the exchange rate table" in capsys.readouterr().out
+
+    stale = set()
+    normalize_cents(np.array([0]), days[:1], np.array([800]), ["EUR"], "USD", table, stale=stale)
+    assert stale == set()
+
+
+def test_currency_note():
+    assert currency_note("USD") == ""
+    note = currency_note("USD", {"SEK"}, ["EUR"])
+    assert "SEK have no exchange rates and are not converted to USD" in note
+    assert "EUR are dated outside the exchange rate table" in note
+
+
+def test_no_local_rate_table_keeps_native_amounts(tmp_path, monkeypatch):
+    monkeypatch.setattr(currency, "RATES_PATH", str(tmp_path / "missing.csv"))
+    assert get_rate_table() is None
+
+    store = InvoiceStore()
+    store.append("Acme", "100", "EUR")
+    store.append("Globex", "50", "USD")
+    unconverted = set()
+    assert vendor_totals_in(store, "USD", unconverted=unconverted) == {"Acme": 100.0, "Globex": 50.0}
+    assert unconverted == {"EUR"}
+
+
+def test_rate_table_from_csv_is_reloaded_on_change(tmp_path):
+    path = tmp_path / "rates.csv"
+    path.write_text("date,currency,rate\n2024-01-01,eur,0.5\n", encoding="utf-8")
+    first = get_rate_table(str(path))
+    assert first.factors("EUR", [NO_DATE], "USD").tolist() == [2.0]
+    assert get_rate_table(str(path)) is first
+
+    path.write_text("date,currency,rate\n2024-01-01,EUR,0.25\n", encoding="utf-8")
+    os.utime(path, (1, 1))
+    assert get_rate_table(str(path)).factors("EUR", [NO_DATE], "USD").tolist() == [4.0]
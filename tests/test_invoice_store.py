@@ -0,0 +1,87 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.utils.invoice_loader import load_invoice_files
+from src.utils.invoice_store import InvoiceStore, to_cents
+from src.utils.vendor_index import VendorIndex
+
+
+@pytest.mark.parametrize("text, cents", [
+    ("$1,234.56", 123456),
+    ("€300", 30000),
+    ("1.234,56", 123456),
+    ("€1 234,56", 123456),
+    ("1 234,5 EUR", 123450),
+    ("CHF 1'234.50", 123450),
+    ("1,5", 150),
+    ("1,234", 123400),
+    ("(12.00)", -1200),
+    ("-5", -500),
+])
+def test_to_cents_parses_symbols_codes_and_separators(text, cents):
+    assert to_cents(text) == cents
+
+
+def test_to_cents_numbers():
+    assert to_cents(12.34) == 1234
+    assert to_cents(Decimal("0.005")) == 1
+    assert to_cents(7) == 700
+
+
+@pytest.mark.parametrize("text", ["", "n/a", "12,34.5", "1.234.5", "--"])
+def test_to_cents_rejects_malformed(text):
+    with pytest.raises(ValueError):
+        to_cents(text)
+
+
+def test_append_rejects_malformed_amount_without_partial_row():
+    store = InvoiceStore()
+    store.append("Acme", "10")
+    with pytest.raises(ValueError):
+        store.append("Globex", "abc")
+    assert len(store) == 1
+    assert store.vendor_totals() == {"Acme": 10.0}
+
+
+def test_chunks_spill_and_totals():
+    with InvoiceStore(memory_budget=0, chunk_rows=4) as store:
+        store.extend(("Acme" if i % 2 else "Globex", "1.25", "USD", date(2024, 1, 1 + i), None) for i in range(10))
+        assert len(store) == 10
+        assert store.spilled_bytes > 0
+        assert store.vendor_totals() == {"Globex": 6.25, "Acme": 6.25}
+        assert store[9].vendor == "Acme"
+        assert store[3].date == date(2024, 1, 4)
+        assert store[-1].category == "Uncategorized"
+        assert sum(len(chunk["amount"]) for chunk in store.iter_chunks()) == 10
+        assert int(np.sum(store.vendor_totals_cents())) == 1250
+
+
+def test_loader_skips_and_counts_malformed_rows(tmp_path):
+    path = tmp_path / "invoices.csv"
+    path.write_text("supplier,montant,devise\nAcme,€300,eur\nGlobex,oops,USD\nInitech,\"1.234,56\",EUR\nHooli,,USD\n",
+                    encoding="utf-8")
+    store = load_invoice_files([str(path)], vendor_index=VendorIndex(path=None))
+    assert len(store) == 2
+    assert store.skipped_rows == 1
+    assert store.vendor_totals() == {"Acme": 300.0, "Initech": 1234.56}
+    assert store.currencies.values == ["EUR"]
+
+
+def test_extend_columns_seals_chunks_for_subscribers():
+    store = InvoiceStore(chunk_rows=4)
+    sealed = []
+    store.subscribe(lambda chunk: sealed.append(len(chunk["amount"])))
+    store.extend_columns(
+        ["Acme", "Globex"] * 5, np.arange(10) * 100, ["USD"] * 10,
+        [date(2024, 1, 1).toordinal()] * 9 + [0], ["Office", None] * 5,
+    )
+    assert sealed == [4, 4]
+    store.flush()
+    assert sealed == [4, 4, 2]
+    assert len(store) == 10
+    assert store.vendors.values == ["Acme", "Globex"]
+    assert store.vendor_totals() == {"Acme": 20.0, "Globex": 25.0}
+    assert store[1].category == "Uncategorized" and store[9].date is None
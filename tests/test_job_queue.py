@@ -0,0 +1,110 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from src.utils.checkpoints import RunCheckpoints, RunStopped
+from src.utils.job_queue import DONE, FAILED, QUEUED, RUNNING, JobHeartbeat, JobQueue
+from src.utils.llm_scheduler import BATCH, INTERACTIVE
+from src.utils.runs import run_file
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.db"))
+
+
+def test_jobs_are_claimed_by_priority_then_age(queue):
+    first_batch = queue.submit({"invoice_files": ["a.csv"]}, priority=BATCH)
+    second_batch = queue.submit(priority=BATCH)
+    interactive = queue.submit(priority=INTERACTIVE)
+
+    claimed = [queue.claim("w1")["run_id"] for _ in range(3)]
+    assert claimed == [interactive, first_batch, second_batch]
+    assert queue.claim("w1") is None
+    job = queue.get(first_batch)
+    assert job["status"] == RUNNING and job["worker"] == "w1" and job["attempts"] == 1
+    assert job["params"] == {"invoice_files": ["a.csv"]}
+
+
+def test_each_job_is_claimed_once(queue):
+    run_ids = {queue.submit() for _ in range(20)}
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        while True:
+            job = queue.claim(name)
+            if job is None:
+                return
+            with lock:
+                claimed.append(job["run_id"])
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claimed) == sorted(run_ids)
+
+
+def test_complete_and_fail(queue):
+    done, failed = queue.submit(), queue.submit()
+    queue.claim("w1"), queue.claim("w1")
+    assert queue.complete(done, "w1")
+    assert queue.fail(failed, "w1", "boom")
+    assert queue.get(done)["status"] == DONE
+    assert queue.get(failed)["status"] == FAILED and queue.get(failed)["error"] == "boom"
+    assert queue.counts() == {QUEUED: 0, RUNNING: 0, DONE: 1, FAILED: 1}
+    assert [job["run_id"] for job in queue.list(status=DONE)] == [done]
+
+
+def test_requeued_job_cannot_be_finished_by_its_old_worker(queue):
+    run_id = queue.submit()
+    queue.claim("w1")
+    assert queue.requeue_stale(timeout=-1) == 1
+    assert queue.get(run_id)["status"] == QUEUED
+
+    # The lost worker comes back: none of its updates apply
+    assert not queue.heartbeat(run_id, "w1")
+    assert not queue.complete(run_id, "w1")
+    assert not queue.fail(run_id, "w1", "late failure")
+    assert queue.get(run_id)["status"] == QUEUED
+
+    assert queue.claim("w2")["attempts"] == 2
+    assert not queue.complete(run_id, "w1")
+    assert queue.heartbeat(run_id, "w2")
+    assert queue.complete(run_id, "w2")
+    assert queue.get(run_id)["worker"] == "w2"
+
+
+def test_worker_that_lost_its_job_stops_writing(queue, runs_dir):
+    run_id = queue.submit()
+    queue.claim("w1")
+    with JobHeartbeat(queue, run_id, "w1", interval=0.01) as heartbeat:
+        checkpoints = RunCheckpoints(run_id, stop=heartbeat.lost)
+        callback = checkpoints.task_callback("analysis", run_file(run_id, "expense_report.md"))
+        assert not heartbeat.lost.wait(0.05)
+
+        # The job is requeued after missed heartbeats and claimed by another worker
+        queue.requeue_stale(timeout=-1)
+        queue.claim("w2")
+        assert heartbeat.lost.wait(1)
+        with pytest.raises(RunStopped):
+            callback(SimpleNamespace(raw="late analysis"))
+        with pytest.raises(RunStopped):
+            checkpoints.save_inputs({"invoice_files": []})
+
+    assert not os.path.exists(run_file(run_id, "expense_report.md"))
+    assert checkpoints.completed() == []
+    assert queue.get(run_id)["worker"] == "w2" and queue.heartbeat(run_id, "w2")
+
+
+def test_stale_jobs_fail_after_max_attempts(queue):
+    run_id = queue.submit()
+    for attempt in range(3):
+        queue.claim(f"w{attempt}")
+        queue.requeue_stale(timeout=-1, max_attempts=3)
+    job = queue.get(run_id)
+    assert job["status"] == FAILED and job["error"] == "worker lost"
@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+from src.utils.knowledge_search import batch_search
+from src.utils.run_memory import RunMemory
+
+
+class FakeNeedleClient:
+    """Answers searches from a fixed query -> chunks table and counts the calls."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+        self.collections = SimpleNamespace(search=self.search)
+
+    def search(self, collection_id, text, top_k):
+        self.calls.append(text)
+        result = self.results[text]
+        if isinstance(result, Exception):
+            raise result
+        return [SimpleNamespace(id=chunk_id, content=content) for chunk_id, content in result]
+
+
+def test_batch_search_merges_dedupes_and_reports_failures():
+    ndl = FakeNeedleClient({
+        "acme invoices": [("c1", "Acme invoice 12"), ("c2", "Acme invoice 13")],
+        "acme contract": [("c2", "Acme invoice 13"), ("c3", "Acme contract")],
+        "globex": ConnectionError("Needle is down"),
+    })
+    memory = RunMemory("run-1")
+    output = batch_search(ndl, memory, ["acme invoices", "acme contract", " acme invoices ", "globex", ""])
+
+    assert sorted(ndl.calls) == ["acme contract", "acme invoices", "globex"]
+    assert output.startswith("3 unique chunks for 2 queries.")
+    assert "- globex: Needle is down" in output
+    assert "[c2] (queries: acme invoices; acme contract)\nAcme invoice 13" in output
+    assert output.count("Acme invoice 13") == 1
+
+    # Successful queries are cached in the run memory; only the failed one is retried
+    ndl.results["globex"] = [("c4", "Globex invoice")]
+    output = batch_search(ndl, memory, ["acme invoices", "globex"])
+    assert ndl.calls[3:] == ["globex"]
+    assert output.startswith("3 unique chunks for 2 queries.")
+
+
+def test_batch_search_without_queries():
+    assert batch_search(FakeNeedleClient({}), RunMemory("run-1"), ["", "  "]) == "No queries provided."
@@ -0,0 +1,186 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.utils.llm_scheduler import BATCH, INTERACTIVE, WINDOW_SECONDS, LLMScheduler, estimate_tokens, is_retryable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ApiStatusError(Exception):
+    """Mimics the OpenAI client errors: a status code and the HTTP response."""
+
+    def __init__(self, error: urllib.error.HTTPError):
+        super().__init__(f"HTTP {error.code}")
+        self.status_code = error.code
+        self.response = error
+
+
+@pytest.fixture
+def fake_endpoint():
+    """Local chat completion endpoint answering with the queued (status, headers) responses."""
+    responses = []
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            requests.append(body)
+            status, headers = responses.pop(0) if responses else (200, {})
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"choices": [{"message": {"content": f"ok {body['prompt']}"}}]}).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True)
+    thread.start()
+
+    def call(prompt):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions",
+            data=json.dumps({"prompt": prompt}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=5) as response:
+                return json.load(response)["choices"][0]["message"]["content"]
+        except urllib.error.HTTPError as error:
+            raise ApiStatusError(error) from None
+
+    yield call, responses, requests
+    server.shutdown()
+    server.server_close()
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_interactive_requests_are_served_before_batch(fake_endpoint):
+    call, _, requests = fake_endpoint
+    scheduler = LLMScheduler(max_concurrency=1)
+    scheduler.acquire(INTERACTIVE)  # holds the only slot while the queue fills
+
+    def submit(name, priority):
+        scheduler.run(lambda: call(name), priority=priority)
+
+    threads = []
+    for name, priority in [("batch-1", BATCH), ("batch-2", BATCH), ("interactive", INTERACTIVE)]:
+        thread = threading.Thread(target=submit, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        _wait_for(lambda: scheduler.metrics()["queue_depth"] == len(threads))
+    assert scheduler.metrics()["queue_depth_by_priority"] == {BATCH: 2, INTERACTIVE: 1}
+
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert [r["prompt"] for r in requests] == ["interactive", "batch-1", "batch-2"]
+    assert scheduler.metrics()["completed"] == 3
+
+
+def test_requests_per_minute_window():
+    clock = FakeClock()
+    scheduler = LLMScheduler(requests_per_minute=2, clock=clock, sleep=clock.sleep)
+    for _ in range(2):
+        scheduler.run(lambda: "ok")
+        clock.now += 10
+    # The third request has to wait until the first one leaves the sliding minute
+    assert scheduler._budget_delay(0, clock.now) == pytest.approx(WINDOW_SECONDS - 20)
+
+    blocked = threading.Thread(target=scheduler.acquire)
+    blocked.start()
+    time.sleep(0.05)
+    assert blocked.is_alive() and scheduler.metrics()["queue_depth"] == 1
+
+    clock.now += WINDOW_SECONDS - 20
+    with scheduler._cond:
+        scheduler._cond.notify_all()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    assert scheduler.metrics()["requests_last_minute"] == 2
+
+
+def test_tokens_per_minute_window():
+    clock = FakeClock()
+    scheduler = LLMScheduler(tokens_per_minute=1000, clock=clock, sleep=clock.sleep)
+    scheduler.run(lambda: "ok", tokens=600)
+    clock.now += 15
+    assert scheduler._budget_delay(400, clock.now) == 0
+    assert scheduler._budget_delay(401, clock.now) == pytest.approx(WINDOW_SECONDS - 15)
+    clock.now += WINDOW_SECONDS
+    assert scheduler._budget_delay(1000, clock.now) == 0
+    assert scheduler.metrics()["tokens_last_minute"] == 0
+
+
+def test_retries_429_with_jittered_backoff(fake_endpoint):
+    call, responses, requests = fake_endpoint
+    responses += [(429, {}), (429, {"Retry-After": "7"}), (200, {})]
+    clock = FakeClock()
+    random.seed(3)
+    scheduler = LLMScheduler(backoff_base=2.0, backoff_cap=30.0, clock=clock, sleep=clock.sleep)
+
+    assert scheduler.run(lambda: call("report")) == "ok report"
+    assert len(requests) == 3
+    first, second = clock.sleeps
+    assert 0 <= first <= 2.0
+    assert second >= 7.0  # never shorter than the server's Retry-After
+    metrics = scheduler.metrics()
+    assert metrics["retries"] == 2 and metrics["completed"] == 1 and metrics["in_flight"] == 0
+
+
+def test_backoff_is_jittered_and_capped():
+    scheduler = LLMScheduler(backoff_base=1.0, backoff_cap=8.0)
+    random.seed(0)
+    delays = [scheduler.backoff(attempt) for attempt in range(10) for _ in range(20)]
+    assert max(delays) <= 8.0
+    assert len(set(round(d, 6) for d in delays)) > 100
+
+
+def test_gives_up_after_max_retries_and_on_client_errors(fake_endpoint):
+    call, responses, requests = fake_endpoint
+    clock = FakeClock()
+    scheduler = LLMScheduler(max_retries=2, clock=clock, sleep=clock.sleep)
+
+    responses += [(429, {})] * 3
+    with pytest.raises(ApiStatusError):
+        scheduler.run(lambda: call("limited"))
+    assert len(requests) == 3
+
+    responses.append((400, {}))
+    with pytest.raises(ApiStatusError):
+        scheduler.run(lambda: call("invalid"))
+    assert len(requests) == 4
+    assert scheduler.metrics()["failed"] == 2 and scheduler.metrics()["in_flight"] == 0
+
+
+def test_helpers():
+    assert estimate_tokens("x" * 400, 100) == 200
+    assert estimate_tokens([{"role": "user", "content": "x" * 40}], 0) == 10
+    assert not is_retryable(ValueError("bad"))
@@ -0,0 +1,61 @@
+import os
+import zipfile
+from datetime import date
+
+import pytest
+
+from src.utils.currency import RateTable
+from src.utils.invoice_store import InvoiceStore
+from src.utils.report_bundle import build_bundle, bundle_status, get_bundle, schedule_bundle
+from src.utils.run_profile import RunProfile
+from src.utils.runs import atomic_write, run_file
+from src.utils.spend_cube import SPEND_CUBE_FILE, SpendCube
+
+
+def _touch_later(path, content):
+    # Make sure the rewrite gets a new mtime, even on coarse file system clocks
+    mtime = os.path.getmtime(path) if os.path.exists(path) else 0
+    atomic_write(path, content)
+    os.utime(path, (mtime + 10, mtime + 10))
+
+
+@pytest.fixture
+def run(runs_dir):
+    run_id = "run-1"
+    atomic_write(run_file(run_id, "expense_report.md"), "# Expenses\n\n- Total: $300\n- Acme: $100\n- Globex: $200\n")
+    atomic_write(run_file(run_id, "compliance_audit.md"), "# Audit\n\nNo issue found.\n")
+    store = InvoiceStore()
+    cube = SpendCube(store, reporting="USD", table=RateTable({}))
+    store.extend([("Acme", "100", "USD", date(2024, 1, 5), "Office"), ("Globex", "200", "USD", date(2024, 2, 3), "Travel")])
+    cube.save(run_file(run_id, SPEND_CUBE_FILE))
+    RunProfile(run_id).save(run_file(run_id, "profile.json"))
+    return run_id
+
+
+def test_build_bundle(run):
+    manifest = build_bundle(run)
+    with open(manifest["pdf"], "rb") as f:
+        assert f.read(5) == b"%PDF-"
+    with zipfile.ZipFile(manifest["zip"]) as archive:
+        names = set(archive.namelist())
+    assert {"expense_reports.pdf", "expense_report.md", "compliance_audit.md", "profile.json"} <= names
+    assert SPEND_CUBE_FILE not in names
+    assert any(name.startswith("charts/") for name in names)
+    assert get_bundle(run) == manifest
+    assert build_bundle(run) == manifest
+
+
+def test_profile_rewrite_keeps_bundle_fresh(run):
+    manifest = build_bundle(run)
+    _touch_later(run_file(run, "profile.json"), "{}")
+    assert get_bundle(run) == manifest
+
+
+def test_report_change_rebuilds_bundle(run):
+    manifest = build_bundle(run)
+    _touch_later(run_file(run, "expense_report.md"), "# Expenses\n\n- Total: $310\n")
+    assert get_bundle(run) is None
+    assert bundle_status(run) == "missing"
+    rebuilt = schedule_bundle(run).result(timeout=60)
+    assert rebuilt["fingerprint"] != manifest["fingerprint"]
+    assert bundle_status(run) == "ready"
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from src.utils.report_verifier import extract_figures, format_verification, verify_reports, verify_run
+from src.utils.runs import run_file
+from src.utils.vendor_index import VendorIndex
+
+
+@pytest.mark.parametrize("line, value", [
+    ("- **ACME**: $500 10 invoices", 500.0),
+    ("- **ACME**: €1 234,5", 1234.5),
+    ("- **ACME**: 1.234,56 €", 1234.56),
+    ("- **ACME**: $1,234,567.89", 1234567.89),
+    ("- **ACME**: $1,234 over 3 invoices", 1234.0),
+    ("- **ACME**: $1,5", 1.5),
+    ("- **ACME**: 2 500,00 EUR", 2500.0),
+    ("- **ACME**: $12.5k", 12500.0),
+    ("| ACME | 12 | $3,000 |", 3000.0),
+])
+def test_extract_vendor_amounts(line, value):
+    assert extract_figures(line)["vendors"] == {"acme": value}
+
+
+def test_extract_totals_and_skipped_labels():
+    figures = extract_figures(
+        "# Report\n"
+        "- **Gross Total**: $1,500.00\n"
+        "- Potential savings: $200\n"
+        "- Acme: $1,000 (average $250 per invoice)\n"
+        "| Vendor | Amount |\n|---|---|\n| Globex | $500 |\n"
+        "Some text without figures.\n"
+    )
+    assert figures == {"totals": [1500.0], "vendors": {"acme": 1000.0, "globex": 500.0}}
+
+
+def test_verify_reports_against_aggregates_and_other_reports():
+    reports = {
+        "expense_report.md": "- Total: $1,500\n- Acme: $1,000\n- Globex: $500\n",
+        "final_expense_report.md": "- Total: $1,500\n- Acme: $1,200\n",
+    }
+    result = verify_reports(reports, {"Acme": 1000.0, "Globex": 500.0}, vendor_index=VendorIndex(path=None))
+    assert [(m["report"], m["figure"], m["source"]) for m in result["mismatches"]] == [
+        ("final_expense_report.md", "vendor acme", "invoice aggregates"),
+        ("final_expense_report.md", "vendor acme", "expense_report.md"),
+    ]
+    assert result["checked"] == 9
+
+
+def _index(*vendors):
+    index = VendorIndex(path=None)
+    index.canonicalize(vendors)
+    return index
+
+
+def test_vendor_sum_cannot_exceed_total():
+    result = verify_reports({"expense_report.md": "- Total: $100\n- Acme: $90\n- Globex: $90\n"},
+                            vendor_index=_index("Acme", "Globex"))
+    assert [m["figure"] for m in result["mismatches"]] == ["sum of vendor amounts"]
+
+
+def test_category_and_month_lines_are_not_vendors():
+    report = (
+        "# Expense Analysis\n"
+        "- **Gross Total**: $1,500\n"
+        "## By vendor\n- **Acme**: $1,000\n- **Globex**: $500\n"
+        "## By category\n- Software: $900\n- Hardware: $600\n"
+        "## Trends\n| Month | Spend |\n|---|---|\n| January | $700 |\n| February | $800 |\n"
+    )
+    final = report.replace("$900", "$950").replace("$600", "$550")
+    reports = {"expense_report.md": report, "final_expense_report.md": final}
+    result = verify_reports(reports, vendor_index=_index("Acme", "Globex"))
+    assert result["mismatches"] == []
+    assert result["figures"]["expense_report.md"]["vendors"] == {"acme": 1000.0, "globex": 500.0}
+
+    result = verify_reports(reports, {"Acme": 1000.0, "Globex": 500.0}, vendor_index=VendorIndex(path=None))
+    assert result["mismatches"] == []
+
+
+def test_repeated_vendor_keeps_first_figure_in_any_spelling():
+    index = VendorIndex(path=None)
+    index.canonical("ACME Inc.")
+    report = "- ACME Inc.: $1,000\n- Acme Incorporated: $400\n- ACME INC: $300\n"
+    result = verify_reports({"expense_report.md": report}, {"ACME Inc.": 1000.0}, vendor_index=index)
+    assert result["figures"]["expense_report.md"]["vendors"] == {"acme inc": 1000.0}
+    assert result["mismatches"] == []
+
+
+def test_rounding_is_tolerated():
+    result = verify_reports({"a.md": "- Total: $1,000.40\n", "b.md": "- Total: $1,000\n"},
+                            vendor_index=VendorIndex(path=None))
+    assert result["mismatches"] == []
+
+
+def test_format_verification():
+    report = format_verification({"checked": 2, "mismatches": [
+        {"report": "a.md", "figure": "gross total", "stated": 1200.0, "expected": 1000.0, "source": "b.md"},
+    ]})
+    assert "- Mismatches: 1" in report
+    assert "| a.md | gross total | $1,200.00 | $1,000.00 | b.md |" in report
+
+    report = format_verification({"checked": 1, "currency": "EUR", "unconverted": ["SEK"], "stale": ["GBP"], "mismatches": [
+        {"report": "a.md", "figure": "gross total", "stated": 1200.0, "expected": 1000.0, "source": "b.md"},
+    ]})
+    assert "| €1,200.00 | €1,000.00 |" in report
+    assert "Not converted to EUR (no exchange rates): SEK" in report
+    assert "Converted with rates from outside the rate table's dates: GBP" in report
+
+
+def test_verify_run_writes_results(runs_dir, monkeypatch):
+    monkeypatch.setattr("src.utils.report_verifier.get_vendor_index", lambda *args: VendorIndex(path=None))
+    with open(run_file("run-a", "expense_report.md"), "w", encoding="utf-8") as f:
+        f.write("- Total: $300\n- Acme: $300\n")
+    result = verify_run("run-a", {"Acme": 250.0})
+    assert len(result["mismatches"]) == 2
+    with open(run_file("run-a", "verification.json"), encoding="utf-8") as f:
+        assert json.load(f)["checked"] == result["checked"]
+    with open(run_file("run-a", "supervision_report.md"), encoding="utf-8") as f:
+        assert f.read().startswith("# Supervision Report")
@@ -0,0 +1,72 @@
+import contextvars
+import json
+import threading
+
+import pytest
+
+from src.utils.run_memory import (
+    RunMemory, active_run_id, get_run_memory, release_run_memory, start_run_memory,
+)
+
+
+def test_put_search_and_kind_filter():
+    memory = RunMemory("run-a")
+    memory.put("figure:total_spend", "Total spend is 1200 USD", kind="figure")
+    memory.put("note:acme", "Acme invoices are late", kind="note")
+    memory.put("note:acme", "Acme invoices are paid", kind="note")
+    assert [e["key"] for e in memory.search("acme paid")] == ["note:acme"]
+    assert memory.search("late") == []
+    assert [e["key"] for e in memory.entries(kind="figure")] == ["figure:total_spend"]
+    assert len(memory.entries()) == 2
+
+
+def test_cached_search_roundtrip(tmp_path):
+    path = tmp_path / "memory.json"
+    memory = RunMemory("run-a", str(path))
+    assert memory.cached_search("Acme  invoices") is None
+    memory.store_search("acme invoices", [("c1", "Acme invoice 12"), ("c2", "Acme invoice 13")])
+    memory.save()
+    assert json.loads(path.read_text(encoding="utf-8"))["run_id"] == "run-a"
+
+    restored = RunMemory("run-a", str(path))
+    assert [e["key"] for e in restored.cached_search("Acme invoices")] == ["chunk:c1", "chunk:c2"]
+
+
+def test_no_memory_without_active_run():
+    ctx = contextvars.Context()
+    with pytest.raises(RuntimeError):
+        ctx.run(get_run_memory)
+
+
+def test_release_resets_active_run(tmp_path):
+    def run():
+        memory = start_run_memory("run-a", str(tmp_path / "memory.json"))
+        assert active_run_id() == "run-a"
+        assert get_run_memory() is memory
+        memory.put("note:x", "kept")
+        release_run_memory("run-a")
+        assert active_run_id() is None
+        with pytest.raises(RuntimeError):
+            get_run_memory("run-a")
+
+    contextvars.Context().run(run)
+    assert (tmp_path / "memory.json").exists()
+
+
+def test_runs_are_isolated_between_threads():
+    seen = {}
+
+    def run(run_id):
+        start_run_memory(run_id)
+        try:
+            get_run_memory().put("note:owner", run_id)
+            seen[run_id] = get_run_memory().get("note:owner")["content"]
+        finally:
+            release_run_memory(run_id)
+
+    threads = [threading.Thread(target=run, args=(f"run-{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert seen == {f"run-{i}": f"run-{i}" for i in range(4)}
@@ -0,0 +1,107 @@
+import json
+import time
+
+import pytest
+
+from src.utils.llm_scheduler import LLMScheduler, ScheduledCallsMixin
+from src.utils.run_profile import RunProfile
+
+
+def test_summary_separates_provider_latency_and_queue_wait(tmp_path):
+    profile = RunProfile("run-a")
+    profile.record("gpt-4o-mini", "Financial Reporter", 2.0, 1000, 500, queue_seconds=5.0, attempts=2)
+    profile.record("gpt-4o-mini", "Supervisor", 1.0, 1000, 0, error=True, queue_seconds=1.0)
+    profile.record("unknown-model", "Expense Analyst", 3.0, 10, 10)
+
+    summary = profile.summary()
+    mini = summary["models"]["gpt-4o-mini"]
+    assert mini["calls"] == 2 and mini["attempts"] == 3 and mini["errors"] == 1
+    assert mini["avg_seconds"] == pytest.approx(1.0)
+    assert mini["avg_queue_seconds"] == pytest.approx(3.0)
+    assert mini["estimated_cost_usd"] == pytest.approx((2000 * 0.15 + 500 * 0.60) / 1_000_000)
+    assert mini["agents"] == {"Financial Reporter": 1, "Supervisor": 1}
+    assert summary["models"]["unknown-model"]["estimated_cost_usd"] == 0.0
+    assert summary["total_seconds"] == pytest.approx(6.0)
+    assert summary["total_queue_seconds"] == pytest.approx(6.0)
+
+    path = tmp_path / "profile.json"
+    profile.save(str(path))
+    assert json.loads(path.read_text(encoding="utf-8"))["run_id"] == "run-a"
+
+
+def test_load_adds_to_the_saved_profile(tmp_path):
+    path = str(tmp_path / "profile.json")
+    assert RunProfile.load("run-a", path).summary()["models"] == {}
+
+    first = RunProfile("run-a")
+    first.record("gpt-4o-mini", "Expense Analyst", 2.0, 1000, 500)
+    first.save(path)
+
+    resumed = RunProfile.load("run-a", path)
+    resumed.record("gpt-4o-mini", "Financial Reporter", 4.0, 1000, 0, queue_seconds=2.0)
+    resumed.save(path)
+
+    mini = RunProfile.load("run-a", path).summary()["models"]["gpt-4o-mini"]
+    assert mini["calls"] == 2 and mini["prompt_tokens"] == 2000
+    assert mini["avg_seconds"] == pytest.approx(3.0)
+    assert mini["avg_queue_seconds"] == pytest.approx(1.0)
+    assert mini["agents"] == {"Expense Analyst": 1, "Financial Reporter": 1}
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+
+class FakeLLM:
+    """Stands in for crewai.LLM: one provider request per call(messages, callbacks)."""
+
+    def __init__(self, model, max_tokens=None, replies=()):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.replies = list(replies)
+        self.calls = []
+
+    def call(self, messages, callbacks=[]):
+        self.calls.append((messages, callbacks))
+        time.sleep(0.02)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+class FakeScheduledLLM(ScheduledCallsMixin, FakeLLM):
+    pass
+
+
+def test_scheduled_llm_times_only_provider_calls():
+    profile = RunProfile("run-a")
+    scheduler = LLMScheduler(sleep=lambda seconds: time.sleep(0.2))
+    llm = FakeScheduledLLM(model="gpt-4o-mini", scheduler=scheduler, profile=profile, agent="Supervisor",
+                           replies=[RateLimited(), "answer"])
+
+    assert llm.call([{"role": "user", "content": "hello"}], callbacks=["cb"]) == "answer"
+    assert [callbacks for _, callbacks in llm.calls] == [["cb"], ["cb"]]
+    stats = profile.summary()["models"]["gpt-4o-mini"]
+    assert stats["calls"] == 1 and stats["attempts"] == 2
+    assert stats["agents"] == {"Supervisor": 1}
+    assert stats["seconds"] < 0.15
+    assert stats["queue_seconds"] >= 0.2
+
+
+def test_scheduled_llm_records_failed_calls():
+    profile = RunProfile("run-a")
+    llm = FakeScheduledLLM(model="gpt-4o", scheduler=LLMScheduler(), profile=profile, replies=[ValueError("bad request")])
+    with pytest.raises(ValueError):
+        llm.call([{"role": "user", "content": "hello"}])
+    stats = profile.summary()["models"]["gpt-4o"]
+    assert stats["calls"] == 1 and stats["errors"] == 1 and stats["attempts"] == 1
+
+
+def test_scheduled_llm_is_a_crewai_llm():
+    crewai = pytest.importorskip("crewai")
+    from src.utils.llm import create_llm
+
+    llm = create_llm(agent="Expense Analyst", scheduler=LLMScheduler())
+    assert isinstance(llm, crewai.LLM) and isinstance(llm, ScheduledCallsMixin)
+    assert llm.model == "gpt-4o" and llm.agent == "Expense Analyst"
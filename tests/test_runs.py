@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from src.utils.runs import atomic_write, get_run_dir, list_runs, new_run_id, save_run_input
+
+
+def test_run_ids_are_unique_and_valid(runs_dir):
+    run_ids = {new_run_id() for _ in range(20)}
+    assert len(run_ids) == 20
+    for run_id in run_ids:
+        assert os.path.isdir(get_run_dir(run_id))
+    assert list_runs() == sorted(run_ids, reverse=True)
+
+
+def test_invalid_run_id(runs_dir):
+    with pytest.raises(ValueError):
+        get_run_dir("../etc")
+
+
+def test_inputs_are_saved_per_run(runs_dir):
+    first = save_run_input("run-a", "invoices.csv", b"vendor,amount\nAcme,1\n")
+    second = save_run_input("run-b", "invoices.csv", b"vendor,amount\nGlobex,2\n")
+    assert first != second
+    assert open(first, "rb").read() == b"vendor,amount\nAcme,1\n"
+    assert os.path.dirname(first) == os.path.join(get_run_dir("run-a"), "inputs")
+
+
+def test_input_names_cannot_leave_the_run(runs_dir):
+    path = save_run_input("run-a", "../../etc/passwd", b"x")
+    assert path == os.path.join(get_run_dir("run-a"), "inputs", "passwd")
+    with pytest.raises(ValueError):
+        save_run_input("run-a", "..", b"x")
+
+
+def test_atomic_write_replaces_content(tmp_path):
+    path = tmp_path / "report.md"
+    atomic_write(str(path), "first")
+    atomic_write(str(path), "second")
+    assert path.read_text(encoding="utf-8") == "second"
+    assert os.listdir(tmp_path) == ["report.md"]
@@ -0,0 +1,133 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from src.utils.currency import RateTable
+from src.utils.invoice_loader import load_invoice_files
+from src.utils.invoice_store import InvoiceStore
+from src.utils.run_memory import RunMemory
+from src.utils.spend_cube import (
+    SpendCube, flag_anomalies, load_cube_arrays, load_cube_rollups, month_label, months_from_ordinals, parse_month,
+)
+from src.utils.vendor_index import VendorIndex
+
+USD_ONLY = RateTable({"EUR": ([date(2024, 1, 1).toordinal()], [0.5])})
+
+
+@pytest.fixture
+def cube():
+    store = InvoiceStore(chunk_rows=3)
+    cube = SpendCube(store, reporting="USD", table=USD_ONLY)
+    store.extend([
+        ("Acme", "100", "USD", date(2024, 1, 5), "Office"),
+        ("Acme", "50", "EUR", date(2024, 1, 20), "Office"),
+        ("Acme", "10", "USD", date(2024, 2, 1), "Travel"),
+        ("Globex", "200", "USD", date(2024, 2, 3), "Travel"),
+        ("Globex", "5", "USD", None, None),
+    ])
+    return cube
+
+
+def test_rollups_and_slices(cube):
+    assert cube.vendor_totals() == {"Acme": 210.0, "Globex": 205.0}
+    assert cube.rollup(()) == {(): 415.0}
+    assert cube.monthly_series() == {"2024-01": 200.0, "2024-02": 210.0, "unknown": 5.0}
+    assert cube.rollup("category", vendor="Acme") == {"Office": 200.0, "Travel": 10.0}
+    assert cube.rollup(("vendor", "month"), start_month="2024-02", end_month="2024-02") == {
+        ("Acme", "2024-02"): 10.0, ("Globex", "2024-02"): 200.0,
+    }
+    assert cube.rollup("vendor", category=["Uncategorized"]) == {"Globex": 5.0}
+    with pytest.raises(ValueError):
+        cube.rollup("region")
+
+
+def test_cube_is_built_while_loading(tmp_path):
+    path = tmp_path / "invoices.csv"
+    rows = "".join(f"Vendor {i % 3},{i},2024-0{1 + i % 3}-01,Cat {i % 2}\n" for i in range(10))
+    path.write_text("supplier,amount,date,category\n" + rows, encoding="utf-8")
+
+    store = InvoiceStore(chunk_rows=4)
+    cube = SpendCube(store)
+    ingested = []
+    store.subscribe(ingested.append)  # replays nothing: the store is still empty
+    load_invoice_files([str(path)], store, vendor_index=VendorIndex(path=None))
+
+    assert len(ingested) == 3  # 4 + 4 + the tail sealed at the end of the load
+    assert cube.rollup(()) == {(): 45.0}
+    assert cube.vendor_totals() == {"Vendor 0": 18.0, "Vendor 1": 12.0, "Vendor 2": 15.0}
+
+
+def test_late_cube_replays_existing_chunks():
+    store = InvoiceStore(chunk_rows=2)
+    store.extend(("Acme", 1, "USD", None, None) for _ in range(5))
+    cube = SpendCube(store)
+    assert cube.rollup(()) == {(): 5.0}
+
+
+def test_save_and_load(cube, tmp_path):
+    path = str(tmp_path / "spend_cube.npz")
+    cube.save(path)
+    arrays = load_cube_arrays(path)
+    assert arrays["invoice_cents"].tolist() == [10000, 10000, 1000, 20000, 500]
+    assert arrays["invoice_amount"].tolist() == [10000, 5000, 1000, 20000, 500]
+    assert arrays["vendors"].tolist() == ["Acme", "Globex"]
+    vendor_totals, monthly, currency, unconverted, stale = load_cube_rollups(path)
+    assert vendor_totals == {"Acme": 210.0, "Globex": 205.0}
+    assert list(monthly) == ["unknown", "2024-01", "2024-02"]
+    assert currency == "USD" and unconverted == [] and stale == []
+
+
+def test_save_streams_spilled_chunks(tmp_path):
+    store = InvoiceStore(memory_budget=1, spill_dir=str(tmp_path / "spill"), chunk_rows=3)
+    cube = SpendCube(store, reporting="USD", table=USD_ONLY)
+    store.extend((f"Vendor {i % 2}", str(i), "EUR" if i % 2 else "USD", date(2024, 1, 10), None) for i in range(10))
+    path = str(tmp_path / "spend_cube.npz")
+    cube.save(path)
+    assert store.spilled_bytes > 0
+    arrays = load_cube_arrays(path)
+    assert arrays["invoice_amount"].tolist() == [i * 100 for i in range(10)]
+    assert arrays["invoice_cents"].tolist() == [i * 100 * (2 if i % 2 else 1) for i in range(10)]
+    assert arrays["invoice_date"].dtype == np.int32 and len(arrays["invoice_vendor"]) == 10
+    assert load_cube_rollups(path)[0] == {"Vendor 0": 20.0, "Vendor 1": 50.0}
+
+
+def test_unconverted_and_stale_currencies_are_flagged(tmp_path):
+    store = InvoiceStore()
+    cube = SpendCube(store, reporting="USD", table=USD_ONLY)
+    store.append("Acme", "100", "SEK")
+    store.append("Globex", "50", "EUR", date(2025, 1, 1))
+    assert cube.vendor_totals() == {"Acme": 100.0, "Globex": 100.0}
+    assert cube.unconverted == {"SEK"} and cube.stale == {"EUR"}
+    path = str(tmp_path / "spend_cube.npz")
+    cube.save(path)
+    assert load_cube_rollups(path)[3:] == (["SEK"], ["EUR"])
+    memory = RunMemory("run-1")
+    cube.store_figures(memory)
+    assert "SEK have no exchange rates" in memory.get("figure:total_spend")["content"]
+
+
+def test_store_figures(cube):
+    memory = RunMemory("run-1")
+    cube.store_figures(memory)
+    assert [e["key"] for e in memory.entries(kind="figure")] == [
+        "figure:total_spend", "figure:spend_by_vendor", "figure:spend_by_month",
+    ]
+    assert memory.get("figure:total_spend")["content"] == "Total spend: 415.00 USD over 5 invoices."
+    assert memory.get("figure:spend_by_vendor")["content"].splitlines()[1:] == ["- Acme: 210.00", "- Globex: 205.00"]
+    assert "- 2024-02: 210.00" in memory.get("figure:spend_by_month")["content"]
+
+
+def test_anomalies():
+    totals = {("Acme", f"2024-{m:02d}"): 100.0 for m in range(1, 7)}
+    totals[("Acme", "2024-07")] = 1000.0
+    totals[("Globex", "2024-01")] = 5.0
+    flagged = flag_anomalies(totals)
+    assert [(a["vendor"], a["month"]) for a in flagged] == [("Acme", "2024-07")]
+
+
+def test_month_helpers():
+    ordinals = np.array([date(2024, 3, 31).toordinal(), 0])
+    months = months_from_ordinals(ordinals)
+    assert [month_label(m) for m in months] == ["2024-03", "unknown"]
+    assert parse_month("2024-03") == months[0]
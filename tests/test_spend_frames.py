@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+
+from src.utils.currency import RateTable
+from src.utils.invoice_store import InvoiceStore
+from src.utils.spend_cube import SpendCube, parse_month
+from src.utils.spend_frames import (
+    DRILL_DOWN_ROWS, build_spend_frames, drill_down, filter_frame, monthly_trend, vendor_breakdown,
+)
+
+
+@pytest.fixture
+def frames(tmp_path):
+    store = InvoiceStore(chunk_rows=500)
+    cube = SpendCube(store, reporting="USD", table=RateTable({}))
+    store.extend([
+        ("Acme", "100", "USD", date(2024, 1, 5), "Office"),
+        ("Acme", "10", "USD", date(2024, 2, 1), "Travel"),
+        ("Globex", "200", "USD", date(2024, 2, 3), "Travel"),
+        ("Globex", "5", "USD", None, None),
+    ])
+    # Many small invoices, to exercise the drill-down limit
+    store.extend(("Initech", "1", "USD", date(2024, 3, 1 + i % 28), "Office") for i in range(1200))
+    path = str(tmp_path / "spend_cube.npz")
+    cube.save(path)
+    return build_spend_frames(path)
+
+
+def test_frames(frames):
+    cells, invoices, currency, unconverted, stale = frames
+    assert (currency, unconverted, stale) == ("USD", [], [])
+    assert len(invoices) == 1204 and cells["invoices"].sum() == 1204
+    assert cells["total"].sum() == pytest.approx(1515.0)
+    assert list(cells["vendor"].cat.categories) == ["Acme", "Globex", "Initech"]
+    assert invoices["date"].isna().sum() == 1
+
+
+def test_filters(frames):
+    cells, invoices = frames[:2]
+    assert filter_frame(cells, vendors=["Acme"])["total"].sum() == pytest.approx(110.0)
+    assert filter_frame(cells, categories=["Travel"])["total"].sum() == pytest.approx(210.0)
+    february = (parse_month("2024-02"), parse_month("2024-02"))
+    assert filter_frame(invoices, month_range=february)["total"].sum() == pytest.approx(210.0)
+    assert filter_frame(invoices, ["Globex"], ["Travel"], february)["total"].tolist() == [200.0]
+    assert len(filter_frame(cells)) == len(cells)
+
+
+def test_vendor_breakdown_and_monthly_trend(frames):
+    cells = frames[0]
+    assert vendor_breakdown(cells).to_dict() == {"Initech": 1200.0, "Globex": 205.0, "Acme": 110.0}
+    assert vendor_breakdown(cells, limit=1).index.tolist() == ["Initech"]
+
+    trend = monthly_trend(cells)
+    assert trend.index.tolist() == ["2024-01", "2024-02", "2024-03"]
+    assert trend.loc["2024-02", "Travel"] == 210.0 and trend.loc["2024-02", "Office"] == 0.0
+    assert monthly_trend(filter_frame(cells, categories=["Uncategorized"])).empty
+
+
+def test_drill_down_is_capped(frames):
+    invoices = frames[1]
+    rows, matching = drill_down(invoices)
+    assert matching == 1204 and len(rows) == DRILL_DOWN_ROWS == 1000
+    assert "month" not in rows.columns
+    assert rows["date"].is_monotonic_decreasing
+
+    rows, matching = drill_down(invoices, vendors=["Acme"])
+    assert matching == 2 and rows["total"].tolist() == [10.0, 100.0]
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from src.utils.vendor_index import VendorIndex, canonicalize_totals, compatible, normalize_vendor_name
+
+
+@pytest.mark.parametrize("name, key", [
+    ("ACME Inc.", "acme inc"),
+    ("Acme Incorporated", "acme inc"),
+    ("The Globex Corporation", "globex corp"),
+    ("Société Générale SA", "societe generale sa"),
+    ("Inc", "inc"),
+])
+def test_normalize_vendor_name(name, key):
+    assert normalize_vendor_name(name) == key
+
+
+def test_spellings_are_merged():
+    index = VendorIndex(path=None)
+    assert index.canonicalize(["ACME Inc.", "Acme Incorporated", "ACME INC", "Acme", "Acme, Inc"]) == {
+        "ACME Inc.": "ACME Inc.", "Acme Incorporated": "ACME Inc.", "ACME INC": "ACME Inc.",
+        "Acme": "ACME Inc.", "Acme, Inc": "ACME Inc.",
+    }
+    assert len(index) == 1
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Acme Supplies 1", "Acme Supplies 2"),
+    ("Store 12", "Store 21"),
+    ("Alpha SA", "Alpha SAS"),
+    ("Globex Ltd", "Globex Inc"),
+])
+def test_numbers_and_legal_forms_must_match(first, second):
+    index = VendorIndex(path=None)
+    assert not compatible(normalize_vendor_name(first), normalize_vendor_name(second))
+    assert index.canonical(first) == first
+    assert index.canonical(second) == second
+    assert len(index) == 2
+
+
+def test_lookup_does_not_register():
+    index = VendorIndex(path=None)
+    index.canonical("Globex Corp")
+    assert index.lookup("GLOBEX CORPORATION") == "Globex Corp"
+    assert index.lookup("Initech") is None
+    assert len(index) == 1
+
+
+def test_unmerge_and_merge_are_saved(tmp_path):
+    path = str(tmp_path / "aliases.json")
+    index = VendorIndex(path=path)
+    assert index.canonical("Initech Solutions") == "Initech Solutions"
+    assert index.canonical("Initech Solution") == "Initech Solutions"
+    assert index.unmerge("Initech Solution") == "Initech Solution"
+    assert index.canonical("Initech Solution") == "Initech Solution"
+    index.save()
+
+    # Another process that learned the wrong alias keeps the correction when it saves
+    other = VendorIndex(path=None)
+    other.canonical("Initech Solutions")
+    other.canonical("Initech Solution")
+    other.path = path
+    other.save()
+    assert other.canonical("Initech Solution") == "Initech Solution"
+    assert json.load(open(path, encoding="utf-8"))["manual"] == {"initech solution": "initech solution"}
+
+    reloaded = VendorIndex(path=path)
+    assert reloaded.canonical("Initech Solution") == "Initech Solution"
+    assert reloaded.merge("Initech Solution", "Initech Solutions") == "Initech Solutions"
+    assert reloaded.canonical("INITECH SOLUTION") == "Initech Solutions"
+    with pytest.raises(KeyError):
+        reloaded.merge("Initech Solution", "Umbrella")
+
+
+def test_canonicalize_totals_is_read_only():
+    index = VendorIndex(path=None)
+    index.canonical("ACME Inc.")
+    assert canonicalize_totals({"ACME Inc.": 10, "Acme Incorporated": 5, "Acme Supplies 2": 1, "Globex": 2}, index) == {
+        "ACME Inc.": 15, "Acme Supplies 2": 1, "Globex": 2,
+    }
+    assert len(index) == 1 and index.lookup("Globex") is None